@@ -9,9 +9,7 @@ import os
 from datetime import datetime, timedelta
 import io
 import re
-import altair as alt
-import plotly.express as px
-import plotly.graph_objects as go
+import uuid
 
 from database import (
     init_db, 
@@ -20,19 +18,54 @@ from database import (
     get_all_student_sessions,
     export_student_to_excel, 
     student_exists,
-    save_student_from_excel,
+    save_student_from_excel_in_background,
+    resume_journaled_writes,
+    journal_pending_count,
     get_data_format_info,
     get_last_jadeed_page,
+    get_student_state,
+    get_session_page_facts,
+    get_page_status_map,
+    get_review_queue,
+    get_retention_model,
+    get_all_sessions,
+    get_regressions,
+    get_student_aggregates,
+    get_students_table,
+    get_class_states,
+    refresh_data,
     get_google_sheet  # ← ADD THIS
 )
+from mushaf_index import TOTAL_PAGES, MAX_AYAH_COUNT, page_to_juz, page_surahs, page_max_ayah
+from charts import MAX_CHART_POINTS, downsample, paginate, quran_map_figure
+from quran_map import STATUS_COLORS, status_counts
+from page_grid import focus_cards_html, page_grid_html, page_map_cells
+from cohort import build_class_agenda, build_cohort_summary, health_distribution, cohort_weak_siparas
+from page_facts import remap_legacy_murajaat
+from page_ranges import sipara_span, to_sipara_page
+from retention_model import predict_recall
+from student_state import top_weak
+from timeseries import aggregate_series
+from lazy_imports import lazy_module
+import profiler
+from profiler import timed
+import sheets_ledger
+import write_queue
 from excel_handler import (
     parse_excel_file, 
     calculate_juzhali_range, 
-    get_murajaat_available_pages, 
+    get_juzhali_pages,
+    get_murajaat_available_pages as graduated_pages_by_sipara, 
     convert_df_for_dashboard, 
+    grade_to_numeric,
     create_sample_excel_template
 )
 
+# Charting libraries load on first chart, not on the access-code page
+alt = lazy_module('altair')
+px = lazy_module('plotly.express')
+go = lazy_module('plotly.graph_objects')
+
 st.set_page_config(page_title="Hifz Progress Tracker", layout="wide", page_icon="📖")
 
 # =========================================================================
@@ -469,6 +502,7 @@ STANDARD_HIFZ_MISTAKES = [
 def init_session_state():
     """Initialize session state with database"""
     init_db()
+    resume_journaled_writes()
     
     if "selected_student_id" not in st.session_state:
         st.session_state.selected_student_id = None
@@ -479,43 +513,10 @@ def init_session_state():
     if "juzhali_length" not in st.session_state:
         st.session_state.juzhali_length = 10
 
-init_session_state()
-
 # =========================================================================
 # HELPER FUNCTIONS
 # =========================================================================
 
-def grade_to_numeric(grade):
-    """Convert grade to numeric score - FIXED FOR ARABIC GRADES"""
-    if pd.isna(grade):
-        return np.nan
-    
-    if isinstance(grade, (int, float)):
-        return float(grade)
-    
-    grade_str = str(grade).strip()
-    
-    # Try to convert directly to float first
-    try:
-        return float(grade_str)
-    except ValueError:
-        pass
-    
-    # Handle Arabic and English grade texts
-    grade_lower = grade_str.lower()
-    
-    # Arabic grade mappings
-    if 'جيد جدا' in grade_str or 'jayyid jiddan' in grade_lower or 'excellent' in grade_lower:
-        return 10  # ✅ Excellent = 10/10
-    elif 'جيد' in grade_str or 'jayyid' in grade_lower or 'good' in grade_lower:
-        return 8   # ✅ Good = 8/10  
-    elif 'متوسط' in grade_str or 'mutawassit' in grade_lower or 'average' in grade_lower:
-        return 6   # ✅ Average = 6/10
-    elif 'ضعيف' in grade_str or "da'eef" in grade_lower or 'weak' in grade_lower:
-        return 4   # ✅ Weak = 4/10
-    
-    return np.nan  # Could not convert 
-
 def score_to_grade_status(score):
     """Convert score to grade status with emoji"""
     if score >= 3.5: 
@@ -652,35 +653,6 @@ def calculate_jadeed_progress(all_jadeed_data):
 
     return total_pages, total_ayahs
 
-def get_murajaat_available_pages(student_data):
-    """Determine which pages are available for Murajaat"""
-    
-    last_jadeed_page = get_last_jadeed_page(student_data)
-    
-    if last_jadeed_page is None:
-        return {}
-    
-    current_jadeed_sipara = ((last_jadeed_page - 1) // 20) + 1
-    current_jadeed_page_in_sipara = ((last_jadeed_page - 1) % 20) + 1
-    
-    juzhali_length = st.session_state.get('juzhali_length', 10)
-    juzhali_end_absolute = last_jadeed_page
-    juzhali_start_absolute = max(1, juzhali_end_absolute - juzhali_length + 1)
-    
-    juzhali_start_sipara = ((juzhali_start_absolute - 1) // 20) + 1
-    juzhali_start_page_in_sipara = ((juzhali_start_absolute - 1) % 20) + 1
-    
-    murajaat_pages = {}
-    
-    for sipara in range(1, juzhali_start_sipara):
-        murajaat_pages[str(sipara)] = list(range(1, 21))
-    
-    if juzhali_start_sipara == current_jadeed_sipara:
-        if juzhali_start_page_in_sipara > 1:
-            murajaat_pages[str(current_jadeed_sipara)] = list(range(1, juzhali_start_page_in_sipara))
-    
-    return murajaat_pages
-
 def calculate_jadeed_progress(all_jadeed_data):
     """Calculate total pages and ayahs completed"""
     if all_jadeed_data is None or all_jadeed_data.empty:
@@ -722,6 +694,7 @@ def calculate_jadeed_progress(all_jadeed_data):
 # ANALYTICS DASHBOARD FUNCTION - FIXED VERSION
 # =========================================================================
 
+@timed('section.analytics_dashboard')
 def run_analytics_dashboard(student_id):
     df = get_all_student_sessions(student_id)
     
@@ -791,7 +764,7 @@ def run_analytics_dashboard(student_id):
     # Jadeed progress
     last_jadeed_page = get_last_jadeed_page(df)
     if last_jadeed_page:
-        progress_percent = (last_jadeed_page / 604) * 100
+        progress_percent = (last_jadeed_page / TOTAL_PAGES) * 100
         st.markdown(f"""
         <div class="success-section">
             <h3 style="margin:0 0 10px 0;">📖 Current Jadeed Progress</h3>
@@ -963,154 +936,399 @@ def run_analytics_dashboard(student_id):
     
     # Detailed analytics (only for new format)
     if not new_format_data.empty:
-        st.markdown('<div class="section-header">🔍 Detailed Mistake Analytics</div>', unsafe_allow_html=True)
-        
-        # Murajaat breakdown
-        murajaat_data = new_format_data[new_format_data['Session_Type'] == 'Murajaat']
-        if not murajaat_data.empty:
-            total_mura_mistakes = murajaat_data['Mistake_Count'].sum() + murajaat_data['Tambeeh_Count'].sum()
-            mura_talqeen = murajaat_data['Mistake_Count'].sum()
-            mura_tambeeh = murajaat_data['Tambeeh_Count'].sum()
-            
-            st.markdown("**📋 Murajaat Mistake Breakdown**")
-            col1, col2, col3 = st.columns(3)
-            
-            with col1:
-                st.markdown(f"""
-                <div style="background: #f3f4f6; padding: 15px; border-radius: 10px; text-align: center;">
-                    <h3 style="color: #6b7280; margin: 0;">Total</h3>
-                    <h2 style="color: #1f2937; margin: 10px 0;">{int(total_mura_mistakes)}</h2>
-                </div>
-                """, unsafe_allow_html=True)
-            
-            with col2:
-                st.markdown(f"""
-                <div style="background: #fee2e2; padding: 15px; border-radius: 10px; text-align: center;">
-                    <h3 style="color: #991b1b; margin: 0;">Talqeen</h3>
-                    <h2 style="color: #dc2626; margin: 10px 0;">{int(mura_talqeen)}</h2>
-                </div>
-                """, unsafe_allow_html=True)
-            
-            with col3:
-                st.markdown(f"""
-                <div style="background: #fef3c7; padding: 15px; border-radius: 10px; text-align: center;">
-                    <h3 style="color: #92400e; margin: 0;">Tambeeh</h3>
-                    <h2 style="color: #f59e0b; margin: 10px 0;">{int(mura_tambeeh)}</h2>
-                </div>
-                """, unsafe_allow_html=True)
-        
-        st.markdown("<br>", unsafe_allow_html=True)
-        
-        # Juzhali breakdown
-        juzhali_data = new_format_data[new_format_data['Session_Type'] == 'Juzhali']
-        if not juzhali_data.empty:
-            total_juzhali_mistakes = juzhali_data['Mistake_Count'].sum() + juzhali_data['Tambeeh_Count'].sum()
-            juzhali_talqeen = juzhali_data['Mistake_Count'].sum()
-            juzhali_tambeeh = juzhali_data['Tambeeh_Count'].sum()
-            
-            st.markdown("**📋 Juzhali Mistake Breakdown**")
-            col1, col2, col3 = st.columns(3)
-            
-            with col1:
-                st.markdown(f"""
-                <div style="background: #f3f4f6; padding: 15px; border-radius: 10px; text-align: center;">
-                    <h3 style="color: #6b7280; margin: 0;">Total</h3>
-                    <h2 style="color: #1f2937; margin: 10px 0;">{int(total_juzhali_mistakes)}</h2>
-                </div>
-                """, unsafe_allow_html=True)
+        if lazy_section("🔍 Detailed Mistake Analytics", 'dash_mistakes'):
+            # Murajaat breakdown
+            murajaat_data = new_format_data[new_format_data['Session_Type'] == 'Murajaat']
+            if not murajaat_data.empty:
+                total_mura_mistakes = murajaat_data['Mistake_Count'].sum() + murajaat_data['Tambeeh_Count'].sum()
+                mura_talqeen = murajaat_data['Mistake_Count'].sum()
+                mura_tambeeh = murajaat_data['Tambeeh_Count'].sum()
+                
+                st.markdown("**📋 Murajaat Mistake Breakdown**")
+                col1, col2, col3 = st.columns(3)
+                
+                with col1:
+                    st.markdown(f"""
+                    <div style="background: #f3f4f6; padding: 15px; border-radius: 10px; text-align: center;">
+                        <h3 style="color: #6b7280; margin: 0;">Total</h3>
+                        <h2 style="color: #1f2937; margin: 10px 0;">{int(total_mura_mistakes)}</h2>
+                    </div>
+                    """, unsafe_allow_html=True)
+                
+                with col2:
+                    st.markdown(f"""
+                    <div style="background: #fee2e2; padding: 15px; border-radius: 10px; text-align: center;">
+                        <h3 style="color: #991b1b; margin: 0;">Talqeen</h3>
+                        <h2 style="color: #dc2626; margin: 10px 0;">{int(mura_talqeen)}</h2>
+                    </div>
+                    """, unsafe_allow_html=True)
+                
+                with col3:
+                    st.markdown(f"""
+                    <div style="background: #fef3c7; padding: 15px; border-radius: 10px; text-align: center;">
+                        <h3 style="color: #92400e; margin: 0;">Tambeeh</h3>
+                        <h2 style="color: #f59e0b; margin: 10px 0;">{int(mura_tambeeh)}</h2>
+                    </div>
+                    """, unsafe_allow_html=True)
             
-            with col2:
-                st.markdown(f"""
-                <div style="background: #fee2e2; padding: 15px; border-radius: 10px; text-align: center;">
-                    <h3 style="color: #991b1b; margin: 0;">Talqeen</h3>
-                    <h2 style="color: #dc2626; margin: 10px 0;">{int(juzhali_talqeen)}</h2>
-                </div>
-                """, unsafe_allow_html=True)
+            st.markdown("<br>", unsafe_allow_html=True)
             
-            with col3:
-                st.markdown(f"""
-                <div style="background: #fef3c7; padding: 15px; border-radius: 10px; text-align: center;">
-                    <h3 style="color: #92400e; margin: 0;">Tambeeh</h3>
-                    <h2 style="color: #f59e0b; margin: 10px 0;">{int(juzhali_tambeeh)}</h2>
-                </div>
-                """, unsafe_allow_html=True)
+            # Juzhali breakdown
+            juzhali_data = new_format_data[new_format_data['Session_Type'] == 'Juzhali']
+            if not juzhali_data.empty:
+                total_juzhali_mistakes = juzhali_data['Mistake_Count'].sum() + juzhali_data['Tambeeh_Count'].sum()
+                juzhali_talqeen = juzhali_data['Mistake_Count'].sum()
+                juzhali_tambeeh = juzhali_data['Tambeeh_Count'].sum()
+                
+                st.markdown("**📋 Juzhali Mistake Breakdown**")
+                col1, col2, col3 = st.columns(3)
+                
+                with col1:
+                    st.markdown(f"""
+                    <div style="background: #f3f4f6; padding: 15px; border-radius: 10px; text-align: center;">
+                        <h3 style="color: #6b7280; margin: 0;">Total</h3>
+                        <h2 style="color: #1f2937; margin: 10px 0;">{int(total_juzhali_mistakes)}</h2>
+                    </div>
+                    """, unsafe_allow_html=True)
+                
+                with col2:
+                    st.markdown(f"""
+                    <div style="background: #fee2e2; padding: 15px; border-radius: 10px; text-align: center;">
+                        <h3 style="color: #991b1b; margin: 0;">Talqeen</h3>
+                        <h2 style="color: #dc2626; margin: 10px 0;">{int(juzhali_talqeen)}</h2>
+                    </div>
+                    """, unsafe_allow_html=True)
+                
+                with col3:
+                    st.markdown(f"""
+                    <div style="background: #fef3c7; padding: 15px; border-radius: 10px; text-align: center;">
+                        <h3 style="color: #92400e; margin: 0;">Tambeeh</h3>
+                        <h2 style="color: #f59e0b; margin: 10px 0;">{int(juzhali_tambeeh)}</h2>
+                    </div>
+                    """, unsafe_allow_html=True)
         
         st.markdown("<br>", unsafe_allow_html=True)
         
         # Weak area detection
         st.markdown('<div class="section-header">⚠️ Weak Area Detection</div>', unsafe_allow_html=True)
         
-        talqeen_data = new_format_data.copy()
+        # Recency-weighted Talqeen scores kept in the snapshot (30-day half-life)
+        student_state = get_student_state(student_id, df, st.session_state.get('juzhali_length', 10))
         
         col1, col2 = st.columns(2)
         
         with col1:
-            mura_sipara_weak = talqeen_data[
-                (talqeen_data['Session_Type'] == 'Murajaat') & 
-                (talqeen_data['Sipara'].notna())
-            ].groupby('Sipara')['Mistake_Count'].sum().nlargest(3)
+            mura_sipara_weak = top_weak(student_state, 'weak_siparas', 3)
             
-            if not mura_sipara_weak.empty:
+            if mura_sipara_weak:
                 st.markdown("**🔴 Top 3 Weak Siparas (Murajaat)**")
-                for sipara, mistakes in mura_sipara_weak.items():
+                for sipara, score in mura_sipara_weak:
                     st.markdown(f"""
                     <div style="background: #fee2e2; padding: 10px; border-radius: 8px; margin: 5px 0; border-left: 4px solid #dc2626;">
-                        <strong>Sipara {sipara}:</strong> {int(mistakes)} Talqeen mistakes
+                        <strong>Sipara {sipara}:</strong> {score:.1f} recent Talqeen mistakes
                     </div>
                     """, unsafe_allow_html=True)
             else:
                 st.success("✅ No weak Siparas detected")
         
         with col2:
-            juzhali_page_weak = talqeen_data[
-                (talqeen_data['Session_Type'] == 'Juzhali') & 
-                (talqeen_data['Page'].notna())
-            ].groupby('Page')['Mistake_Count'].sum().nlargest(3)
-            
-            if not juzhali_page_weak.empty:
-                st.markdown("**🔴 Top 3 Weak Pages (Juzhali)**")
-                for page, mistakes in juzhali_page_weak.items():
+            weak_pages = top_weak(student_state, 'weak_pages', 3)
+            
+            if weak_pages:
+                st.markdown("**🔴 Top 3 Weak Pages (Juzhali & Murajaat)**")
+                for page, score in weak_pages:
+                    sipara, page_in_sipara = to_sipara_page(page)
                     st.markdown(f"""
                     <div style="background: #fee2e2; padding: 10px; border-radius: 8px; margin: 5px 0; border-left: 4px solid #dc2626;">
-                        <strong>Page {page}:</strong> {int(mistakes)} Talqeen mistakes
+                        <strong>Page {page}</strong> (Sipara {sipara}, page {page_in_sipara}): {score:.1f} recent Talqeen mistakes
                     </div>
                     """, unsafe_allow_html=True)
             else:
                 st.success("✅ No weak pages detected")
+        
+        st.caption("Scores weigh recent mistakes more: a mistake counts half after 30 days.")
     
     st.markdown("<br>", unsafe_allow_html=True)
     
-    # Session history
-    st.markdown('<div class="section-header">📜 Session History</div>', unsafe_allow_html=True)
-    
-    if not df.empty:
-        display_df = df[['Date', 'Session_Type', 'Sipara', 'Page', 'Overall_Grade', 'Notes']].copy()
-        display_df = display_df.sort_values('Date', ascending=False)
-        st.dataframe(display_df, use_container_width=True, height=300)
+    # Predicted forgetting (per-page forgetting curves, refit in the background after saves)
+    if lazy_section("🧠 Predicted Forgetting", 'dash_forgetting'):
+        retention = get_retention_model(student_id)
+        if retention.empty:
+            st.info("📭 Not enough review history to predict forgetting yet")
+        else:
+            retention = retention.assign(recall=predict_recall(retention).to_numpy())
+            at_risk = retention.nsmallest(5, 'recall')
+            
+            cols = st.columns(len(at_risk))
+            for col, row in zip(cols, at_risk.itertuples()):
+                with col:
+                    st.metric(
+                        f"Page {row.page} (Sipara {page_to_juz(row.page)})",
+                        f"{row.recall:.0%}",
+                        help=f"Predicted recall today • last reviewed {row.last_review} • {row.reviews} reviews"
+                    )
+            
+            st.caption(f"Average predicted recall across {len(retention)} pages: {retention['recall'].mean():.0%}")
     
     st.markdown("<br>", unsafe_allow_html=True)
     
-    # Download section
-    st.markdown('<div class="section-header">⬇️ Download Data</div>', unsafe_allow_html=True)
+    # Whole-Quran map (one status per page, one figure)
+    if last_jadeed_page:
+        if lazy_section("🗺️ Whole Quran Map", 'dash_quran_map', default=True):
+            juzhali_length = st.session_state.get('juzhali_length', 10)
+            figure, legend = section_memo(
+                df,
+                ('dash_quran_map', student_id, juzhali_length),
+                lambda: quran_map_section(df, juzhali_length)
+            )
+            st.plotly_chart(figure, use_container_width=True)
+            st.markdown(f'<div style="font-size:0.85em; color:#4b5563;">{legend}</div>', unsafe_allow_html=True)
+        st.markdown("<br>", unsafe_allow_html=True)
+    
+    # Session history
+    if lazy_section("📜 Session History", 'dash_history'):
+        display_df = section_memo(
+            df,
+            ('dash_history', student_id),
+            lambda: df[['Date', 'Session_Type', 'Sipara', 'Page', 'Overall_Grade', 'Notes']].sort_values('Date', ascending=False)
+        )
+        st.dataframe(display_df, use_container_width=True, height=300)
     
-    csv_data = df.to_csv(index=False)
+    st.markdown("<br>", unsafe_allow_html=True)
     
-    st.download_button(
-        label="📥 Download Complete Data as CSV",
-        data=csv_data,
-        file_name=f"student_{student_id}_data.csv",
-        mime="text/csv",
-        use_container_width=True
-    )
+    # Download section (the CSV is only built when opened)
+    if lazy_section("⬇️ Download Data", 'dash_download'):
+        csv_data = section_memo(df, ('dash_download', student_id), lambda: df.to_csv(index=False))
+        
+        st.download_button(
+            label="📥 Download Complete Data as CSV",
+            data=csv_data,
+            file_name=f"student_{student_id}_data.csv",
+            mime="text/csv",
+            use_container_width=True
+        )
 
 # =========================================================================
 # END OF PART 2
 # =========================================================================
 
+# =========================================================================
+# LAZY SECTIONS
+# =========================================================================
+
+def lazy_section(title, key, default=False):
+    """
+    Section header with a Show toggle. Returns True when the section body
+    should run - a closed section costs nothing beyond its header.
+    """
+    st.markdown(f'<div class="section-header">{title}</div>', unsafe_allow_html=True)
+    return st.toggle("Show", value=default, key=f"lazy_{key}")
+
+def section_memo(df, key, build):
+    """
+    Result of build() memoized in session state under `key` for the data
+    version `df` was loaded at. Everything is dropped when the data changes.
+    """
+    version = df.attrs.get('data_version')
+    if version is None:
+        return build()
+    
+    memo = st.session_state.get('section_memo')
+    if memo is None or memo.get('version') != version:
+        memo = {'version': version}
+        st.session_state.section_memo = memo
+    
+    if key not in memo:
+        memo[key] = build()
+    return memo[key]
+
+def quran_map_section(df, juzhali_length):
+    """Whole-Quran map figure and its legend HTML (memoized by the dashboard)"""
+    page_status = get_page_status_map(df, juzhali_length)
+    legend = ' '.join(
+        f'<span style="display:inline-block; margin-right:12px;">'
+        f'<span style="display:inline-block; width:12px; height:12px; background:{color}; '
+        f'border:1px solid #9ca3af; border-radius:2px; vertical-align:middle;"></span> '
+        f'{label} ({count})</span>'
+        for (label, count), color in zip(status_counts(page_status).items(), STATUS_COLORS)
+    )
+    return quran_map_figure(page_status), legend
+
+# =========================================================================
+# SAVE NOTICES
+# =========================================================================
+
+def flash_save_notice(message):
+    """Remember a confirmation to show after the rerun that follows a save"""
+    st.session_state.save_notice = message
+
+def show_save_notice():
+    """Show (once) the confirmation left by the last save"""
+    message = st.session_state.pop('save_notice', None)
+    if message:
+        st.success(message)
+        st.balloons()
+
+def write_owner():
+    """Key tying background writes to this browser session"""
+    if 'write_owner' not in st.session_state:
+        st.session_state.write_owner = uuid.uuid4().hex
+    return st.session_state.write_owner
+
+WRITE_STATUS_POLL_SECONDS = 3
+WRITE_STATUS_SHOWN = 5
+
+@st.fragment(run_every=WRITE_STATUS_POLL_SECONDS)
+def write_status_panel():
+    """
+    Sidebar status of this session's background writes (pending /
+    committed / failed). Polls on its own, so a finished upload or a
+    failed save shows up without the teacher doing anything.
+    """
+    jobs = write_queue.jobs_for(write_owner())
+    journaled = journal_pending_count()
+    
+    # A finished upload selects the uploaded student
+    upload = st.session_state.get('pending_upload')
+    if upload:
+        job = write_queue.get_job(upload['job_id'])
+        if job is not None and job.status == write_queue.COMMITTED:
+            st.session_state.pending_upload = None
+            st.session_state.selected_student_id = job.result
+            flash_save_notice(f"✅ **{upload['student_name']}** loaded successfully!")
+            st.rerun()
+    
+    if not jobs and not journaled:
+        return
+    
+    st.markdown("**☁️ Sync Status**")
+    if journaled:
+        st.caption(f"📴 {journaled} saved session row(s) waiting to sync to Sheets")
+    for job in jobs[:WRITE_STATUS_SHOWN]:
+        if job.status == write_queue.PENDING:
+            retrying = f" (retry {job.attempts})" if job.attempts > 1 else ""
+            st.caption(f"⏳ {job.label}{retrying}")
+        elif job.status == write_queue.COMMITTED:
+            st.caption(f"✅ {job.label} • {job.finished_at[11:]}")
+        else:
+            st.error(f"❌ {job.label}: {job.error}")
+            if st.button("🔁 Retry", key=f"retry_{job.id}", use_container_width=True):
+                write_queue.retry(job.id)
+
+# =========================================================================
+# PROFILER PANEL (HIDDEN - OPEN WITH ?profiler=1)
+# =========================================================================
+
+def profiler_enabled():
+    """The admin panel stays on for the session once opened with ?profiler=1"""
+    if st.query_params.get('profiler') == '1':
+        st.session_state.profiler_enabled = True
+    return st.session_state.get('profiler_enabled', False)
+
+def profiler_panel():
+    """Where this run (and recent runs) spent their time"""
+    with st.expander("⏱️ Profiler", expanded=False):
+        run = profiler.current_run()
+        if run is not None:
+            st.markdown(f"**This run** (so far: {len(run['timings'])} timed steps)")
+            st.dataframe(pd.DataFrame(profiler.timings_table(run['timings'])),
+                         use_container_width=True, hide_index=True)
+        
+        snapshot = profiler.snapshot()
+        runs = snapshot['runs']
+        if runs:
+            seconds = [r['seconds'] for r in runs]
+            st.markdown(
+                f"**Last {len(runs)} runs** - mean {np.mean(seconds):.2f}s, "
+                f"slowest {max(seconds):.2f}s"
+            )
+            st.dataframe(pd.DataFrame(profiler.timings_table(snapshot['combined'])),
+                         use_container_width=True, hide_index=True)
+        
+        if snapshot['background']:
+            st.markdown("**Background** (fragment reruns and the Sheets writer)")
+            st.dataframe(pd.DataFrame(profiler.timings_table(snapshot['background'])),
+                         use_container_width=True, hide_index=True)
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            st.download_button(
+                "📥 Download JSON",
+                data=profiler.to_json(),
+                file_name=f"profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+                mime="application/json",
+                use_container_width=True
+            )
+        with col2:
+            if st.button("🗑️ Reset", key='profiler_reset', use_container_width=True):
+                profiler.reset()
+
+def sheets_ledger_panel():
+    """Which UI actions spend the Sheets API quota"""
+    with st.expander("📒 Sheets API Calls", expanded=False):
+        ledger = sheets_ledger.ledger_frame()
+        if ledger.empty:
+            st.info("No Sheets calls recorded yet")
+            return
+        
+        minute_ago = (datetime.now() - timedelta(minutes=1)).strftime('%Y-%m-%d %H:%M:%S')
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Calls recorded", len(ledger))
+        col2.metric("Last minute", int((ledger['time'] >= minute_ago).sum()))
+        col3.metric("Errors", int(ledger['error'].notna().sum()))
+        
+        st.markdown("**Per UI action** (worst first)")
+        st.dataframe(sheets_ledger.per_action(ledger), use_container_width=True, hide_index=True)
+        
+        st.markdown("**Per minute**")
+        st.dataframe(sheets_ledger.per_minute(ledger), use_container_width=True, hide_index=True)
+        
+        st.markdown("**Per operation**")
+        st.dataframe(sheets_ledger.per_operation(ledger), use_container_width=True, hide_index=True)
+        
+        st.download_button(
+            "📥 Download Ledger (CSV)",
+            data=ledger.to_csv(index=False),
+            file_name=f"sheets_ledger_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+            mime="text/csv",
+            use_container_width=True
+        )
+
 # =========================================================================
 # HELPER FUNCTION: DETECT MURAJAAT-AVAILABLE PAGES
 # =========================================================================
 
+RESAMPLE_THRESHOLD = 60   # raw points before charts default to weekly buckets
+
+@timed('chart.resampled_marks')
+def plot_resampled_marks(series, title):
+    """Line chart of weekly/monthly mean marks from precomputed aggregates"""
+    series = series.dropna(subset=['mean_mark'])
+    if series.empty:
+        st.info("📊 No marks recorded in this period")
+        return
+    
+    fig = go.Figure(go.Scatter(
+        x=series['period'],
+        y=series['mean_mark'],
+        mode='lines+markers',
+        line=dict(color='#3b82f6', width=3),
+        marker=dict(size=8, color='#3b82f6'),
+        customdata=series[['marked_sessions', 'talqeen']],
+        hovertemplate='<b>%{x|%b %d, %Y}</b><br>Average: %{y:.1f}/10'
+                      '<br>Sessions: %{customdata[0]}<br>Talqeen: %{customdata[1]:.0f}<extra></extra>'
+    ))
+    fig.add_hline(y=8, line_dash="dash", line_color="green")
+    fig.add_hline(y=6, line_dash="dash", line_color="orange")
+    fig.add_hline(y=4, line_dash="dash", line_color="red")
+    fig.update_layout(
+        title=title,
+        yaxis=dict(range=[0, 10.5], title="Average Mark (out of 10)"),
+        template='plotly_white',
+        height=400
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
 def get_murajaat_available_pages(student_data):
     """
     Determine which pages are available for Murajaat based on Jadeed/Juzhali progression.
@@ -1118,70 +1336,26 @@ def get_murajaat_available_pages(student_data):
     Returns a dict: {sipara_number: [list of available pages]}
     
     Logic:
-    - Get last Jadeed page to determine current sipara and page
-    - Calculate Juzhali range (10 pages before Jadeed)
-    - Pages BEFORE Juzhali = graduated to Murajaat
-    - Completed siparas = all 20 pages available
+    - Memorized pages = 1 to last Jadeed page
+    - Juzhali = the X pages up to the last Jadeed page
+    - Memorized minus Juzhali = graduated to Murajaat (interval sets, so
+      windows crossing a sipara boundary are split correctly)
     """
-    
-    # Get last Jadeed session
     last_jadeed_page = get_last_jadeed_page(student_data)
     
     if last_jadeed_page is None:
         # No Jadeed yet, no Murajaat pages available
         return {}
     
-    # Determine which sipara the last Jadeed page belongs to
-    # Each sipara has 20 pages: Sipara 1 = pages 1-20, Sipara 2 = 21-40, etc.
-    current_jadeed_sipara = ((last_jadeed_page - 1) // 20) + 1
-    current_jadeed_page_in_sipara = ((last_jadeed_page - 1) % 20) + 1
-    
-    # Calculate Juzhali range
     juzhali_length = st.session_state.get('juzhali_length', 10)
-    juzhali_end_absolute = last_jadeed_page
-    juzhali_start_absolute = max(1, juzhali_end_absolute - juzhali_length + 1)
-    
-    # Determine which sipara Juzhali starts in
-    juzhali_start_sipara = ((juzhali_start_absolute - 1) // 20) + 1
-    juzhali_start_page_in_sipara = ((juzhali_start_absolute - 1) % 20) + 1
-    
-    murajaat_pages = {}
-    
-    # 1. Add all COMPLETED siparas (all 20 pages available)
-    for sipara in range(1, juzhali_start_sipara):
-        murajaat_pages[str(sipara)] = list(range(1, 21))
-    
-    # 2. If Juzhali starts in a different sipara than Jadeed, 
-    #    add pages from Juzhali's sipara that are BEFORE Juzhali window
-    if juzhali_start_sipara < current_jadeed_sipara:
-        # Pages in the Juzhali start sipara that are BEFORE Juzhali
-        if juzhali_start_page_in_sipara > 1:
-            murajaat_pages[str(juzhali_start_sipara)] = list(range(1, juzhali_start_page_in_sipara))
-        
-        # All pages from siparas BETWEEN Juzhali start and current Jadeed sipara
-        for sipara in range(juzhali_start_sipara + 1, current_jadeed_sipara):
-            murajaat_pages[str(sipara)] = list(range(1, 21))
-        
-        # Pages in the CURRENT Jadeed sipara that are BEFORE Juzhali
-        if current_jadeed_sipara == current_jadeed_sipara and juzhali_start_page_in_sipara > 1:
-            # This means Juzhali is within the same sipara
-            graduated_pages_in_current = list(range(1, juzhali_start_page_in_sipara))
-            if graduated_pages_in_current:
-                murajaat_pages[str(current_jadeed_sipara)] = graduated_pages_in_current
-    
-    # 3. If Juzhali is within the SAME sipara as Jadeed
-    elif juzhali_start_sipara == current_jadeed_sipara:
-        # Pages BEFORE Juzhali window in the current sipara
-        if juzhali_start_page_in_sipara > 1:
-            murajaat_pages[str(current_jadeed_sipara)] = list(range(1, juzhali_start_page_in_sipara))
-    
-    return murajaat_pages
+    return graduated_pages_by_sipara(last_jadeed_page, juzhali_length)
 
 
 # =========================================================================
 # MURAJAAT ASSISTANT FUNCTION - FIXED VERSION (WITH BOTH DATA FORMATS)
 # =========================================================================
 
+@timed('section.murajaat_assistant')
 def run_murajaat_assistant(student_data_df, student_id):
     """Murajaat assistant for long-term review of graduated pages"""
     
@@ -1189,7 +1363,9 @@ def run_murajaat_assistant(student_data_df, student_id):
         st.error("❌ No student data available.")
         return
     
-    df = student_data_df.copy()
+    # Rows entered against the old 20-page siparas are filtered by the
+    # sipara and page they cover today
+    df = remap_legacy_murajaat(student_data_df.copy())
     
     # Header
     st.markdown("""
@@ -1230,6 +1406,12 @@ def run_murajaat_assistant(student_data_df, student_id):
     # Get available siparas
     available_siparas = sorted([int(s) for s in murajaat_available.keys()])
     
+    # Spaced-repetition schedule: pages due today (most overdue first)
+    due_pages = get_review_queue(student_id, student_data_df, st.session_state.get('juzhali_length', 10)).due()
+    due_per_sipara = {}
+    for page, _ in due_pages:
+        due_per_sipara[page_to_juz(page)] = due_per_sipara.get(page_to_juz(page), 0) + 1
+    
     # Sipara selection
     st.markdown('<div class="section-header">📖 Select Sipara for Review</div>', unsafe_allow_html=True)
     
@@ -1239,7 +1421,7 @@ def run_murajaat_assistant(student_data_df, student_id):
         selected_sipara = st.selectbox(
             "Choose Sipara", 
             available_siparas,
-            format_func=lambda x: f"Sipara {x}",
+            format_func=lambda x: f"Sipara {x} • {due_per_sipara[x]} due" if x in due_per_sipara else f"Sipara {x}",
             label_visibility="collapsed"
         )
     
@@ -1247,7 +1429,8 @@ def run_murajaat_assistant(student_data_df, student_id):
         available_pages = murajaat_available[str(selected_sipara)]
         num_pages = len(available_pages)
         
-        if num_pages == 20:
+        sipara_start, sipara_end = sipara_span(selected_sipara)
+        if num_pages == sipara_end - sipara_start + 1:
             st.markdown(f"""
             <div class="success-section">
                 <h3 style="margin: 0;">✅ Sipara {selected_sipara}: Fully Completed</h3>
@@ -1267,6 +1450,21 @@ def run_murajaat_assistant(student_data_df, student_id):
     
     st.markdown("<br>", unsafe_allow_html=True)
     
+    # Sudden grade drops (rolling baseline per sipara and per page)
+    drops = get_regressions(student_id)
+    if not drops.empty:
+        st.markdown('<div class="section-header">🚨 Grade Drops</div>', unsafe_allow_html=True)
+        for row in drops.itertuples():
+            if row.level == 'sipara':
+                where = f"Sipara {row.sipara}"
+            else:
+                where = f"Sipara {row.sipara}, page {to_sipara_page(int(row.page))[1]}"
+            st.error(
+                f"**{where}** dropped to {row.recall:.0%} on {row.date} "
+                f"(usually {row.baseline:.0%})"
+            )
+        st.markdown("<br>", unsafe_allow_html=True)
+    
     # ✅ FIXED: Filter data for this sipara - Simple and clean
     # Convert Sipara to string for consistent comparison
     df['Sipara_Str'] = df['Sipara'].astype(str)
@@ -1275,10 +1473,108 @@ def run_murajaat_assistant(student_data_df, student_id):
         (df['Sipara_Str'] == str(selected_sipara))
     ]
     
-        # =========================================================================
-    # 📈 SIPARA PERFORMANCE OVERVIEW WITH TIMELINE CHART
+    # Sections below the sipara picker only run when opened
+    if lazy_section("📈 Sipara Performance Overview", 'mura_overview'):
+        murajaat_overview_section(df, student_id, student_data_df, selected_sipara)
+    
+    st.markdown("<br>", unsafe_allow_html=True)
+    
+    if lazy_section(f"📊 Sipara {selected_sipara} Retention Health", 'mura_retention'):
+        murajaat_retention_section(df, selected_sipara)
+    
+    st.markdown("<br>", unsafe_allow_html=True)
+    
+    if lazy_section("🔍 Mistake Pattern Analysis", 'mura_mistakes'):
+        murajaat_mistake_section(sipara_data)
+    
+    st.markdown("<br>", unsafe_allow_html=True)
+    
     # =========================================================================
-    st.markdown('<div class="section-header">📈 Sipara Performance Overview</div>', unsafe_allow_html=True)
+    # PAGE PERFORMANCE MAP
+    # =========================================================================
+    
+    # Page health is memoized per data version (Focus Areas needs it even
+    # when the map itself is closed)
+    page_health_map = {}
+    if not sipara_data.empty:
+        page_health_map = section_memo(
+            df,
+            ('mura_page_health', student_id, selected_sipara, tuple(available_pages)),
+            lambda: murajaat_page_health(sipara_data, available_pages)
+        )
+    
+    if lazy_section("🗺️ Page Performance Map", 'mura_page_map'):
+        if sipara_data.empty:
+            st.warning(f"⚠️ No Murajaat data found for Sipara {selected_sipara}")
+            st.info("Add session data below to see page performance")
+        else:
+            # Display page map - the whole grid as one HTML payload
+            grid_html = section_memo(
+                df,
+                ('mura_page_map', student_id, selected_sipara, tuple(available_pages)),
+                lambda: page_grid_html(page_map_cells(available_pages, page_health_map))
+            )
+            st.markdown(grid_html, unsafe_allow_html=True)
+    
+    st.markdown("<br><br>", unsafe_allow_html=True)
+    
+    # Focus Areas
+    st.markdown('<div class="section-header">🎯 Focus Areas</div>', unsafe_allow_html=True)
+    
+    if not sipara_data.empty:
+        weak_pages = sorted(
+            page_num for page_num, data in page_health_map.items()
+            if data['status'] in ['critical', 'weak']
+        )
+        if weak_pages:
+            weak_card = (f"<strong>Pages needing review:</strong> {', '.join(map(str, weak_pages))}", 'success')
+        else:
+            weak_card = ("No weak pages detected", 'info')
+    else:
+        weak_card = ("No session data available", 'info')
+    
+    sipara_start, sipara_end = sipara_span(selected_sipara)
+    due_here = [
+        (page - sipara_start + 1, due) for page, due in due_pages
+        if sipara_start <= page <= sipara_end
+    ]
+    
+    if due_here:
+        labels = [
+            f"{page_in_sipara} (new)" if not due else f"{page_in_sipara} (since {due})"
+            for page_in_sipara, due in due_here[:5]
+        ]
+        due_body = f"<strong>Review today:</strong> {', '.join(labels)}"
+        if len(due_here) > 5:
+            due_body += f"<br><small>+{len(due_here) - 5} more due in this Sipara</small>"
+        due_card = (due_body, 'warning')
+    else:
+        due_body = "All pages in this Sipara are on schedule"
+        next_due = get_review_queue(student_id, juzhali_length=st.session_state.get('juzhali_length', 10)).next_due()
+        if next_due:
+            next_sipara, next_page = to_sipara_page(int(next_due[0]))
+            due_body += f"<br><small>Next review due: Sipara {next_sipara}, page {next_page} on {next_due[1]}</small>"
+        due_card = (due_body, 'success')
+    
+    st.markdown(focus_cards_html((
+        ("🔴 Weak Pages (Priority Review)",) + weak_card,
+        ("📅 Due for Review (Spaced Repetition)",) + due_card
+    )), unsafe_allow_html=True)
+    
+    st.markdown("<br>", unsafe_allow_html=True)
+    
+    # Technical focus (only for detailed format)
+    if lazy_section("🎯 Technical Focus Areas", 'mura_technical'):
+        murajaat_technical_section(sipara_data)
+    
+    st.markdown("<br>", unsafe_allow_html=True)
+    
+    # Session entry
+    murajaat_session_entry(student_id, selected_sipara, available_pages, due_here)
+
+@timed('section.murajaat_overview')
+def murajaat_overview_section(df, student_id, student_data_df, selected_sipara):
+    """Murajaat timeline chart and statistics for one sipara"""
     
     # Get ALL Murajaat data for THIS SIPARA (for timeline chart)
     timeline_data = df[
@@ -1335,75 +1631,37 @@ def run_murajaat_assistant(student_data_df, student_id):
             # Create line chart
             st.markdown("#### 📈 Sipara Performance Timeline")
             
+            granularity = "Per Session"
             if len(valid_marks) > 1:
-                # Prepare data for chart
-                chart_data = valid_marks[['Date', 'Mark_Numeric', 'Data_Format']].copy()
-                chart_data['Date'] = pd.to_datetime(chart_data['Date'])
-                
-                # Create figure
-                import plotly.graph_objects as go
-                fig = go.Figure()
-                
-                # Add line trace
-                fig.add_trace(go.Scatter(
-                    x=chart_data['Date'],
-                    y=chart_data['Mark_Numeric'],
-                    mode='lines+markers',
-                    name='Performance',
-                    line=dict(color='#3b82f6', width=3),
-                    marker=dict(size=10, color='#3b82f6'),
-                    hovertemplate='<b>Date:</b> %{x|%b %d}<br><b>Mark:</b> %{y}/10<extra></extra>'
-                ))
-                
-                # Add horizontal reference lines
-                fig.add_hline(y=8, line_dash="dash", line_color="green", 
-                             annotation_text="Excellent (8+)", 
-                             annotation_position="bottom right")
-                fig.add_hline(y=6, line_dash="dash", line_color="orange", 
-                             annotation_text="Average (6+)", 
-                             annotation_position="bottom right")
-                fig.add_hline(y=4, line_dash="dash", line_color="red", 
-                             annotation_text="Needs Work", 
-                             annotation_position="bottom right")
-                
-                # Update layout
-                fig.update_layout(
-                    title=f"Sipara {selected_sipara} Performance Over Time",
-                    xaxis_title="Session Date",
-                    yaxis_title="Mark (out of 10)",
-                    yaxis=dict(range=[0, 10.5]),
-                    hovermode='x unified',
-                    template='plotly_white',
-                    height=400
+                granularity = st.radio(
+                    "Timeline view",
+                    ["Per Session", "Weekly", "Monthly"],
+                    index=0 if len(valid_marks) <= RESAMPLE_THRESHOLD else 1,
+                    horizontal=True,
+                    key='mura_timeline_granularity',
+                    label_visibility="collapsed"
                 )
+            
+            if len(valid_marks) > 1 and granularity != "Per Session":
+                # Precomputed weekly/monthly buckets instead of every raw point
+                series = aggregate_series(
+                    get_student_aggregates(student_id, student_data_df),
+                    'W' if granularity == "Weekly" else 'M',
+                    'Murajaat',
+                    selected_sipara
+                )
+                plot_resampled_marks(series, f"Sipara {selected_sipara} - {granularity} Average Mark")
+            
+            elif len(valid_marks) > 1:
+                # Long histories: keep the shape, not every point
+                if len(valid_marks) > MAX_CHART_POINTS:
+                    st.caption(f"Showing {MAX_CHART_POINTS} of {len(valid_marks)} sessions (downsampled)")
                 
-                # Color code markers by data source
-                uploaded_dates = chart_data[chart_data['Data_Format'] == 'upload']['Date']
-                uploaded_marks = chart_data[chart_data['Data_Format'] == 'upload']['Mark_Numeric']
-                
-                session_dates = chart_data[chart_data['Data_Format'] == 'session_entry']['Date']
-                session_marks = chart_data[chart_data['Data_Format'] == 'session_entry']['Mark_Numeric']
-                
-                if not uploaded_dates.empty:
-                    fig.add_trace(go.Scatter(
-                        x=uploaded_dates,
-                        y=uploaded_marks,
-                        mode='markers',
-                        name='📥 Uploaded Data',
-                        marker=dict(size=12, color='#10b981', symbol='square'),
-                        hovertemplate='<b>Uploaded Data</b><br>Date: %{x|%b %d}<br>Mark: %{y}/10<extra></extra>'
-                    ))
-                
-                if not session_dates.empty:
-                    fig.add_trace(go.Scatter(
-                        x=session_dates,
-                        y=session_marks,
-                        mode='markers',
-                        name='✍️ Session Entry',
-                        marker=dict(size=12, color='#f59e0b', symbol='circle'),
-                        hovertemplate='<b>Session Entry</b><br>Date: %{x|%b %d}<br>Mark: %{y}/10<extra></extra>'
-                    ))
-                
+                fig = section_memo(
+                    df,
+                    ('mura_timeline', student_id, selected_sipara),
+                    lambda: murajaat_timeline_figure(valid_marks, selected_sipara)
+                )
                 st.plotly_chart(fig, use_container_width=True)
                 
                 # Data source legend
@@ -1443,13 +1701,86 @@ def run_murajaat_assistant(student_data_df, student_id):
         
         else:
             st.info("No valid marks with dates available for charting.")
+
+
+def murajaat_timeline_figure(valid_marks, selected_sipara):
+    """Per-session mark timeline for one sipara, markers colored by data source"""
+    chart_data = valid_marks[['Date', 'Mark_Numeric', 'Data_Format']].copy()
+    chart_data['Date'] = pd.to_datetime(chart_data['Date'])
+    
+    # Long histories: keep the shape, not every point
+    if len(chart_data) > MAX_CHART_POINTS:
+        chart_data = downsample(chart_data, 'Date', 'Mark_Numeric')
+    
+    # Create figure
+    fig = go.Figure()
+    
+    # Add line trace
+    fig.add_trace(go.Scatter(
+        x=chart_data['Date'],
+        y=chart_data['Mark_Numeric'],
+        mode='lines+markers',
+        name='Performance',
+        line=dict(color='#3b82f6', width=3),
+        marker=dict(size=10, color='#3b82f6'),
+        hovertemplate='<b>Date:</b> %{x|%b %d}<br><b>Mark:</b> %{y}/10<extra></extra>'
+    ))
+    
+    # Add horizontal reference lines
+    fig.add_hline(y=8, line_dash="dash", line_color="green", 
+                 annotation_text="Excellent (8+)", 
+                 annotation_position="bottom right")
+    fig.add_hline(y=6, line_dash="dash", line_color="orange", 
+                 annotation_text="Average (6+)", 
+                 annotation_position="bottom right")
+    fig.add_hline(y=4, line_dash="dash", line_color="red", 
+                 annotation_text="Needs Work", 
+                 annotation_position="bottom right")
+    
+    # Update layout
+    fig.update_layout(
+        title=f"Sipara {selected_sipara} Performance Over Time",
+        xaxis_title="Session Date",
+        yaxis_title="Mark (out of 10)",
+        yaxis=dict(range=[0, 10.5]),
+        hovermode='x unified',
+        template='plotly_white',
+        height=400
+    )
     
-    st.markdown("<br>", unsafe_allow_html=True)
+    # Color code markers by data source
+    uploaded_dates = chart_data[chart_data['Data_Format'] == 'upload']['Date']
+    uploaded_marks = chart_data[chart_data['Data_Format'] == 'upload']['Mark_Numeric']
+    
+    session_dates = chart_data[chart_data['Data_Format'] == 'session_entry']['Date']
+    session_marks = chart_data[chart_data['Data_Format'] == 'session_entry']['Mark_Numeric']
+    
+    if not uploaded_dates.empty:
+        fig.add_trace(go.Scatter(
+            x=uploaded_dates,
+            y=uploaded_marks,
+            mode='markers',
+            name='📥 Uploaded Data',
+            marker=dict(size=12, color='#10b981', symbol='square'),
+            hovertemplate='<b>Uploaded Data</b><br>Date: %{x|%b %d}<br>Mark: %{y}/10<extra></extra>'
+        ))
+    
+    if not session_dates.empty:
+        fig.add_trace(go.Scatter(
+            x=session_dates,
+            y=session_marks,
+            mode='markers',
+            name='✍️ Session Entry',
+            marker=dict(size=12, color='#f59e0b', symbol='circle'),
+            hovertemplate='<b>Session Entry</b><br>Date: %{x|%b %d}<br>Mark: %{y}/10<extra></extra>'
+        ))
+    
+    return fig
 
-     # =========================================================================
-    # 1. 📊 MURAJAAT RETENTION HEALTH SCORE (USES BOTH DATA SOURCES)
-    # =========================================================================
-    st.markdown(f'<div class="section-header">📊 Sipara {selected_sipara} Retention Health</div>', unsafe_allow_html=True)
+
+@timed('section.murajaat_retention')
+def murajaat_retention_section(df, selected_sipara):
+    """Retention health card and mark timeline for one sipara (both data formats)"""
     
     # Get ALL Murajaat data for THIS SIPARA (both uploaded and new entries)
     sipara_all_data = df[
@@ -1556,6 +1887,9 @@ def run_murajaat_assistant(student_data_df, student_id):
                 # Sort by date for timeline
                 timeline_data = valid_marks.sort_values('Date')
                 
+                # Long histories are paged (newest page first) instead of one card per mark
+                timeline_data = paginate(timeline_data, key='mura_timeline_cards_page')
+                
                 # Create simple timeline
                 cols = st.columns(min(5, len(timeline_data)))
                 for idx, (_, mark_row) in enumerate(timeline_data.iterrows()):
@@ -1609,13 +1943,11 @@ def run_murajaat_assistant(student_data_df, student_id):
         2. OR record new sessions with Overall Marks
         3. Both data sources will be combined!
         """)
-    
-    st.markdown("<br>", unsafe_allow_html=True)
-    
-        # =========================================================================
-    # 3. 🔍 MISTAKE PATTERN ANALYSIS - FIXED FOR YOUR COLUMN NAMES
-    # =========================================================================
-    st.markdown('<div class="section-header">🔍 Mistake Pattern Analysis</div>', unsafe_allow_html=True)
+
+
+@timed('section.murajaat_mistakes')
+def murajaat_mistake_section(sipara_data):
+    """Talqeen/Tambeeh totals, ratios and per-page breakdown for one sipara"""
     
     # Check for detailed session data with mistake counts
     # FIX: Look for Mistake_Count and Tambeeh_Count (your actual column names!)
@@ -1830,234 +2162,146 @@ def run_murajaat_assistant(student_data_df, student_id):
         2. Do those rows have Core_Mistake ≠ 'Session_Summary'?
         3. Are Mistake_Count and Tambeeh_Count filled with numbers?
         """)
-    
-    st.markdown("<br>", unsafe_allow_html=True)
 
 
-    # =========================================================================
-    # PAGE PERFORMANCE MAP
-    # =========================================================================
+@timed('section.murajaat_page_health')
+def murajaat_page_health(sipara_data, available_pages):
+    """{page: status/color/text/summary} for the page map and Focus Areas"""
+    # Create page health map
+    page_health_map = {}
     
-    st.markdown('<div class="section-header">🗺️ Page Performance Map</div>', unsafe_allow_html=True)
-    
-    # Check if we have data
-    if sipara_data.empty:
-        st.warning(f"⚠️ No Murajaat data found for Sipara {selected_sipara}")
-        st.info("Add session data below to see page performance")
-    else:
-        # Create page health map
-        page_health_map = {}
-        
-        for page_num in available_pages:
-            page_num_str = str(page_num)
-            
-            # Filter data for this page - CHECK BOTH FORMATS
-            p_data = sipara_data[sipara_data['Page'].astype(str) == page_num_str]
-            
-            if p_data.empty:
-                # No data for this page
-                page_health_map[page_num] = {
-                    "status": "untested", 
-                    "color": "#e5e7eb", 
-                    "text": "#9ca3af", 
-                    "summary": "Not tested"
-                }
-            else:
-                # We have data for this page
-                status = "reviewed"
-                color_code = "#dbeafe"
-                font_color = "#1d4ed8"
-                summary = "Reviewed"
-                
-                # Check for uploaded data grades first
-                uploaded_grades = p_data[p_data['Data_Format'] == 'upload']['Overall_Grade']
-                if not uploaded_grades.empty and not uploaded_grades.isna().all():
-                    try:
-                        avg_grade = float(uploaded_grades.iloc[0])
-                        summary = f"Grade: {avg_grade:.1f}"
-                        
-                        # Apply the same grade-based color logic
-                        if avg_grade >= 8:
-                            status = "good"
-                            color_code = "#d1fae5"
-                            font_color = "#059669"
-                        elif avg_grade >= 7:
-                            status = "weak"
-                            color_code = "#fef3c7"
-                            font_color = "#d97706"
-                        else:  # avg_grade < 7
-                            status = "critical"
-                            color_code = "#fee2e2"
-                            font_color = "#dc2626"
-                    except:
-                        pass
-                
-                # ✅ CORRECTED: Check for detailed data mistakes with GRADE CALCULATION
-                elif 'Mistake_Count' in p_data.columns and 'Tambeeh_Count' in p_data.columns:
-                    detailed_data = p_data[p_data['Data_Format'] == 'session_entry']
-                    if not detailed_data.empty:
-                        talqeen_sum = detailed_data['Mistake_Count'].sum()
-                        tambeeh_sum = detailed_data['Tambeeh_Count'].sum()
-                        
-                        # Calculate grade based on your rules
-                        calculated_grade = 10 - (talqeen_sum * 1) - (tambeeh_sum * 0.5)
-                        
-                        # Format summary
-                        summary = f"{int(talqeen_sum)}T/{int(tambeeh_sum)}H"
-                        
-                        # Determine color based on calculated grade
-                        if calculated_grade >= 8:
-                            status = "good"
-                            color_code = "#d1fae5"
-                            font_color = "#059669"
-                            summary = f"{summary} ({calculated_grade:.1f})"
-                        elif calculated_grade >= 7:
-                            status = "weak"
-                            color_code = "#fef3c7"
-                            font_color = "#d97706"
-                            summary = f"{summary} ({calculated_grade:.1f})"
-                        else:  # calculated_grade < 7
-                            status = "critical"
-                            color_code = "#fee2e2"
-                            font_color = "#dc2626"
-                            summary = f"{summary} ({calculated_grade:.1f})"
-                
-                page_health_map[page_num] = {
-                    "status": status, 
-                    "color": color_code, 
-                    "text": font_color, 
-                    "summary": summary
-                }
+    for page_num in available_pages:
+        page_num_str = str(page_num)
         
-        # Display page map
-        num_cols = 5
-        num_rows = (len(available_pages) + num_cols - 1) // num_cols
+        # Filter data for this page - CHECK BOTH FORMATS
+        p_data = sipara_data[sipara_data['Page'].astype(str) == page_num_str]
         
-        for row_idx in range(num_rows):
-            cols = st.columns(num_cols)
-            for col_idx in range(num_cols):
-                page_idx = row_idx * num_cols + col_idx
-                if page_idx >= len(available_pages):
-                    break
-                
-                page_num = available_pages[page_idx]
-                data = page_health_map[page_num]
-                
-                with cols[col_idx]:
-                    st.markdown(f"""
-                    <div class="page-box" style="background-color: {data['color']}; 
-                                                border: 2px solid {data['text']};
-                                                padding: 10px;
-                                                border-radius: 8px;
-                                                text-align: center;
-                                                margin-bottom: 10px;
-                                                min-height: 80px;
-                                                display: flex;
-                                                flex-direction: column;
-                                                justify-content: center;">
-                        <div style="color: {data['text']}; font-size: 1.2em; font-weight: bold;">
-                            Page {page_num}
-                        </div>
-                        <div style="color: {data['text']}; font-size: 0.85em; margin-top: 5px;">
-                            {data['summary']}
-                        </div>
-                    </div>
-                    """, unsafe_allow_html=True)
-    
-    st.markdown("<br><br>", unsafe_allow_html=True)
+        if p_data.empty:
+            # No data for this page
+            page_health_map[page_num] = {
+                "status": "untested", 
+                "color": "#e5e7eb", 
+                "text": "#9ca3af", 
+                "summary": "Not tested"
+            }
+        else:
+            # We have data for this page
+            status = "reviewed"
+            color_code = "#dbeafe"
+            font_color = "#1d4ed8"
+            summary = "Reviewed"
+            
+            # Check for uploaded data grades first
+            uploaded_grades = p_data[p_data['Data_Format'] == 'upload']['Overall_Grade']
+            if not uploaded_grades.empty and not uploaded_grades.isna().all():
+                try:
+                    avg_grade = float(uploaded_grades.iloc[0])
+                    summary = f"Grade: {avg_grade:.1f}"
+                    
+                    # Apply the same grade-based color logic
+                    if avg_grade >= 8:
+                        status = "good"
+                        color_code = "#d1fae5"
+                        font_color = "#059669"
+                    elif avg_grade >= 7:
+                        status = "weak"
+                        color_code = "#fef3c7"
+                        font_color = "#d97706"
+                    else:  # avg_grade < 7
+                        status = "critical"
+                        color_code = "#fee2e2"
+                        font_color = "#dc2626"
+                except:
+                    pass
+            
+            # ✅ CORRECTED: Check for detailed data mistakes with GRADE CALCULATION
+            elif 'Mistake_Count' in p_data.columns and 'Tambeeh_Count' in p_data.columns:
+                detailed_data = p_data[p_data['Data_Format'] == 'session_entry']
+                if not detailed_data.empty:
+                    talqeen_sum = detailed_data['Mistake_Count'].sum()
+                    tambeeh_sum = detailed_data['Tambeeh_Count'].sum()
+                    
+                    # Calculate grade based on your rules
+                    calculated_grade = 10 - (talqeen_sum * 1) - (tambeeh_sum * 0.5)
+                    
+                    # Format summary
+                    summary = f"{int(talqeen_sum)}T/{int(tambeeh_sum)}H"
+                    
+                    # Determine color based on calculated grade
+                    if calculated_grade >= 8:
+                        status = "good"
+                        color_code = "#d1fae5"
+                        font_color = "#059669"
+                        summary = f"{summary} ({calculated_grade:.1f})"
+                    elif calculated_grade >= 7:
+                        status = "weak"
+                        color_code = "#fef3c7"
+                        font_color = "#d97706"
+                        summary = f"{summary} ({calculated_grade:.1f})"
+                    else:  # calculated_grade < 7
+                        status = "critical"
+                        color_code = "#fee2e2"
+                        font_color = "#dc2626"
+                        summary = f"{summary} ({calculated_grade:.1f})"
+            
+            page_health_map[page_num] = {
+                "status": status, 
+                "color": color_code, 
+                "text": font_color, 
+                "summary": summary
+            }
     
-    # Focus Areas
-    st.markdown('<div class="section-header">🎯 Focus Areas</div>', unsafe_allow_html=True)
+    return page_health_map
+
+@timed('section.murajaat_technical')
+def murajaat_technical_section(sipara_data):
+    """Most frequent Makharij and Ahkaam mistakes for one sipara"""
+    detailed_data = sipara_data[sipara_data['Data_Format'] == 'session_entry']
+    if detailed_data.empty or 'Core_Mistake' not in detailed_data.columns:
+        st.info("📭 Technical focus needs detailed session entries for this Sipara")
+        return
     
     col1, col2 = st.columns(2)
     
     with col1:
-        st.markdown("**🔴 Weak Pages (Priority Review)**")
-        
-        if not sipara_data.empty:
-            weak_pages = []
-            for page_num, data in page_health_map.items():
-                if data['status'] in ['critical', 'weak']:
-                    weak_pages.append(page_num)
-            
-            if weak_pages:
-                st.success(f"**Pages needing review:** {', '.join(map(str, sorted(weak_pages)))}")
-            else:
-                st.info("No weak pages detected")
+        st.markdown("**🗣️ Makharij to Watch**")
+        makh = detailed_data[detailed_data['Core_Mistake'] == 'Makharij']['Specific_Mistake'].value_counts().head(3)
+        if not makh.empty:
+            for letter, count in makh.items():
+                st.markdown(f"""
+                <div style="background: #dbeafe; padding: 10px; border-radius: 8px; 
+                            margin: 5px 0; border-left: 3px solid #3b82f6;">
+                    <strong style="color: #1e40af;">{letter}</strong>
+                    <span style="color: #1e3a8a;"> • {int(count)} errors</span>
+                </div>
+                """, unsafe_allow_html=True)
         else:
-            st.info("No session data available")
+            st.success("✅ No Makharij issues recorded")
     
     with col2:
-        st.markdown("**🕸️ Neglected Pages (Review Soon)**")
-        
-        if not sipara_data.empty and 'Date' in sipara_data.columns:
-            # Simple logic: pages without recent data
-            recent_pages = []
-            try:
-                sipara_data['Date'] = pd.to_datetime(sipara_data['Date'])
-                recent_date = sipara_data['Date'].max()
-                
-                for page_num in available_pages:
-                    page_data = sipara_data[sipara_data['Page'].astype(str) == str(page_num)]
-                    if not page_data.empty:
-                        page_latest = page_data['Date'].max()
-                        if (recent_date - page_latest).days <= 7:
-                            recent_pages.append(page_num)
-            except:
-                recent_pages = []
-            
-            neglected = sorted([p for p in available_pages if p not in recent_pages])
-            
-            if neglected:
-                st.warning(f"**Pages not reviewed recently:** {', '.join(map(str, neglected[:5]))}")
-            else:
-                st.success("All pages reviewed recently")
+        st.markdown("**📏 Ahkaam to Watch**")
+        taj = detailed_data[detailed_data['Core_Mistake'] == 'Tajweed']['Specific_Mistake'].value_counts().head(3)
+        if not taj.empty:
+            for rule, count in taj.items():
+                st.markdown(f"""
+                <div style="background: #dbeafe; padding: 10px; border-radius: 8px; 
+                            margin: 5px 0; border-left: 3px solid #3b82f6;">
+                    <strong style="color: #1e40af;">{rule}</strong>
+                    <span style="color: #1e3a8a;"> • {int(count)} errors</span>
+                </div>
+                """, unsafe_allow_html=True)
         else:
-            st.info("No date data available")
-    
-    st.markdown("<br>", unsafe_allow_html=True)
-    
-    # Rest of the function continues...
-    
-    # Technical focus (only for detailed format)
-    detailed_data = sipara_data[sipara_data['Data_Format'] == 'session_entry']
-    if not detailed_data.empty and 'Core_Mistake' in detailed_data.columns:
-        st.markdown('<div class="section-header">🎯 Technical Focus Areas</div>', unsafe_allow_html=True)
-        
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            st.markdown("**🗣️ Makharij to Watch**")
-            makh = detailed_data[detailed_data['Core_Mistake'] == 'Makharij']['Specific_Mistake'].value_counts().head(3)
-            if not makh.empty:
-                for letter, count in makh.items():
-                    st.markdown(f"""
-                    <div style="background: #dbeafe; padding: 10px; border-radius: 8px; 
-                                margin: 5px 0; border-left: 3px solid #3b82f6;">
-                        <strong style="color: #1e40af;">{letter}</strong>
-                        <span style="color: #1e3a8a;"> • {int(count)} errors</span>
-                    </div>
-                    """, unsafe_allow_html=True)
-            else:
-                st.success("✅ No Makharij issues recorded")
-        
-        with col2:
-            st.markdown("**📏 Ahkaam to Watch**")
-            taj = detailed_data[detailed_data['Core_Mistake'] == 'Tajweed']['Specific_Mistake'].value_counts().head(3)
-            if not taj.empty:
-                for rule, count in taj.items():
-                    st.markdown(f"""
-                    <div style="background: #dbeafe; padding: 10px; border-radius: 8px; 
-                                margin: 5px 0; border-left: 3px solid #3b82f6;">
-                        <strong style="color: #1e40af;">{rule}</strong>
-                        <span style="color: #1e3a8a;"> • {int(count)} errors</span>
-                    </div>
-                    """, unsafe_allow_html=True)
-            else:
-                st.success("✅ No Tajweed issues recorded")
-        
-        st.markdown("<br>", unsafe_allow_html=True)
-    
+            st.success("✅ No Tajweed issues recorded")
+
+MURAJAAT_SUGGESTED_PAGES = 5   # overdue pages pre-selected in the entry form
+
+@st.fragment
+@timed('section.murajaat_entry')
+def murajaat_session_entry(student_id, selected_sipara, available_pages, due_here):
+    """
+    Murajaat recording workflow. Runs as a fragment: picking pages and
+    entering mistakes only reruns this function, not the analytics above.
+    """
     st.markdown('<div class="section-header">📝 Record New Session</div>', unsafe_allow_html=True)
     
     with st.form(key='murajaat_session_form'):
@@ -2069,10 +2313,16 @@ def run_murajaat_assistant(student_data_df, student_id):
         
         st.markdown("---")
         
+        page_options = [str(p) for p in available_pages]
+        # Only reviewed pages that are overdue (never-reviewed pages are
+        # always due and would select the whole sipara), most overdue first
+        suggested_pages = [str(p) for p, due in due_here if due and str(p) in page_options]
+        
         selected_pages = st.multiselect(
             "📄 Select Pages Tested (in order)", 
-            options=[str(p) for p in available_pages],
-            help="Choose pages you reviewed in this session"
+            options=page_options,
+            default=suggested_pages[:MURAJAAT_SUGGESTED_PAGES],
+            help=f"Up to {MURAJAAT_SUGGESTED_PAGES} of the most overdue reviewed pages are pre-selected"
         )
         
         start_entry = st.form_submit_button("✅ Start Recording Mistakes", type="primary", use_container_width=True)
@@ -2246,10 +2496,12 @@ def run_murajaat_assistant(student_data_df, student_id):
         # =========================================================================
         if st.button("💾 Submit Complete Session", type="primary", use_container_width=True):
             # Save logic
+            sheets_ledger.set_action("submit Murajaat")
             try:
-                from database import append_new_session
+                from database import append_new_sessions
                 
-                # Save individual page entries
+                # Individual page entries + the overall session, saved with one append
+                entries = []
                 for page_num, page_data in st.session_state.mura_page_entries.items():
                     session_data = {
                         'date': st.session_state.mura_session_date,
@@ -2263,8 +2515,7 @@ def run_murajaat_assistant(student_data_df, student_id):
                         'notes': f"Page {page_num} - {st.session_state.mura_session_notes}" if st.session_state.mura_session_notes else f"Page {page_num}"
                     }
                     
-                    # Save each page entry
-                    append_new_session(student_id, st.session_state.mura_session_type, session_data)
+                    entries.append((st.session_state.mura_session_type, session_data))
                 
                 # ✅ Save OVERALL SESSION with mark
                 overall_session_data = {
@@ -2279,7 +2530,13 @@ def run_murajaat_assistant(student_data_df, student_id):
                     'notes': st.session_state.mura_session_notes or "Murajaat session completed"
                 }
                 
-                append_new_session(student_id, st.session_state.mura_session_type, overall_session_data)
+                entries.append((st.session_state.mura_session_type, overall_session_data))
+                
+                if not append_new_sessions(student_id, entries, owner=write_owner()):
+                    st.error("❌ Failed to save session. Please try again.")
+                    return
+                
+                flash_save_notice(f"✅ Successfully recorded Murajaat session for {len(st.session_state.mura_selected_pages)} pages with mark: {st.session_state.mura_overall_mark}/10!")
                 
                 # Reset session state
                 st.session_state.mura_session_started = False
@@ -2287,14 +2544,7 @@ def run_murajaat_assistant(student_data_df, student_id):
                 st.session_state.mura_overall_mark = None
                 st.session_state.mura_session_notes = None
                 
-                st.success(f"✅ Successfully recorded Murajaat session for {len(st.session_state.mura_selected_pages)} pages with mark: {st.session_state.mura_overall_mark}/10!")
-                st.balloons()
-                
-                # Auto-refresh
-                import time
-                with st.spinner("Refreshing in 3 seconds..."):
-                    time.sleep(3)
-                
+                # The saved rows are already in the cached data - no reload needed
                 st.rerun()
                 
             except Exception as e:
@@ -2308,6 +2558,7 @@ def run_murajaat_assistant(student_data_df, student_id):
 # JUZHALI ASSISTANT FUNCTION - UPDATED WITH OVERALL GRADE
 # =========================================================================
 
+@timed('section.juzhali_assistant')
 def run_juzhali_assistant(student_data_df, student_id):
     """Juzhali assistant for rolling page revision"""
     
@@ -2356,11 +2607,11 @@ def run_juzhali_assistant(student_data_df, student_id):
         st.session_state.juzhali_length = 10
     
     # Calculate range
-    juzhali_end = last_jadeed_page
-    juzhali_start = max(1, juzhali_end - st.session_state.juzhali_length + 1)
+    juzhali_pages = get_juzhali_pages(last_jadeed_page, st.session_state.juzhali_length)
+    juzhali_start, juzhali_end = juzhali_pages.first(), juzhali_pages.last()
     
     # FIX 1: Define page_range_list here
-    page_range_list = list(range(juzhali_start, juzhali_end + 1))
+    page_range_list = list(juzhali_pages)
     
     # Display current range
     col1, col2 = st.columns([3, 1])
@@ -2435,8 +2686,109 @@ def run_juzhali_assistant(student_data_df, student_id):
         (temp_data['Page_Numeric'] <= juzhali_end)
     ].copy()
     
-    # Health Score - NEW LOGIC WITH GRAPHS
-    st.markdown("### 📊 Juzhali Retention Health")
+    # Health Score - charts only run when the section is opened
+    if lazy_section("📊 Juzhali Retention Health", 'juz_retention'):
+        juzhali_retention_section(temp_data, student_id, student_data_df, last_jadeed_page)
+    
+    st.markdown("<br>", unsafe_allow_html=True)
+    
+    # Page performance map
+    st.markdown('<div class="section-header">🗺️ Page Performance Map</div>', unsafe_allow_html=True)
+    st.markdown(f"""
+    <p style="text-align: center; color: #6b7280; font-size: 1.1em;">
+        Performance overview of Pages {juzhali_start} - {juzhali_end}
+    </p>
+    """, unsafe_allow_html=True)
+    
+    # Debug: Check how many pages we have
+    st.info(f"📊 Displaying {len(page_range_list)} pages: {page_range_list[0]} to {page_range_list[-1]}")
+    
+    # The grid is built once per data version and range - the whole grid as one HTML payload
+    grid_html = section_memo(
+        df,
+        ('juz_page_map', student_id, juzhali_start, juzhali_end),
+        lambda: page_grid_html(page_map_cells(page_range_list, juzhali_page_health(juzhali_data, page_range_list)))
+    )
+    st.markdown(grid_html, unsafe_allow_html=True)
+    
+    st.markdown("<br><br>", unsafe_allow_html=True)
+    
+
+    
+    # Session entry
+    juzhali_session_entry(student_id, juzhali_start, juzhali_end, page_range_list)
+
+@timed('section.juzhali_page_health')
+def juzhali_page_health(juzhali_data, page_range_list):
+    """{page: color/text/summary} for the Juzhali page map"""
+    page_health_map = {}
+    
+    for page_num in page_range_list:
+        p_data = juzhali_data[juzhali_data['Page_Numeric'] == page_num]
+        
+        if p_data.empty:
+            page_health_map[page_num] = {
+                "color": "#e5e7eb",
+                "text": "#9ca3af",
+                "summary": "Not tested"
+            }
+        else:
+            color_code = "#dbeafe"
+            font_color = "#1d4ed8"
+            summary = "Reviewed"
+            
+            if 'Mistake_Count' in p_data.columns and 'Tambeeh_Count' in p_data.columns:
+                detailed_data = p_data[p_data['Data_Format'] == 'session_entry']
+                if not detailed_data.empty:
+                    talqeen_sum = detailed_data['Mistake_Count'].sum()
+                    tambeeh_sum = detailed_data['Tambeeh_Count'].sum()
+                    calculated_grade = 10 - (talqeen_sum * 1) - (tambeeh_sum * 0.5)
+                    
+                    if talqeen_sum > 0 or tambeeh_sum > 0:
+                        summary = f"{int(talqeen_sum)}T/{int(tambeeh_sum)}H ({calculated_grade:.1f})"
+                    else:
+                        summary = f"Perfect! ({calculated_grade:.1f})"
+                    
+                    if calculated_grade >= 8:
+                        color_code = "#d1fae5"
+                        font_color = "#059669"
+                    elif calculated_grade >= 7:
+                        color_code = "#fef3c7"
+                        font_color = "#d97706"
+                    else:
+                        color_code = "#fee2e2"
+                        font_color = "#dc2626"
+            
+            elif 'Overall_Grade' in p_data.columns:
+                uploaded_grades = p_data[p_data['Data_Format'] == 'upload']['Overall_Grade']
+                if not uploaded_grades.empty and not uploaded_grades.isna().all():
+                    try:
+                        avg_grade = float(uploaded_grades.iloc[0])
+                        summary = f"Grade: {avg_grade:.1f}"
+                        
+                        if avg_grade >= 8:
+                            color_code = "#d1fae5"
+                            font_color = "#059669"
+                        elif avg_grade >= 7:
+                            color_code = "#fef3c7"
+                            font_color = "#d97706"
+                        else:
+                            color_code = "#fee2e2"
+                            font_color = "#dc2626"
+                    except:
+                        pass
+            
+            page_health_map[page_num] = {
+                "color": color_code,
+                "text": font_color,
+                "summary": summary
+            }
+    
+    return page_health_map
+
+@timed('section.juzhali_retention')
+def juzhali_retention_section(temp_data, student_id, student_data_df, last_jadeed_page):
+    """Latest grade, trend, grade distribution and next range for Juzhali"""
     
     # Get ALL Juzhali Session_Summary entries (not filtered by page range!)
     all_juzhali_grades = temp_data[
@@ -2461,17 +2813,28 @@ def run_juzhali_assistant(student_data_df, student_id):
         all_juzhali_grades['Grade_Score'] = all_juzhali_grades['Overall_Grade'].map(grade_map)
         
         if len(all_juzhali_grades) > 1:
-            fig = px.line(all_juzhali_grades, x='Date', y='Grade_Score',
-                          title='Juzhali Retention Trend',
-                          markers=True,
-                          labels={'Grade_Score': 'Grade Level', 'Date': 'Test Date'})
-            
-            # Add horizontal lines for grade levels
-            fig.add_hline(y=4, line_dash="dash", line_color="green", annotation_text="جيد جدا")
-            fig.add_hline(y=3, line_dash="dash", line_color="blue", annotation_text="جيد")
-            fig.add_hline(y=2, line_dash="dash", line_color="orange", annotation_text="متوسط")
-            fig.add_hline(y=1, line_dash="dash", line_color="red", annotation_text="ضعيف")
-            
+            granularity = st.radio(
+                "Trend view",
+                ["Per Session", "Weekly", "Monthly"],
+                index=0 if len(all_juzhali_grades) <= RESAMPLE_THRESHOLD else 1,
+                horizontal=True,
+                key='juz_trend_granularity',
+                label_visibility="collapsed"
+            )
+        
+        if len(all_juzhali_grades) > 1 and granularity != "Per Session":
+            series = aggregate_series(
+                get_student_aggregates(student_id, student_data_df),
+                'W' if granularity == "Weekly" else 'M',
+                'Juzhali'
+            )
+            plot_resampled_marks(series, f"Juzhali {granularity} Average Grade (جيد جدا = 10, جيد = 8, متوسط = 6, ضعيف = 4)")
+        elif len(all_juzhali_grades) > 1:
+            fig = section_memo(
+                temp_data,
+                ('juz_trend', student_id),
+                lambda: juzhali_trend_figure(all_juzhali_grades)
+            )
             st.plotly_chart(fig, use_container_width=True)
         else:
             st.info("📊 *Record more sessions to see the trend chart*")
@@ -2485,16 +2848,20 @@ def run_juzhali_assistant(student_data_df, student_id):
         
         with col1:
             # Pie chart
-            fig2 = px.pie(values=grade_counts.values, 
-                         names=grade_counts.index,
-                         title='Grade Distribution',
-                         color=grade_counts.index,
-                         color_discrete_map={
-                             'جيد جدا': '#10b981',
-                             'جيد': '#3b82f6', 
-                             'متوسط': '#f59e0b',
-                             'ضعيف': '#ef4444'
-                         })
+            fig2 = section_memo(
+                temp_data,
+                ('juz_grade_pie', student_id),
+                lambda: px.pie(values=grade_counts.values, 
+                               names=grade_counts.index,
+                               title='Grade Distribution',
+                               color=grade_counts.index,
+                               color_discrete_map={
+                                   'جيد جدا': '#10b981',
+                                   'جيد': '#3b82f6', 
+                                   'متوسط': '#f59e0b',
+                                   'ضعيف': '#ef4444'
+                               })
+            )
             st.plotly_chart(fig2, use_container_width=True)
         
         with col2:
@@ -2519,11 +2886,10 @@ def run_juzhali_assistant(student_data_df, student_id):
         # 4. WHAT TO TEST NEXT
         st.markdown("#### 📅 What to Test Next")
         
-        # Get last Jadeed page
-        last_jadeed = get_last_jadeed_page(df)
+        # Reuse the last Jadeed page looked up above
+        last_jadeed = last_jadeed_page
         if last_jadeed:
-            next_juzhali_start = max(1, last_jadeed - 9)
-            next_juzhali_end = last_jadeed
+            next_juzhali_start, next_juzhali_end = calculate_juzhali_range(last_jadeed, st.session_state.juzhali_length)
             
             col1, col2, col3 = st.columns(3)
             
@@ -2561,123 +2927,29 @@ def run_juzhali_assistant(student_data_df, student_id):
         
         **The Overall Grade (جيد جدا/جيد/متوسط/ضعيف) IS the retention measurement!**
         """)
-    
-    st.markdown("<br>", unsafe_allow_html=True)
-    
-    # Page performance map
-    st.markdown('<div class="section-header">🗺️ Page Performance Map</div>', unsafe_allow_html=True)
-    st.markdown(f"""
-    <p style="text-align: center; color: #6b7280; font-size: 1.1em;">
-        Performance overview of Pages {juzhali_start} - {juzhali_end}
-    </p>
-    """, unsafe_allow_html=True)
-    
-    # Debug: Check how many pages we have
-    st.info(f"📊 Displaying {len(page_range_list)} pages: {page_range_list[0]} to {page_range_list[-1]}")
-    
-    page_health_map = {}
-    
-    for page_num in page_range_list:
-        p_data = juzhali_data[juzhali_data['Page_Numeric'] == page_num]
-        
-        if p_data.empty:
-            page_health_map[page_num] = {
-                "color": "#e5e7eb",
-                "text": "#9ca3af",
-                "summary": "Not tested"
-            }
-        else:
-            color_code = "#dbeafe"
-            font_color = "#1d4ed8"
-            summary = "Reviewed"
-            
-            if 'Mistake_Count' in p_data.columns and 'Tambeeh_Count' in p_data.columns:
-                detailed_data = p_data[p_data['Data_Format'] == 'session_entry']
-                if not detailed_data.empty:
-                    talqeen_sum = detailed_data['Mistake_Count'].sum()
-                    tambeeh_sum = detailed_data['Tambeeh_Count'].sum()
-                    calculated_grade = 10 - (talqeen_sum * 1) - (tambeeh_sum * 0.5)
-                    
-                    if talqeen_sum > 0 or tambeeh_sum > 0:
-                        summary = f"{int(talqeen_sum)}T/{int(tambeeh_sum)}H ({calculated_grade:.1f})"
-                    else:
-                        summary = f"Perfect! ({calculated_grade:.1f})"
-                    
-                    if calculated_grade >= 8:
-                        color_code = "#d1fae5"
-                        font_color = "#059669"
-                    elif calculated_grade >= 7:
-                        color_code = "#fef3c7"
-                        font_color = "#d97706"
-                    else:
-                        color_code = "#fee2e2"
-                        font_color = "#dc2626"
-            
-            elif 'Overall_Grade' in p_data.columns:
-                uploaded_grades = p_data[p_data['Data_Format'] == 'upload']['Overall_Grade']
-                if not uploaded_grades.empty and not uploaded_grades.isna().all():
-                    try:
-                        avg_grade = float(uploaded_grades.iloc[0])
-                        summary = f"Grade: {avg_grade:.1f}"
-                        
-                        if avg_grade >= 8:
-                            color_code = "#d1fae5"
-                            font_color = "#059669"
-                        elif avg_grade >= 7:
-                            color_code = "#fef3c7"
-                            font_color = "#d97706"
-                        else:
-                            color_code = "#fee2e2"
-                            font_color = "#dc2626"
-                    except:
-                        pass
-            
-            page_health_map[page_num] = {
-                "color": color_code,
-                "text": font_color,
-                "summary": summary
-            }
-    
-    # SINGLE DISPLAY LOOP - NO DUPLICATES!
-    num_cols = 5
-    num_rows = (len(page_range_list) + num_cols - 1) // num_cols
-    
-    for row_idx in range(num_rows):
-        cols = st.columns(num_cols)
-        for col_idx in range(num_cols):
-            page_idx = row_idx * num_cols + col_idx
-            if page_idx >= len(page_range_list):
-                break
-            
-            page_num = page_range_list[page_idx]
-            data = page_health_map[page_num]
-            
-            with cols[col_idx]:
-                st.markdown(f"""
-                <div class="page-box" style="background-color: {data['color']}; 
-                                            border: 2px solid {data['text']};
-                                            padding: 10px;
-                                            border-radius: 8px;
-                                            text-align: center;
-                                            margin-bottom: 10px;
-                                            min-height: 80px;
-                                            display: flex;
-                                            flex-direction: column;
-                                            justify-content: center;">
-                    <div style="color: {data['text']}; font-size: 1.2em; font-weight: bold;">
-                        Page {page_num}
-                    </div>
-                    <div style="color: {data['text']}; font-size: 0.85em; margin-top: 5px;">
-                        {data['summary']}
-                    </div>
-                </div>
-                """, unsafe_allow_html=True)
-    
-    st.markdown("<br><br>", unsafe_allow_html=True)
-    
 
-    
-    # Session entry
+def juzhali_trend_figure(all_juzhali_grades):
+    """Per-session Juzhali grade line with the four grade levels marked"""
+    trend_data = downsample(all_juzhali_grades.dropna(subset=['Grade_Score']), 'Date', 'Grade_Score')
+    fig = px.line(trend_data, x='Date', y='Grade_Score',
+                  title='Juzhali Retention Trend',
+                  markers=True,
+                  labels={'Grade_Score': 'Grade Level', 'Date': 'Test Date'})
+    
+    # Add horizontal lines for grade levels
+    fig.add_hline(y=4, line_dash="dash", line_color="green", annotation_text="جيد جدا")
+    fig.add_hline(y=3, line_dash="dash", line_color="blue", annotation_text="جيد")
+    fig.add_hline(y=2, line_dash="dash", line_color="orange", annotation_text="متوسط")
+    fig.add_hline(y=1, line_dash="dash", line_color="red", annotation_text="ضعيف")
+    return fig
+
+@st.fragment
+@timed('section.juzhali_entry')
+def juzhali_session_entry(student_id, juzhali_start, juzhali_end, page_range_list):
+    """
+    Juzhali recording workflow. Runs as a fragment so per-page entry
+    doesn't rerun the page map and trend charts.
+    """
     st.markdown('<div class="section-header">📝 Record New Session</div>', unsafe_allow_html=True)
     
     with st.form(key='juzhali_session_form'):
@@ -2859,10 +3131,12 @@ def run_juzhali_assistant(student_data_df, student_id):
         # =========================================================================
         if st.button("💾 Submit Complete Session", type="primary", use_container_width=True):
             # Save logic here - including overall grade
+            sheets_ledger.set_action("submit Juzhali")
             try:
-                from database import append_new_session
+                from database import append_new_sessions
                 
-                # Save individual page entries
+                # Individual page entries + the overall session, saved with one append
+                entries = []
                 for page_num, page_data in st.session_state.juz_page_entries.items():
                     session_data = {
                         'date': st.session_state.juz_session_date,
@@ -2876,8 +3150,7 @@ def run_juzhali_assistant(student_data_df, student_id):
                         'notes': f"Page {page_num} - {st.session_state.juz_session_notes}" if st.session_state.juz_session_notes else f"Page {page_num}"
                     }
                     
-                    # Save each page entry
-                    append_new_session(student_id, 'Juzhali', session_data)
+                    entries.append(('Juzhali', session_data))
                 
                 # Save OVERALL SESSION with grade
                 overall_session_data = {
@@ -2892,7 +3165,16 @@ def run_juzhali_assistant(student_data_df, student_id):
                     'notes': st.session_state.juz_session_notes or "Juzhali session completed"
                 }
                 
-                append_new_session(student_id, 'Juzhali', overall_session_data)
+                entries.append(('Juzhali', overall_session_data))
+                
+                if not append_new_sessions(student_id, entries, owner=write_owner()):
+                    st.error("❌ Failed to save session. Please try again.")
+                    return
+                
+                flash_save_notice(
+                    f"✅ Successfully recorded session for {len(st.session_state.juz_selected_pages)} pages with overall grade: {overall_grade}! "
+                    f"🔗 Next Jadeed will automatically start from Page {juzhali_end + 1}"
+                )
                 
                 # Reset session state
                 st.session_state.juz_session_started = False
@@ -2900,21 +3182,7 @@ def run_juzhali_assistant(student_data_df, student_id):
                 st.session_state.juz_overall_grade = None
                 st.session_state.juz_session_notes = None
                 
-                st.success(f"✅ Successfully recorded session for {len(st.session_state.juz_selected_pages)} pages with overall grade: {overall_grade}!")
-                st.markdown(f"""
-                <div class="success-section">
-                    <p style="margin: 0; text-align: center;">
-                        🔗 Next Jadeed will automatically start from Page <strong>{juzhali_end + 1}</strong>
-                    </p>
-                </div>
-                """, unsafe_allow_html=True)
-                st.balloons()
-                
-                # Auto-refresh after 3 seconds
-                import time
-                with st.spinner("Refreshing in 3 seconds..."):
-                    time.sleep(3)
-                
+                # The saved rows are already in the cached data - no reload needed
                 st.rerun()
                 
             except Exception as e:
@@ -2928,10 +3196,11 @@ def run_juzhali_assistant(student_data_df, student_id):
 # JADEED ASSISTANT FUNCTION
 # =========================================================================
 
+@timed('section.jadeed_assistant')
 def run_jadeed_assistant(student_data_df, student_id):
     """Jadeed assistant for new Hifz learning sessions"""
     
-    from database import get_last_jadeed_page
+    from database import get_last_jadeed_position
     
     if student_data_df is None or student_data_df.empty:
         st.error("❌ No student data available.")
@@ -3127,8 +3396,8 @@ def run_jadeed_assistant(student_data_df, student_id):
     # Session Entry Form
     st.markdown('<div class="section-header">📝 Record New Jadeed Session</div>', unsafe_allow_html=True)
     
-    # Get last Jadeed page
-    jadeed_last_page = get_last_jadeed_page(df)
+    # Get last Jadeed page (and where in it the student stopped)
+    jadeed_last_page, jadeed_last_ayah = get_last_jadeed_position(df)
     
     if jadeed_last_page is None:
         jadeed_start_page = 1
@@ -3145,7 +3414,7 @@ def run_jadeed_assistant(student_data_df, student_id):
         <div class="success-section">
             <p style="margin: 0; text-align: center;">
                 🔗 <strong>Auto-continuing from Page {jadeed_start_page}</strong> 
-                (Last Jadeed: Page {jadeed_last_page})
+                (Last Jadeed: Page {jadeed_last_page}{f", Ayah {jadeed_last_ayah}" if jadeed_last_ayah else ""})
             </p>
         </div>
         """, unsafe_allow_html=True)
@@ -3165,7 +3434,7 @@ def run_jadeed_assistant(student_data_df, student_id):
         <div style="background: #f3f4f6; padding: 15px; border-radius: 10px; margin-bottom: 15px;">
             <h4 style="margin: 0 0 10px 0; color: #374151;">📖 Page Range</h4>
             <p style="margin: 0; color: #6b7280;">
-                <strong>Starting Page:</strong> {jadeed_start_page} (Auto-set)<br>
+                <strong>Starting Page:</strong> {jadeed_start_page} (Auto-set, Sipara {page_to_juz(min(jadeed_start_page, TOTAL_PAGES))})<br>
                 <strong>Enter your ending position below:</strong>
             </p>
         </div>
@@ -3175,16 +3444,16 @@ def run_jadeed_assistant(student_data_df, student_id):
         with col1:
             end_page = st.number_input(
                 "Ending Page",
-                min_value=jadeed_start_page,
-                max_value=604,
-                value=jadeed_start_page,
+                min_value=min(jadeed_start_page, TOTAL_PAGES),
+                max_value=TOTAL_PAGES,
+                value=min(jadeed_start_page, TOTAL_PAGES),
                 help="Last page you reached in this session"
             )
         with col2:
             end_ayah = st.number_input(
                 "Ending Ayah",
                 min_value=1,
-                max_value=286,
+                max_value=MAX_AYAH_COUNT,
                 value=10,
                 help="Ayah number on the ending page"
             )
@@ -3227,7 +3496,7 @@ def run_jadeed_assistant(student_data_df, student_id):
             ayahs_completed = st.number_input(
                 "Additional Ayahs",
                 min_value=0,
-                max_value=286,
+                max_value=MAX_AYAH_COUNT,
                 value=0,
                 step=1,
                 help="Extra ayahs beyond complete pages"
@@ -3295,6 +3564,11 @@ def run_jadeed_assistant(student_data_df, student_id):
         
         progress_str = " + ".join(progress_parts)
         
+        if end_ayah > page_max_ayah(end_page):
+            first_surah, last_surah = page_surahs(end_page)
+            st.error(f"⚠️ Ayah {end_ayah} is not on Page {end_page} (Surah {first_surah}-{last_surah}: max Ayah {page_max_ayah(end_page)}).")
+            st.stop()
+        
         # Prepare session data
         session_data = {
             'date': session_date,
@@ -3313,48 +3587,23 @@ def run_jadeed_assistant(student_data_df, student_id):
         
         # Save to database
         try:
-            from database import append_new_session, get_all_student_sessions
+            from database import append_new_session
             student_id = st.session_state.selected_student_id
             
             if student_id is None:
                 st.error("❌ No student selected. Please select a student first.")
                 st.stop()
             
-            success = append_new_session(student_id, 'Jadeed', session_data)
+            sheets_ledger.set_action("submit Jadeed")
+            success = append_new_session(student_id, 'Jadeed', session_data, owner=write_owner())
             
             if success:
-                st.markdown("""
-                <div class="success-section" style="text-align: center; padding: 30px;">
-                    <h2 style="color: #059669; margin: 0 0 15px 0;">✅ Session Saved Successfully!</h2>
-                    <p style="color: #047857; margin: 0; font-size: 1.1em;">
-                        Your progress has been recorded and connected to the Juzhali system.
-                    </p>
-                </div>
-                """, unsafe_allow_html=True)
-                
-                # Reload data
-                new_data = get_all_student_sessions(student_id)
-                st.session_state.student_data_df = new_data
-                
-                # Show next steps
-                st.markdown(f"""
-                <div class="info-section">
-                    <h3 style="margin: 0 0 10px 0;">🔗 What's Next?</h3>
-                    <p style="margin: 0;">
-                        ✨ Your next Jadeed session will start from <strong>Page {end_page + 1}</strong><br>
-                        🔄 Juzhali range will update automatically<br>
-                        📊 Check Analytics Dashboard for updated progress
-                    </p>
-                </div>
-                """, unsafe_allow_html=True)
-                
-                st.balloons()
-                
-                # Auto-refresh after 3 seconds
-                import time
-                with st.spinner("Refreshing in 3 seconds..."):
-                    time.sleep(3)
-                
+                # The saved row is already in the cached data and snapshot -
+                # rerun straight away instead of reloading the sheet
+                flash_save_notice(
+                    f"✅ Session Saved Successfully! ✨ Your next Jadeed session will start from Page {end_page + 1} "
+                    f"and the Juzhali range has been updated."
+                )
                 st.rerun()
             else:
                 st.error("❌ Failed to save session. Please try again.")
@@ -3362,6 +3611,220 @@ def run_jadeed_assistant(student_data_df, student_id):
         except Exception as e:
             st.error(f"❌ Error saving session: {str(e)}")
 # =========================================================================
+# CLASS AGENDA (ALL STUDENTS OF A TEACHER)
+# =========================================================================
+
+@timed('section.class_agenda')
+def run_class_agenda():
+    """Today's Jadeed / Juzhali / Murajaat agenda for a whole class"""
+    st.markdown("""
+    <div style="text-align: center; padding: 30px 0;">
+        <h1 style="color: #3b82f6; font-size: 3em; margin: 0;"> 
+            👩‍🏫 Class Agenda
+        </h1>
+        <p style="color: #1f2937; font-size: 1.2em; margin-top: 10px;">
+            What every student should recite today • One view for the whole class
+        </p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    students = get_students_table()
+    if students.empty:
+        st.info("📭 No students found. Upload a student file to begin.")
+        return
+    
+    teachers = sorted(students['teacher_name'].astype(str).unique()) if 'teacher_name' in students.columns else []
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        teacher = st.selectbox("👩‍🏫 Teacher", ["All Teachers"] + teachers)
+    with col2:
+        agenda_date = st.date_input("📅 Date", datetime.now().date())
+    
+    if teacher != "All Teachers":
+        students = students[students['teacher_name'].astype(str) == teacher]
+    
+    # One read of the sessions sheet + one read of the snapshots for everyone
+    all_sessions = get_all_sessions()
+    juzhali_length = st.session_state.get('juzhali_length', 10)
+    agenda = build_class_agenda(
+        students,
+        all_sessions,
+        get_class_states(all_sessions, students['id'], juzhali_length),
+        juzhali_length,
+        agenda_date.strftime('%Y-%m-%d')
+    )
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("👥 Students", len(agenda))
+    with col2:
+        st.metric("📅 Murajaat Pages Due", int(agenda['murajaat_due'].sum()))
+    with col3:
+        st.metric("⚠️ No Session Yet", int(agenda['last_session'].isna().sum()))
+    
+    st.markdown('<div class="section-header">📋 Today\'s Agenda</div>', unsafe_allow_html=True)
+    
+    st.dataframe(
+        agenda.drop(columns=['student_id']),
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            'name': 'Student',
+            'teacher_name': 'Teacher',
+            'last_session': 'Last Session',
+            'last_jadeed_page': 'Last Jadeed',
+            'last_jadeed_ayah': 'Ayah',
+            'next_jadeed_page': '✨ Jadeed From',
+            'juzhali_start': '🔄 Juzhali From',
+            'juzhali_end': '🔄 Juzhali To',
+            'murajaat_due': '🤖 Murajaat Due',
+            'due_pages': 'Due Pages (Sipara:Page)'
+        }
+    )
+    
+    # Grade drops for the whole class in one list
+    drops = get_regressions()
+    drops = drops[drops['student_id'].isin(agenda['student_id'])]
+    
+    st.markdown('<div class="section-header">🚨 Grade Drops</div>', unsafe_allow_html=True)
+    
+    if drops.empty:
+        st.success("✅ No sudden grade drops detected")
+    else:
+        names = dict(zip(agenda['student_id'], agenda['name']))
+        drops = drops.assign(
+            student=drops['student_id'].map(names),
+            where=np.where(
+                drops['level'] == 'sipara',
+                'Sipara ' + drops['sipara'].astype(str),
+                'Page ' + drops['page'].astype('Int64').astype(str)
+            )
+        )
+        st.dataframe(
+            drops[['student', 'where', 'date', 'recall', 'baseline', 'z_score']],
+            hide_index=True,
+            use_container_width=True,
+            column_config={
+                'student': 'Student',
+                'where': 'Where',
+                'date': 'Date',
+                'recall': st.column_config.NumberColumn('Latest', format="%.2f"),
+                'baseline': st.column_config.NumberColumn('Usual', format="%.2f"),
+                'z_score': 'Severity (z)'
+            }
+        )
+
+# =========================================================================
+# COHORT DASHBOARD (ALL STUDENTS)
+# =========================================================================
+
+@timed('section.cohort_dashboard')
+def run_cohort_dashboard():
+    """Health, pace and weak siparas across every student, per teacher"""
+    st.markdown("""
+    <div style="text-align: center; padding: 30px 0;">
+        <h1 style="color: #8b5cf6; font-size: 3em; margin: 0;"> 
+            🏫 Cohort Dashboard
+        </h1>
+        <p style="color: #1f2937; font-size: 1.2em; margin-top: 10px;">
+            Monitor every class at a glance • One data load for all students
+        </p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    students = get_students_table()
+    if students.empty:
+        st.info("📭 No students found. Upload a student file to begin.")
+        return
+    
+    # One load of the sessions sheet, grouped by student (cached per data version)
+    all_sessions = get_all_sessions()
+    summary = build_cohort_summary(students, all_sessions, get_session_page_facts(all_sessions))
+    
+    teachers = sorted(summary['teacher_name'].unique())
+    selected_teachers = st.multiselect("👩‍🏫 Teachers", teachers, default=teachers)
+    summary = summary[summary['teacher_name'].isin(selected_teachers)]
+    
+    if summary.empty:
+        st.warning("Select at least one teacher")
+        return
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("👥 Students", len(summary))
+    with col2:
+        avg_health = summary['murajaat_health'].mean()
+        st.metric("💪 Avg Murajaat Health", f"{avg_health:.0f}%" if pd.notna(avg_health) else "N/A")
+    with col3:
+        st.metric("✨ Avg Pace", f"{summary['pages_per_week'].mean():.1f} pages/week")
+    with col4:
+        st.metric("⏰ Inactive 7+ Days", int((summary['days_inactive'].fillna(9999) >= 7).sum()))
+    
+    st.markdown("<br>", unsafe_allow_html=True)
+    
+    # Health distributions per teacher
+    st.markdown('<div class="section-header">💪 Health Distribution by Teacher</div>', unsafe_allow_html=True)
+    
+    band_colors = {
+        'Critical': '#dc2626', 'Needs Attention': '#f59e0b',
+        'Good': '#3b82f6', 'Excellent': '#10b981', 'No Data': '#9ca3af'
+    }
+    
+    col1, col2 = st.columns(2)
+    for col, band_column, title in [
+        (col1, 'murajaat_band', 'Murajaat Health'),
+        (col2, 'juzhali_band', 'Juzhali Health')
+    ]:
+        with col:
+            distribution = health_distribution(summary, band_column)
+            fig = go.Figure([
+                go.Bar(name=band, x=distribution.index, y=distribution[band], marker_color=band_colors[band])
+                for band in distribution.columns
+            ])
+            fig.update_layout(barmode='stack', title=title, height=350, yaxis_title='Students')
+            st.plotly_chart(fig, use_container_width=True)
+    
+    # Weak siparas across the cohort
+    st.markdown('<div class="section-header">⚠️ Weakest Siparas (Cohort)</div>', unsafe_allow_html=True)
+    
+    weak = cohort_weak_siparas(get_session_page_facts(all_sessions), summary['student_id'])
+    if weak.empty:
+        st.success("✅ No Murajaat Talqeen recorded")
+    else:
+        for row in weak.itertuples():
+            st.markdown(f"""
+            <div style="background: #fee2e2; padding: 10px; border-radius: 8px; margin: 5px 0; border-left: 4px solid #dc2626;">
+                <strong>Sipara {row.sipara}:</strong> {int(row.talqeen)} Talqeen mistakes across {row.students} student{'s' if row.students != 1 else ''}
+            </div>
+            """, unsafe_allow_html=True)
+    
+    st.markdown("<br>", unsafe_allow_html=True)
+    
+    # Per-student table
+    st.markdown('<div class="section-header">📋 Students</div>', unsafe_allow_html=True)
+    
+    st.dataframe(
+        summary[[
+            'name', 'teacher_name', 'murajaat_health', 'juzhali_health', 'progress',
+            'pages_per_week', 'weakest_sipara', 'sessions', 'days_inactive'
+        ]].sort_values('murajaat_health'),
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            'name': 'Student',
+            'teacher_name': 'Teacher',
+            'murajaat_health': st.column_config.NumberColumn('Murajaat Health', format="%.0f%%"),
+            'juzhali_health': st.column_config.NumberColumn('Juzhali Health', format="%.0f%%"),
+            'progress': st.column_config.ProgressColumn('Quran Progress', format="%.1f%%", min_value=0, max_value=100),
+            'pages_per_week': 'Pages/Week',
+            'weakest_sipara': 'Weakest Sipara',
+            'sessions': 'Sessions',
+            'days_inactive': 'Days Inactive'
+        }
+    )
+
+# =========================================================================
 # DATA STATUS & HELP FUNCTIONS
 # =========================================================================
 
@@ -3434,6 +3897,7 @@ def display_data_status_badge(student_id):
             </div>
             """, unsafe_allow_html=True)
 
+@timed('section.help')
 def run_help_section():
     """Help and templates page"""
     
@@ -3567,14 +4031,14 @@ def run_help_section():
         st.markdown("""
         <div style="padding: 15px;">
             <p style="color: #374151; line-height: 1.8; margin: 0;">
-                The Quran is divided into <strong>30 Siparas (Juz)</strong>. Each Sipara contains 
-                <strong>20 pages</strong>, making a total of <strong>604 pages</strong>.
+                The Quran is divided into <strong>30 Siparas (Juz)</strong>. Most Siparas contain 
+                <strong>20 pages</strong> (Sipara 1 has 21, Sipara 30 has 23), making a total of <strong>604 pages</strong>.
             </p>
             <div style="background: #f3f4f6; padding: 15px; border-radius: 8px; margin-top: 15px;">
                 <p style="color: #1f2937; margin: 0;">
-                    📚 <strong>Sipara 1:</strong> Pages 1-20<br>
-                    📚 <strong>Sipara 2:</strong> Pages 21-40<br>
-                    📚 <strong>Sipara 3:</strong> Pages 41-60<br>
+                    📚 <strong>Sipara 1:</strong> Pages 1-21<br>
+                    📚 <strong>Sipara 2:</strong> Pages 22-41<br>
+                    📚 <strong>Sipara 3:</strong> Pages 42-61<br>
                     <em style="color: #6b7280;">...and so on until Sipara 30</em>
                 </p>
             </div>
@@ -3680,6 +4144,13 @@ def main():
     if not check_access_code():
         st.stop()  # Don't run the rest if access code is wrong
     
+    # Sheets calls from here on are charged to the section being viewed
+    # (saves, uploads and student changes relabel them below)
+    sheets_ledger.set_action(f"view {st.session_state.get('nav_radio_main', 'app')}")
+    
+    # Connect to Sheets only once the access code is accepted
+    init_session_state()
+    
     # ✅ ACCESS GRANTED - Show the main app
     st.sidebar.title("📚 Hifz Tracker System")
     # ... rest of your existing code continues here
@@ -3751,29 +4222,20 @@ def main():
                         st.sidebar.success("📊 Format Detected: **Detailed (Full Tracking)**")
                     
                     try:
-                        student_id = save_student_from_excel(parsed_data)
+                        # The upload runs on the background writer; the sync
+                        # status panel selects the student once it commits
+                        sheets_ledger.set_action("upload Excel")
+                        job = save_student_from_excel_in_background(parsed_data, owner=write_owner())
+                        st.session_state.pending_upload = {
+                            'job_id': job.id,
+                            'student_name': parsed_data['student_info']['Student_Name'].iloc[0]
+                        }
+                        st.session_state.last_uploaded_file = file_key
+                        st.sidebar.info("⏳ Uploading in the background - you can keep working")
                         
-                        if student_id:
-                            student_name = parsed_data['student_info']['Student_Name'].iloc[0]
-                            st.sidebar.success(f"✅ **{student_name}** loaded successfully!")
-            
-                            st.session_state.last_uploaded_file = file_key
-                            st.session_state.selected_student_id = student_id
-                            st.rerun()
-                        else:
-                            st.sidebar.error("❌ Failed to save data - student_id is None")
-                            st.sidebar.write("Debug: Check database.py save_student_from_excel function")
-                            
-                            st.sidebar.write("🔍 Testing Google Sheets connection...")
-                            from database import get_google_sheet
-                            test_sheet = get_google_sheet()
-                            if test_sheet:
-                                st.sidebar.success("✅ Google Sheets connected!")
-                                st.sidebar.write(f"Sheet name: {test_sheet.title}")
-                            else:
-                                st.sidebar.error("❌ Google Sheets connection FAILED!")
-                                st.sidebar.write("Check your secrets.toml file!")
-                                
+                    except ValueError as e:
+                        # Checked here, before anything is queued
+                        st.sidebar.error(f"❌ {e}")
                     except Exception as e:
                         st.sidebar.error(f"❌ Save Error: {str(e)}")
                         import traceback
@@ -3819,6 +4281,8 @@ def main():
         )
         
         selected_id = all_students[selected_name]
+        if selected_id != st.session_state.selected_student_id:
+            sheets_ledger.set_action("select student")
         st.session_state.selected_student_id = selected_id
         
         # Load data
@@ -3826,6 +4290,10 @@ def main():
             all_data = get_all_student_sessions(selected_id)
             st.session_state.student_data_df = all_data
             
+            # One small record instead of recomputing from every session row
+            student_state = get_student_state(selected_id, all_data, st.session_state.get('juzhali_length', 10))
+            st.session_state.student_state = student_state
+            
             # Student profile with better styling
             st.sidebar.markdown("---")
             st.sidebar.markdown(f"""
@@ -3871,7 +4339,7 @@ def main():
                     """, unsafe_allow_html=True)
             
             # Last Jadeed page
-            last_jadeed = get_last_jadeed_page(all_data)
+            last_jadeed = student_state.get('last_jadeed_page')
             if last_jadeed:
                 st.sidebar.markdown(f"""
                 <div style="background: rgba(16, 185, 129, 0.2); 
@@ -3961,6 +4429,8 @@ def main():
             "🤖 Murajaat Assistant",
             "🔄 Juzhali Assistant",
             "✨ Jadeed Assistant",
+            "👩‍🏫 Class Agenda",
+            "🏫 Cohort Dashboard",
             "📝 Help & Templates"
         ],
         key='nav_radio_main'
@@ -3968,6 +4438,15 @@ def main():
     
     st.sidebar.markdown("---")
     
+    # Background Sheets writes for this session
+    with st.sidebar:
+        write_status_panel()
+    
+    # Hand edits in the sheet don't change its row count - reload on request
+    if st.sidebar.button("🔄 Reload from Sheets", use_container_width=True, key='reload_sheets'):
+        refresh_data()
+        st.rerun()
+    
     # Footer
     st.sidebar.markdown("""
     <div style="background: rgba(255, 255, 255, 0.1); 
@@ -3983,7 +4462,7 @@ def main():
     """, unsafe_allow_html=True)
     
     # Main content routing (rest of the function remains the same)
-    if not st.session_state.selected_student_id and app_mode != "📝 Help & Templates":
+    if not st.session_state.selected_student_id and app_mode not in ["📝 Help & Templates", "👩‍🏫 Class Agenda", "🏫 Cohort Dashboard"]:
         st.markdown("""
         <div style="text-align: center; padding: 60px 20px;">
             <h1 style="color: #1f2937; font-size: 2.5em;">👋 Welcome to Hifz Tracker!</h1>
@@ -4000,10 +4479,13 @@ def main():
         """, unsafe_allow_html=True)
     else:
         # Show data status
-        if app_mode != "📝 Help & Templates" and st.session_state.selected_student_id:
+        if app_mode not in ["📝 Help & Templates", "👩‍🏫 Class Agenda", "🏫 Cohort Dashboard"] and st.session_state.selected_student_id:
             display_data_status_badge(st.session_state.selected_student_id)
             st.markdown("<br>", unsafe_allow_html=True)
         
+        # Confirmation from a save made on the previous run
+        show_save_notice()
+        
         # Route to sections
         if app_mode == "📊 Analytics Dashboard":
             if st.session_state.selected_student_id is not None:
@@ -4029,15 +4511,26 @@ def main():
             else:
                 st.error("❌ No data loaded")
 
+        elif app_mode == "👩‍🏫 Class Agenda":
+            run_class_agenda()
+
+        elif app_mode == "🏫 Cohort Dashboard":
+            run_cohort_dashboard()
+
         elif app_mode == "📝 Help & Templates":
             run_help_section()
+    
+    if profiler_enabled():
+        profiler_panel()
+        sheets_ledger_panel()
 
 # =========================================================================
 # APPLICATION ENTRY POINT
 # =========================================================================
 
 if __name__ == "__main__":
-    main()
+    with profiler.page_run():
+        main()
 
 # =========================================================================
 # END OF APPLICATION - CLEAN VERSION COMPLETE! 🎉
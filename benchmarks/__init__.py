@@ -0,0 +1,11 @@
+# ============================================================================
+# benchmarks - SYNTHETIC DATA AND PERFORMANCE BENCHMARKS
+# ============================================================================
+# Run from the repository root, e.g.:
+#
+#   python -m benchmarks.bench_analytics                 # 1k / 100k / 1M rows
+#   python -m benchmarks.bench_analytics --sizes 1000 --no-record
+#   python -m benchmarks.bench_ingestion                 # 100 -> 100k rows per sheet
+#
+# Results are appended to benchmarks/results.jsonl (one line per run, with
+# the git revision) and compared with the last run of another revision.
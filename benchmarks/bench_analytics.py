@@ -0,0 +1,91 @@
+# ============================================================================
+# FILE: benchmarks/bench_analytics.py - ANALYTICS MICRO-BENCHMARKS
+# ============================================================================
+# Times the analytics hot paths on synthetic sessions at 1k / 100k / 1M rows:
+#
+# - get_all_student_sessions post-processing (records -> standardized frame,
+#   against the in-memory Sheets stand-in, so no network time is included)
+# - calculate_jadeed_progress and get_murajaat_available_pages (app.py)
+# - grade mapping: grade_to_numeric per row vs grades_to_numeric
+# - health: page facts, then the cohort health summary and band counts
+#
+# Usage: python -m benchmarks.bench_analytics [--sizes 1000 100000] [--repeat 3] [--no-record]
+
+import argparse
+import gc
+import logging
+import sys
+
+import pandas as pd
+
+# app.py's st.* calls warn on every call outside `streamlit run`
+logging.disable(logging.WARNING)
+
+import app  # bare mode: main() does not run
+import database
+from benchmarks import harness, local_sheets
+from benchmarks.synthetic_data import SESSION_COLUMNS, STUDENT_COLUMNS, make_school
+from cohort import build_cohort_summary, health_distribution
+from excel_handler import grade_to_numeric, grades_to_numeric
+from page_facts import explode_sessions
+
+SUITE = 'analytics'
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+
+
+def benchmarks_for(rows, repeat):
+    """{benchmark: measurement} for one school of `rows` session rows"""
+    students, session_rows = make_school(rows)
+    spreadsheet = local_sheets.install({
+        'students': [STUDENT_COLUMNS] + students.astype(str).values.tolist(),
+        'sessions': [SESSION_COLUMNS] + session_rows
+    })
+    del session_rows
+    gc.collect()
+
+    # Decode the sheet once, as gspread would have by the time we get it
+    records = spreadsheet.worksheet('sessions').get_all_records()
+    sessions = database.standardize_sessions(pd.DataFrame(records))
+    busiest = int(sessions['student_id'].value_counts().idxmax())
+    facts = explode_sessions(sessions)
+
+    cases = {
+        'get_all_student_sessions': lambda: database.get_all_student_sessions(busiest, refresh=True),
+        'calculate_jadeed_progress': lambda: app.calculate_jadeed_progress(sessions),
+        'get_murajaat_available_pages': lambda: app.get_murajaat_available_pages(sessions),
+        'grade_to_numeric (per row)': lambda: sessions['Overall_Grade'].map(grade_to_numeric),
+        'grades_to_numeric': lambda: grades_to_numeric(sessions['Overall_Grade']),
+        'explode_sessions (page facts)': lambda: explode_sessions(sessions),
+        'cohort health': lambda: health_distribution(build_cohort_summary(students, sessions, facts)),
+    }
+    results = {}
+    for name, fn in cases.items():
+        results[name] = harness.measure(fn, repeat=repeat)
+        results[name]['rows_per_second'] = rows / results[name]['best']
+        print(f"  {name}: {results[name]['best'] * 1000:.1f}ms", file=sys.stderr)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analytics micro-benchmarks on synthetic sessions")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--no-record', action='store_true', help="don't append to results.jsonl")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for rows in args.sizes:
+        print(f"⏱️ {harness.size_label(rows)} rows...", file=sys.stderr)
+        for name, measurement in benchmarks_for(rows, args.repeat).items():
+            results.setdefault(name, {})[harness.size_label(rows)] = measurement
+        gc.collect()
+
+    baseline = harness.previous_run(SUITE, harness.git_revision())
+    harness.report(results, baseline)
+    if not args.no_record:
+        harness.record(SUITE, results)
+        print(f"\n✅ Recorded in {harness.RESULTS_PATH}")
+
+
+if __name__ == '__main__':
+    main()
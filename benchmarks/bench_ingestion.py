@@ -0,0 +1,102 @@
+# ============================================================================
+# FILE: benchmarks/bench_ingestion.py - EXCEL PARSE AND UPLOAD BENCHMARKS
+# ============================================================================
+# Generates upload workbooks (create_sample_excel_template layout) from 100
+# to 100k rows per session sheet, in both formats, and measures:
+#
+# - parse_excel_file: time and tracemalloc peak memory
+# - save_student_from_excel: rows/s building and writing the session rows,
+#   page facts and snapshot into the in-memory Sheets stand-in (plus the
+#   number of Sheets calls the upload makes)
+#
+# Usage: python -m benchmarks.bench_ingestion [--sizes 100 1000] [--formats upload] [--repeat 3] [--no-record]
+
+import argparse
+import gc
+import logging
+import sys
+from io import BytesIO
+
+# save_student_from_excel reports progress with st.sidebar.* calls, which
+# warn on every call outside `streamlit run`
+logging.disable(logging.WARNING)
+
+import database
+import sheets_ledger
+from benchmarks import harness, local_sheets
+from benchmarks.synthetic_data import make_workbook
+from excel_handler import parse_excel_file
+
+SUITE = 'ingestion'
+DEFAULT_SIZES = [100, 1_000, 10_000, 100_000]
+FORMATS = ['upload', 'session_entry']
+
+# Large workbooks take a while to parse - fewer repeats from this size on
+SLOW_ROWS = 10_000
+
+
+def benchmarks_for(rows, data_format, repeat):
+    """{benchmark: measurement} for one workbook size and format"""
+    workbook = make_workbook(rows, data_format)
+    session_rows = 3 * rows
+    repeat = 1 if rows >= SLOW_ROWS else repeat
+
+    parse = harness.measure(
+        lambda: parse_excel_file(BytesIO(workbook)),
+        repeat=repeat, warmup=rows < SLOW_ROWS, trace_memory=True
+    )
+    parse['rows_per_second'] = session_rows / parse['best']
+    parse['workbook_kb'] = len(workbook) / 1024
+
+    parsed = parse_excel_file(BytesIO(workbook))
+    if parsed.get('error'):
+        raise RuntimeError(parsed['error'])
+
+    def fresh_sheet():
+        local_sheets.install()
+        sheets_ledger.reset()
+
+    save = harness.measure(
+        lambda: database.save_student_from_excel(parsed),
+        repeat=repeat, warmup=rows < SLOW_ROWS, setup=fresh_sheet
+    )
+    save['rows_per_second'] = session_rows / save['best']
+    save['sheets_calls'] = len(sheets_ledger.ledger_frame())
+
+    print(
+        f"  parse {parse['best']:.2f}s ({parse['peak_mb']:.0f}MB peak), "
+        f"save {save['best']:.2f}s ({save['rows_per_second']:,.0f} rows/s)",
+        file=sys.stderr
+    )
+    return {
+        f'parse_excel_file [{data_format}]': parse,
+        f'save_student_from_excel [{data_format}]': save
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Excel parse and upload benchmarks")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help="rows per session sheet")
+    parser.add_argument('--formats', nargs='+', choices=FORMATS, default=FORMATS)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--no-record', action='store_true', help="don't append to results.jsonl")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for data_format in args.formats:
+        for rows in args.sizes:
+            print(f"⏱️ {data_format}: {harness.size_label(rows)} rows per sheet...", file=sys.stderr)
+            for name, measurement in benchmarks_for(rows, data_format, args.repeat).items():
+                results.setdefault(name, {})[harness.size_label(rows)] = measurement
+            gc.collect()
+
+    baseline = harness.previous_run(SUITE, harness.git_revision())
+    harness.report(results, baseline)
+    if not args.no_record:
+        harness.record(SUITE, results)
+        print(f"\n✅ Recorded in {harness.RESULTS_PATH}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+# ============================================================================
+# FILE: benchmarks/harness.py - TIMING, RECORDING AND COMPARISON
+# ============================================================================
+# measure() times a callable (best and mean of `repeat` runs, after one
+# warm-up); record() appends a suite's results to results.jsonl with the
+# git revision; report() compares a run with previous_run() (the last run
+# recorded at another revision).
+
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+RESULTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results.jsonl')
+
+
+def measure(fn, repeat=3, warmup=True, trace_memory=False, setup=None):
+    """
+    Time fn() `repeat` times. Returns {'best', 'mean', 'runs'} in seconds,
+    plus 'peak_mb' (tracemalloc peak of one extra run) when trace_memory.
+    setup(), if given, runs untimed before every call (e.g. a fresh sheet).
+    """
+    setup = setup or (lambda: None)
+    if warmup:
+        setup()
+        fn()
+    runs = []
+    for _ in range(repeat):
+        setup()
+        started = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - started)
+    result = {'best': min(runs), 'mean': sum(runs) / len(runs), 'runs': runs}
+
+    if trace_memory:
+        setup()
+        tracemalloc.start()
+        try:
+            fn()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        result['peak_mb'] = peak / (1024 * 1024)
+    return result
+
+
+def size_label(rows):
+    """1000 -> '1k', 1000000 -> '1M'"""
+    if rows >= 1_000_000 and rows % 1_000_000 == 0:
+        return f"{rows // 1_000_000}M"
+    if rows >= 1_000 and rows % 1_000 == 0:
+        return f"{rows // 1_000}k"
+    return str(rows)
+
+
+def git_revision():
+    """Short hash of HEAD (with '+dirty' for uncommitted or untracked files), or 'unknown'"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        revision = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=root,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ['git', 'status', '--porcelain'], cwd=root,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+        return revision + ('+dirty' if dirty else '')
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'machine': platform.machine()
+    }
+
+
+def record(suite, results, path=RESULTS_PATH):
+    """Append one run ({benchmark: {size: measurement}}) to the results file"""
+    entry = {
+        'suite': suite,
+        'revision': git_revision(),
+        'recorded_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'environment': environment(),
+        'results': results
+    }
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+    return entry
+
+
+def previous_run(suite, revision, path=RESULTS_PATH):
+    """Latest recorded run of `suite` made at a different revision (or None)"""
+    if not os.path.exists(path):
+        return None
+    latest = None
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            entry = json.loads(line)
+            if entry['suite'] == suite and entry['revision'] != revision:
+                latest = entry
+    return latest
+
+
+def _format_seconds(seconds):
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.0f}µs"
+    if seconds < 1:
+        return f"{seconds * 1e3:.1f}ms"
+    return f"{seconds:.2f}s"
+
+
+def report(results, baseline=None):
+    """Print results as a table, with the change against a baseline run"""
+    base = baseline['results'] if baseline else {}
+    if baseline:
+        print(f"(compared with {baseline['revision']} from {baseline['recorded_at']})")
+    for name, sizes in results.items():
+        print(f"\n{name}")
+        for size, measurement in sizes.items():
+            line = f"  {size:>10}  best {_format_seconds(measurement['best']):>9}"
+            line += f"  mean {_format_seconds(measurement['mean']):>9}"
+            for extra, unit in [('peak_mb', 'MB peak'), ('rows_per_second', 'rows/s'),
+                                ('sheets_calls', 'Sheets calls')]:
+                if extra in measurement:
+                    line += f"  {measurement[extra]:,.1f} {unit}"
+            before = base.get(name, {}).get(size)
+            if before:
+                line += f"  ({measurement['best'] / before['best']:.2f}x vs baseline)"
+            print(line)
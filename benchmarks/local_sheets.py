@@ -0,0 +1,177 @@
+# ============================================================================
+# FILE: benchmarks/local_sheets.py - IN-MEMORY GOOGLE SHEETS STAND-IN
+# ============================================================================
+# Just enough of the gspread Spreadsheet / Worksheet API for database.py to
+# run without the network, so benchmarks time our own code rather than
+# Google's. Values are stored as the sheet would return them (strings in,
+# gspread.utils.numericise out of get_all_records).
+#
+# install() points database.get_google_sheet at a fresh stand-in (wrapped
+# by sheets_ledger, so calls are counted the same way as in production).
+
+import re
+
+import database
+import sheets_ledger
+from lazy_imports import lazy_module
+
+gspread = lazy_module('gspread')
+
+
+def _cell(value):
+    return '' if value is None else str(value)
+
+
+def _column_index(letters):
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - 64
+    return index - 1
+
+
+def _cell_value(cell_data):
+    """batch_update CellData -> the string the sheet would hold"""
+    value = cell_data.get('userEnteredValue', {})
+    if 'numberValue' in value:
+        number = value['numberValue']
+        return str(int(number)) if float(number).is_integer() else str(number)
+    if 'boolValue' in value:
+        return str(value['boolValue']).upper()
+    return _cell(value.get('stringValue'))
+
+
+class LocalWorksheet:
+    """One worksheet held as a list of string rows"""
+
+    def __init__(self, title, rows=None, sheet_id=0):
+        self.id = sheet_id
+        self.title = title
+        self.rows = [[_cell(v) for v in row] for row in (rows or [])]
+        self.col_count = max((len(row) for row in self.rows), default=0)
+        self._records = None
+
+    def _changed(self):
+        self._records = None
+
+    def get_all_values(self):
+        return [list(row) for row in self.rows]
+
+    def get_all_records(self):
+        # Decoded once per change - the stand-in has no network to time
+        if self._records is None:
+            headers = self.rows[0] if self.rows else []
+            self._records = [
+                {
+                    header: gspread.utils.numericise(row[i] if i < len(row) else '')
+                    for i, header in enumerate(headers)
+                }
+                for row in self.rows[1:]
+            ]
+        return self._records
+
+    def col_values(self, col):
+        return [row[col - 1] for row in self.rows if len(row) >= col and row[col - 1] != '']
+
+    def row_values(self, row):
+        return list(self.rows[row - 1]) if row <= len(self.rows) else []
+
+    def append_row(self, values, **kwargs):
+        self.append_rows([values])
+
+    def append_rows(self, values, **kwargs):
+        self.rows.extend([_cell(v) for v in row] for row in values)
+        self._changed()
+
+    def update(self, range_name, values=None, **kwargs):
+        if isinstance(range_name, list):
+            range_name, values = values, range_name
+        match = re.match(r'([A-Z]+)(\d+)', range_name)
+        first_col, first_row = _column_index(match.group(1)), int(match.group(2)) - 1
+        for offset, new_values in enumerate(values):
+            while len(self.rows) <= first_row + offset:
+                self.rows.append([])
+            row = self.rows[first_row + offset]
+            while len(row) < first_col + len(new_values):
+                row.append('')
+            for i, value in enumerate(new_values):
+                row[first_col + i] = _cell(value)
+        self._changed()
+
+    def batch_update(self, data, **kwargs):
+        for update in data:
+            self.update(update['range'], update['values'])
+
+    def add_cols(self, count):
+        self.col_count += count
+
+    @property
+    def row_count(self):
+        return len(self.rows)
+
+    def resize(self, rows=None, cols=None):
+        if rows is not None:
+            self.rows = self.rows[:rows] + [[] for _ in range(rows - len(self.rows))]
+        if cols is not None:
+            self.col_count = cols
+        self._changed()
+
+    def clear(self):
+        self.rows = []
+        self._changed()
+
+
+class LocalSpreadsheet:
+    """Worksheets by title"""
+
+    title = 'Local stand-in'
+
+    def __init__(self):
+        self.sheets = {}
+
+    def worksheets(self):
+        return list(self.sheets.values())
+
+    def worksheet(self, title):
+        if title not in self.sheets:
+            raise KeyError(f"No worksheet named {title}")
+        return self.sheets[title]
+
+    def add_worksheet(self, title, rows=1000, cols=26):
+        self.sheets[title] = LocalWorksheet(title, sheet_id=len(self.sheets))
+        return self.sheets[title]
+
+    def batch_update(self, body):
+        """appendCells / updateCells requests (the ones database.py sends)"""
+        by_id = {sheet.id: sheet for sheet in self.sheets.values()}
+        for request in body['requests']:
+            if 'appendCells' in request:
+                spec = request['appendCells']
+                by_id[spec['sheetId']].append_rows(
+                    [[_cell_value(cell) for cell in row['values']] for row in spec['rows']]
+                )
+            elif 'updateCells' in request:
+                spec = request['updateCells']
+                start = spec['start']
+                by_id[start['sheetId']].update(
+                    f"A{start['rowIndex'] + 1}",
+                    [[_cell_value(cell) for cell in row['values']] for row in spec['rows']]
+                )
+        return {'replies': [{} for _ in body['requests']]}
+
+
+def install(sheets=None):
+    """
+    Route database.py to a new stand-in, create the app's worksheets
+    (init_db) and load `sheets` ({title: rows incl. header}) into it.
+    Returns the stand-in.
+    """
+    spreadsheet = LocalSpreadsheet()
+    database.get_google_sheet = lambda: sheets_ledger.track(spreadsheet)
+    database._state_rows['rows'] = None
+    database._remote_rows.update(count=None, checked_at=0.0)
+    database.init_db()
+    for title, rows in (sheets or {}).items():
+        sheet_id = spreadsheet.sheets[title].id if title in spreadsheet.sheets else len(spreadsheet.sheets)
+        spreadsheet.sheets[title] = LocalWorksheet(title, rows, sheet_id)
+    database.bump_data_version()
+    return spreadsheet
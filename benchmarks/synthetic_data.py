@@ -0,0 +1,265 @@
+# ============================================================================
+# FILE: benchmarks/synthetic_data.py - REALISTIC SYNTHETIC SCHOOLS
+# ============================================================================
+# N students x years of daily Jadeed / Juzhali / Murajaat sessions, shaped
+# like the rows this app writes to the sessions sheet:
+#
+# - 'session_entry' students: one row per tested page (Talqeen / Tambeeh,
+#   core + specific mistake) plus a Session_Summary row carrying the mark;
+#   Jadeed rows carry "Progress: ..." text and an Arabic grade
+# - 'upload' students: one marks-only row per session (Murajaat sipara +
+#   mark out of 10, Juzhali page count + Arabic grade, Jadeed page + ayah)
+#
+# make_workbook() builds upload workbooks (the create_sample_excel_template
+# layout, either format) of any size for the ingestion benchmark.
+#
+# Everything is seeded, so the same arguments always give the same school.
+
+import math
+import random
+from datetime import date, timedelta
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+from mushaf_index import TOTAL_PAGES, page_max_ayah
+from page_ranges import PAGE_MAP, to_sipara_page
+
+# Same order as the sessions sheet
+SESSION_COLUMNS = [
+    'id', 'student_id', 'session_type', 'date', 'sipara', 'page', 'jadeed_page',
+    'ending_ayah', 'talqeen_count', 'tambeeh_count', 'core_mistake',
+    'specific_mistake', 'overall_grade', 'notes', 'data_format', 'created_at',
+    'page_map'
+]
+STUDENT_COLUMNS = ['id', 'name', 'teacher_name', 'start_date', 'created_at']
+
+ARABIC_GRADES = ['جيد جدا', 'جيد', 'متوسط', 'ضعيف']
+GRADE_WEIGHTS = [30, 45, 18, 7]
+CORE_MISTAKES = ['Hifz', 'Tajweed', 'Makharij', 'Mixed']
+SPECIFIC_MISTAKES = {
+    'Hifz': ['Forgot ayah start', 'Mixed similar ayahs', 'Skipped a line'],
+    'Tajweed': ['Ghunnah', 'Madd length', 'Qalqalah'],
+    'Makharij': ['ض / ظ', 'ح / ه', 'ق / ك'],
+    'Mixed': ['Hifz + Tajweed']
+}
+TEACHERS = ['Ustadh Ahmed', 'Ustadh Yusuf', 'Ustadha Maryam', 'Ustadha Aisha', 'Ustadh Bilal']
+FIRST_NAMES = ['Ahmed', 'Ali', 'Omar', 'Fatima', 'Zainab', 'Hamza', 'Aisha', 'Yusuf', 'Maryam', 'Ibrahim']
+LAST_NAMES = ['Khan', 'Patel', 'Hussain', 'Malik', 'Qureshi', 'Siddiqui', 'Rahman', 'Sheikh']
+
+SCHOOL_DAYS_PER_YEAR = 260
+JUZHALI_LENGTH = 10
+START_DATE = date(2022, 1, 3)
+
+# Rows one school day adds (used to size a school to a target row count)
+ROWS_PER_DAY = {'session_entry': 1 + 4 + 5, 'upload': 3}
+
+
+def _grade(rng):
+    return rng.choices(ARABIC_GRADES, GRADE_WEIGHTS)[0]
+
+
+def _mistakes(rng):
+    talqeen = rng.choices([0, 1, 2, 3], [55, 25, 15, 5])[0]
+    tambeeh = rng.choices([0, 1, 2, 3, 4], [35, 30, 20, 10, 5])[0]
+    if talqeen == 0 and tambeeh == 0:
+        return 0, 0, '', ''
+    core = rng.choice(CORE_MISTAKES)
+    return talqeen, tambeeh, core, rng.choice(SPECIFIC_MISTAKES[core])
+
+
+def _school_days(start, count):
+    """The first `count` weekdays from start"""
+    days, day = [], start
+    while len(days) < count:
+        if day.weekday() < 5:
+            days.append(day.strftime('%Y-%m-%d'))
+        day += timedelta(days=1)
+    return days
+
+
+def make_students(n_students, seed=0):
+    """Students table (same columns as the students sheet)"""
+    rng = random.Random(seed)
+    rows = []
+    for student_id in range(1, n_students + 1):
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {student_id}"
+        start = START_DATE - timedelta(days=rng.randint(0, 120))
+        rows.append([
+            student_id, name, rng.choice(TEACHERS),
+            start.strftime('%Y-%m-%d'), f"{start.strftime('%Y-%m-%d')} 08:00:00"
+        ])
+    return pd.DataFrame(rows, columns=STUDENT_COLUMNS)
+
+
+def student_sessions(student_id, days, data_format='session_entry', seed=0):
+    """
+    Sessions-sheet rows (without id) for one student over `days` school days.
+    """
+    rng = random.Random(f"{seed}-{student_id}")
+    page = rng.randint(JUZHALI_LENGTH + 25, 400)
+    rows = []
+    created_at = '2022-01-01 00:00:00'
+
+    for day in _school_days(START_DATE, days):
+        # --- Jadeed: half a page or a page forward ---
+        step = rng.choice([0.5, 0.5, 1.0])
+        if page < TOTAL_PAGES and (step == 1.0 or rng.random() < 0.5):
+            page += 1
+        ayah = rng.randint(1, page_max_ayah(page))
+        progress = f"{step:g} pages + {rng.randint(0, 5)} ayahs"
+        if data_format == 'upload':
+            rows.append([
+                student_id, 'Jadeed', day, '', '', page, ayah, 0, 0, '', '',
+                rng.randint(5, 10), '', 'upload', created_at, PAGE_MAP
+            ])
+        else:
+            talqeen, tambeeh, _, _ = _mistakes(rng)
+            rows.append([
+                student_id, 'Jadeed', day, '', page - 1, page, ayah, 0, tambeeh,
+                'Jadeed_Learning', f"Progress: {progress}", _grade(rng),
+                f"Progress: {progress}", 'session_entry', created_at, PAGE_MAP
+            ])
+
+        # --- Juzhali: the JUZHALI_LENGTH pages behind Jadeed ---
+        juzhali_pages = list(range(max(1, page - JUZHALI_LENGTH + 1), page + 1))
+        if data_format == 'upload':
+            rows.append([
+                student_id, 'Juzhali', day, '', JUZHALI_LENGTH, '', '', 0, 0, '', '',
+                _grade(rng), f"{JUZHALI_LENGTH} pages tested", 'upload', created_at, PAGE_MAP
+            ])
+        else:
+            tested = sorted(rng.sample(juzhali_pages, min(3, len(juzhali_pages))))
+            for tested_page in tested:
+                talqeen, tambeeh, core, specific = _mistakes(rng)
+                rows.append([
+                    student_id, 'Juzhali', day, '', tested_page, '', '', talqeen, tambeeh,
+                    core, specific, '', f"Page {tested_page}", 'session_entry', created_at, PAGE_MAP
+                ])
+            rows.append([
+                student_id, 'Juzhali', day, '', f"Pages {', '.join(map(str, tested))}", '', '',
+                0, 0, 'Session_Summary', 'Overall Session Evaluation', _grade(rng),
+                'Juzhali session completed', 'session_entry', created_at, PAGE_MAP
+            ])
+
+        # --- Murajaat: a sipara from the graduated pages ---
+        graduated_end = max(1, page - JUZHALI_LENGTH)
+        sipara, _ = to_sipara_page(rng.randint(1, graduated_end))
+        mark = rng.choices(range(4, 11), [2, 5, 10, 20, 28, 22, 13])[0]
+        if data_format == 'upload':
+            rows.append([
+                student_id, 'Murajaat', day, sipara, '', '', '', 0, 0, '', '',
+                mark, '', 'upload', created_at, PAGE_MAP
+            ])
+        else:
+            tested = sorted(rng.sample(range(1, 21), 4))
+            for sipara_page in tested:
+                talqeen, tambeeh, core, specific = _mistakes(rng)
+                rows.append([
+                    student_id, 'Murajaat', day, sipara, sipara_page, '', '', talqeen, tambeeh,
+                    core, specific, '', f"Page {sipara_page}", 'session_entry', created_at, PAGE_MAP
+                ])
+            rows.append([
+                student_id, 'Murajaat', day, sipara, f"Pages {', '.join(map(str, tested))}", '', '',
+                0, 0, 'Session_Summary', 'Overall Session Evaluation', mark,
+                'Murajaat session completed', 'session_entry', created_at, PAGE_MAP
+            ])
+
+    return rows
+
+
+def make_school(n_rows, years=3, data_format='mixed', seed=0):
+    """
+    (students_df, session_rows) with exactly n_rows sessions-sheet rows:
+    as many students as `years` of daily sessions need. 'mixed' gives every
+    third student the marks-only upload format.
+    """
+    formats = ['upload'] if data_format == 'upload' else ['session_entry']
+    if data_format == 'mixed':
+        formats = ['session_entry', 'session_entry', 'upload']
+    per_student = sum(ROWS_PER_DAY[f] for f in formats) / len(formats) * SCHOOL_DAYS_PER_YEAR * years
+    n_students = max(1, math.ceil(n_rows / per_student))
+    days = max(1, math.ceil(SCHOOL_DAYS_PER_YEAR * years))
+
+    students = make_students(n_students, seed)
+    rows = []
+    for student_id in students['id']:
+        student_format = formats[(student_id - 1) % len(formats)]
+        rows.extend(student_sessions(int(student_id), days, student_format, seed))
+        if len(rows) >= n_rows:
+            break
+
+    rows = [[row_id] + row for row_id, row in enumerate(rows[:n_rows], start=1)]
+    students = students[students['id'].isin({row[1] for row in rows})].reset_index(drop=True)
+    return students, rows
+
+
+def to_records(rows, columns=SESSION_COLUMNS):
+    """Rows as gspread get_all_records() returns them (list of dicts)"""
+    return [dict(zip(columns, row)) for row in rows]
+
+
+# ===== UPLOAD WORKBOOKS =====
+
+WORKBOOK_DAYS = 5 * SCHOOL_DAYS_PER_YEAR
+
+def _workbook_sheets(rows, data_format, seed):
+    """{sheet name: DataFrame} for a workbook with `rows` rows per session sheet"""
+    rng = np.random.default_rng(seed)
+    # Several sessions a day once a sheet outgrows WORKBOOK_DAYS school days
+    days = pd.bdate_range(START_DATE, periods=min(rows, WORKBOOK_DAYS)).strftime('%Y-%m-%d')
+    dates = days[np.sort(rng.integers(0, len(days), rows))] if rows > WORKBOOK_DAYS else days
+    grades = rng.choice(ARABIC_GRADES, rows, p=np.array(GRADE_WEIGHTS) / sum(GRADE_WEIGHTS))
+    marks = rng.integers(4, 11, rows)
+    jadeed_pages = np.minimum(TOTAL_PAGES, 30 + np.arange(rows) // 2 % (TOTAL_PAGES - 30))
+    ayahs = rng.integers(1, 40, rows)
+    notes = np.where(rng.random(rows) < 0.2, 'Needs revision', '')
+
+    sheets = {
+        'STUDENT_INFO': pd.DataFrame({
+            'Student_Name': [f'Benchmark Student {rows}'],
+            'Teacher_Name': ['Ustadh Ahmed'],
+            'Start_Date': [START_DATE.strftime('%Y-%m-%d')]
+        })
+    }
+
+    if data_format == 'upload':
+        sheets['MURAJAAT'] = pd.DataFrame({
+            'Date': dates, 'Sipara': rng.integers(1, 31, rows),
+            'Overall_Grade': marks, 'Notes': notes
+        })
+        sheets['JUZHALI'] = pd.DataFrame({
+            'Date': dates, 'Page_Range': JUZHALI_LENGTH,
+            'Overall_Grade': grades, 'Notes': notes
+        })
+        sheets['JADEED'] = pd.DataFrame({
+            'Date': dates, 'Page': jadeed_pages, 'Ending_Ayah': ayahs,
+            'Final_Grade': marks, 'Notes': notes
+        })
+    else:
+        talqeen = rng.choice([0, 1, 2, 3], rows, p=[0.55, 0.25, 0.15, 0.05])
+        tambeeh = rng.choice([0, 1, 2, 3, 4], rows, p=[0.35, 0.3, 0.2, 0.1, 0.05])
+        sheets['MURAJAAT'] = pd.DataFrame({
+            'Date': dates, 'Sipara': rng.integers(1, 31, rows), 'Page': rng.integers(1, 21, rows),
+            'Talqeen': talqeen, 'Tambeeh': tambeeh, 'Overall_Grade': marks, 'Notes': notes
+        })
+        sheets['JUZHALI'] = pd.DataFrame({
+            'Date': dates, 'Page': np.maximum(1, jadeed_pages - rng.integers(0, JUZHALI_LENGTH, rows)),
+            'Talqeen': talqeen[::-1], 'Tambeeh': tambeeh[::-1], 'Overall_Grade': grades, 'Notes': notes
+        })
+        sheets['JADEED'] = pd.DataFrame({
+            'Date': dates, 'Page': jadeed_pages, 'Start_Ayah': 1, 'End_Ayah': ayahs,
+            'Tambeeh': tambeeh, 'Final_Grade': grades, 'Notes': notes
+        })
+    return sheets
+
+
+def make_workbook(rows, data_format='session_entry', seed=0):
+    """Upload workbook (xlsx bytes) with `rows` rows in each session sheet"""
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        for sheet_name, frame in _workbook_sheets(rows, data_format, seed).items():
+            frame.to_excel(writer, sheet_name=sheet_name, index=False)
+    output.seek(0)
+    return output.getvalue()
@@ -0,0 +1,139 @@
+# ============================================================================
+# FILE: charts.py - CHART HELPERS FOR LONG HISTORIES
+# ============================================================================
+# Multi-year students have thousands of marks. Sending every point (three
+# times, once per trace) makes page payloads huge, so charts go through
+# these helpers:
+#
+# - lttb_indices / downsample: Largest-Triangle-Three-Buckets downsampling
+#   keeps the visual shape of a series with at most MAX_CHART_POINTS points
+# - paginate: page through long card grids instead of rendering them all
+# - quran_map_figure: the whole-Quran page status map as one heatmap
+
+import math
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from lazy_imports import lazy_module
+from profiler import timed
+from quran_map import STATUS_COLORS, STATUS_LABELS, status_grid
+
+go = lazy_module('plotly.graph_objects')
+
+MAX_CHART_POINTS = 400      # points per series after downsampling
+CARDS_PER_PAGE = 20
+
+
+def lttb_indices(x, y, threshold=MAX_CHART_POINTS):
+    """
+    Indices of the points Largest-Triangle-Three-Buckets keeps.
+
+    `x` must be sorted and numeric (dates as int64 nanoseconds is fine).
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    # First and last points are always kept; the rest is split into buckets
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    kept = np.empty(threshold, dtype=int)
+    kept[0] = 0
+    kept[-1] = n - 1
+
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+
+        # Average of the next bucket is the third triangle corner
+        next_start, next_end = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        area = np.abs(
+            (x[previous] - avg_x) * (y[start:end] - y[previous]) -
+            (x[previous] - x[start:end]) * (avg_y - y[previous])
+        )
+        previous = start + int(np.argmax(area))
+        kept[i + 1] = previous
+
+    return kept
+
+
+@timed('chart.downsample')
+def downsample(df, x_col, y_col, threshold=MAX_CHART_POINTS):
+    """Rows of `df` (sorted by x_col) kept by LTTB - unchanged if already small"""
+    if len(df) <= threshold:
+        return df
+    x = df[x_col]
+    if pd.api.types.is_datetime64_any_dtype(x):
+        x = x.astype('int64')
+    return df.iloc[lttb_indices(x.to_numpy(), df[y_col].to_numpy(), threshold)]
+
+
+def paginate(df, key, per_page=CARDS_PER_PAGE, newest_last=True):
+    """
+    Slice of `df` for the page chosen in a small selector (only shown
+    when there is more than one page). Defaults to the newest page.
+    """
+    pages = max(1, math.ceil(len(df) / per_page))
+    if pages == 1:
+        return df
+
+    page = st.select_slider(
+        "Page",
+        options=list(range(1, pages + 1)),
+        value=pages if newest_last else 1,
+        key=key,
+        format_func=lambda p: f"{p} / {pages}"
+    )
+    return df.iloc[(page - 1) * per_page:page * per_page]
+
+
+@lru_cache(maxsize=32)
+def _quran_map_figure(status_bytes):
+    status = np.frombuffer(status_bytes, dtype=int)
+    z, pages = status_grid(status)
+
+    # Discrete colorscale: one flat band per status code
+    steps = len(STATUS_COLORS)
+    colorscale = []
+    for code, color in enumerate(STATUS_COLORS):
+        colorscale += [[code / steps, color], [(code + 1) / steps, color]]
+
+    labels = np.array(STATUS_LABELS, dtype=object)
+    text = np.where(np.isnan(z), '', labels[np.nan_to_num(z).astype(int)])
+    hover = np.where(pages > 0, 'Page ' + pages.astype(str) + '<br>' + text, '')
+
+    fig = go.Figure(go.Heatmap(
+        z=z,
+        x=np.arange(1, z.shape[1] + 1),
+        y=np.arange(1, z.shape[0] + 1),
+        zmin=0,
+        zmax=steps,
+        colorscale=colorscale,
+        text=hover,
+        hoverinfo='text',
+        xgap=1,
+        ygap=1,
+        showscale=False
+    ))
+    fig.update_layout(
+        height=620,
+        margin=dict(l=40, r=10, t=10, b=30),
+        xaxis=dict(title='Page in Sipara', dtick=5),
+        yaxis=dict(title='Sipara', autorange='reversed', dtick=1),
+        plot_bgcolor='white'
+    )
+    return fig
+
+
+@timed('chart.quran_map')
+def quran_map_figure(status):
+    """One heatmap (30 siparas x pages) for a page status array, memoized on the array"""
+    return _quran_map_figure(np.asarray(status, dtype=int).tobytes())
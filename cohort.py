@@ -0,0 +1,220 @@
+# ============================================================================
+# FILE: cohort.py - CLASS-WIDE VIEWS COMPUTED FROM ONE BULK READ
+# ============================================================================
+# Everything here takes the whole sessions frame (database.get_all_sessions)
+# and works per student with groupby, so a class of 40 students costs one
+# sheet read instead of 40 x (dashboard + assistants).
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from excel_handler import grades_to_numeric
+from mushaf_index import TOTAL_PAGES
+from page_ranges import to_sipara_page
+from student_state import build_review_queue, build_student_state, is_current_state
+
+AGENDA_COLUMNS = [
+    'student_id', 'name', 'teacher_name', 'last_session',
+    'last_jadeed_page', 'last_jadeed_ayah', 'next_jadeed_page',
+    'juzhali_start', 'juzhali_end', 'murajaat_due', 'due_pages'
+]
+
+
+def last_jadeed_positions(sessions_df):
+    """
+    (page, ayah) of every student's most recent Jadeed session in one
+    grouped pass - latest date wins, then the furthest page that day.
+    """
+    columns = ['student_id', 'last_jadeed_page', 'last_jadeed_ayah']
+    if sessions_df is None or sessions_df.empty:
+        return pd.DataFrame(columns=columns)
+
+    jadeed = sessions_df[sessions_df['Session_Type'] == 'Jadeed']
+    pages = pd.to_numeric(jadeed['Jadeed_Page'], errors='coerce').fillna(
+        pd.to_numeric(jadeed['Page'], errors='coerce')
+    )
+    positions = pd.DataFrame({
+        'student_id': jadeed['student_id'],
+        'date': pd.to_datetime(jadeed['Date'], errors='coerce'),
+        'last_jadeed_page': pages,
+        'last_jadeed_ayah': pd.to_numeric(jadeed['Ending_Ayah'], errors='coerce')
+    }).dropna(subset=['last_jadeed_page'])
+
+    latest = positions.sort_values(['student_id', 'date', 'last_jadeed_page']).groupby('student_id').tail(1)
+    latest = latest[columns].reset_index(drop=True)
+    latest['last_jadeed_page'] = latest['last_jadeed_page'].astype(int)
+    latest['last_jadeed_ayah'] = latest['last_jadeed_ayah'].astype('Int64')
+    return latest
+
+
+def _due_page_labels(due_pages, limit=6):
+    """'S3:p5, S3:p6, ...' for the first few due pages"""
+    labels = []
+    for page, _ in due_pages[:limit]:
+        sipara, page_in_sipara = to_sipara_page(page)
+        labels.append(f"S{sipara}:p{page_in_sipara}")
+    if len(due_pages) > limit:
+        labels.append(f"+{len(due_pages) - limit}")
+    return ', '.join(labels)
+
+
+def build_class_agenda(students_df, sessions_df, states=None, juzhali_length=10, today=None):
+    """
+    Today's agenda for every student in `students_df`: where Jadeed
+    continues, the Juzhali window and the Murajaat pages due.
+
+    `states` are current snapshots ({str(id): state}, see
+    database.get_class_states); students without one (or with one for
+    another Juzhali length) are rebuilt from their rows of the same bulk
+    frame.
+    """
+    if students_df is None or students_df.empty:
+        return pd.DataFrame(columns=AGENDA_COLUMNS)
+
+    today = today or datetime.now().strftime('%Y-%m-%d')
+    states = states or {}
+
+    agenda = students_df[['id', 'name']].rename(columns={'id': 'student_id'})
+    agenda['teacher_name'] = students_df['teacher_name'] if 'teacher_name' in students_df.columns else 'Unknown'
+
+    if sessions_df is None or sessions_df.empty:
+        sessions_df = pd.DataFrame(columns=['student_id', 'Session_Type', 'Date', 'Page', 'Jadeed_Page', 'Ending_Ayah'])
+
+    # --- Jadeed + Juzhali: fully vectorized across students ---
+    last_session = sessions_df.groupby('student_id')['Date'].max().rename('last_session')
+    agenda = agenda.merge(last_session, left_on='student_id', right_index=True, how='left')
+    agenda = agenda.merge(last_jadeed_positions(sessions_df), on='student_id', how='left')
+
+    last_page = agenda['last_jadeed_page']
+    agenda['next_jadeed_page'] = np.minimum(last_page.fillna(0) + 1, TOTAL_PAGES).astype(int)
+    agenda['juzhali_end'] = last_page.clip(1, TOTAL_PAGES).astype('Int64')
+    agenda['juzhali_start'] = (last_page - juzhali_length + 1).clip(1, TOTAL_PAGES).astype('Int64')
+
+    # --- Murajaat: each student's due queue from their snapshot ---
+    groups = sessions_df.groupby('student_id').groups
+    due_counts = []
+    due_labels = []
+    for student_id in agenda['student_id']:
+        state = states.get(str(student_id))
+        if not is_current_state(state, juzhali_length):
+            rows = groups.get(student_id)
+            state = build_student_state(
+                student_id, sessions_df.loc[rows] if rows is not None else None, juzhali_length
+            )
+        due_pages = build_review_queue(state).due(today)
+        due_counts.append(len(due_pages))
+        due_labels.append(_due_page_labels(due_pages))
+
+    agenda['murajaat_due'] = due_counts
+    agenda['due_pages'] = due_labels
+
+    agenda['last_jadeed_page'] = agenda['last_jadeed_page'].astype('Int64')
+    agenda['last_session'] = pd.to_datetime(agenda['last_session']).dt.strftime('%Y-%m-%d')
+    return agenda[AGENDA_COLUMNS].sort_values(['teacher_name', 'name']).reset_index(drop=True)
+
+
+# ===== COHORT ANALYTICS =====
+
+HEALTH_BANDS = [0, 40, 60, 80, 101]
+HEALTH_LABELS = ['Critical', 'Needs Attention', 'Good', 'Excellent']
+PACE_WINDOW_DAYS = 28
+
+_cohort_cache = {}
+
+
+def _health_band(scores):
+    """Bucket 0-100 health scores into the dashboard's bands"""
+    return pd.cut(scores, bins=HEALTH_BANDS, labels=HEALTH_LABELS, right=False)
+
+
+def build_cohort_summary(students_df, sessions_df, facts, today=None):
+    """
+    One row per student: Murajaat/Juzhali health (mean mark as 0-100),
+    Jadeed progress and pace, weakest sipara, activity.
+
+    Computed with groupbys over the bulk frames; cached per data version.
+    """
+    today = pd.Timestamp(today or datetime.now().date())
+    version = sessions_df.attrs.get('data_version') if sessions_df is not None else None
+    cache_key = (version, len(students_df), today) if version is not None else None
+    if cache_key is not None and cache_key in _cohort_cache:
+        return _cohort_cache[cache_key]
+
+    summary = students_df[['id', 'name']].rename(columns={'id': 'student_id'})
+    summary['teacher_name'] = students_df['teacher_name'].astype(str) if 'teacher_name' in students_df.columns else 'Unknown'
+
+    if sessions_df is not None and not sessions_df.empty:
+        grades = grades_to_numeric(sessions_df['Overall_Grade'])
+        graded = sessions_df.assign(grade=grades).dropna(subset=['grade'])
+
+        # Health per session type = mean mark out of 10, as a percentage
+        health = graded.pivot_table(index='student_id', columns='Session_Type', values='grade', aggfunc='mean') * 10
+        for session_type, column in [('Murajaat', 'murajaat_health'), ('Juzhali', 'juzhali_health')]:
+            values = health[session_type] if session_type in health.columns else pd.Series(dtype=float)
+            summary = summary.merge(values.rename(column), left_on='student_id', right_index=True, how='left')
+
+        activity = sessions_df.groupby('student_id').agg(
+            sessions=('Session_Type', 'size'),
+            last_session=('Date', 'max')
+        )
+        summary = summary.merge(activity, left_on='student_id', right_index=True, how='left')
+        summary = summary.merge(last_jadeed_positions(sessions_df)[['student_id', 'last_jadeed_page']], on='student_id', how='left')
+    else:
+        for column in ['murajaat_health', 'juzhali_health', 'sessions', 'last_session', 'last_jadeed_page']:
+            summary[column] = np.nan
+
+    # Pace = new Jadeed pages per week over the last four weeks
+    if facts is not None and not facts.empty:
+        recent = facts[
+            (facts['session_type'] == 'Jadeed') &
+            (pd.to_datetime(facts['date'], errors='coerce') > today - pd.Timedelta(days=PACE_WINDOW_DAYS))
+        ]
+        pace = recent.groupby('student_id')['page'].nunique() / (PACE_WINDOW_DAYS / 7)
+        summary = summary.merge(pace.rename('pages_per_week'), left_on='student_id', right_index=True, how='left')
+
+        # Weakest sipara = most Talqeen in Murajaat
+        mura = facts[facts['session_type'].isin(['Murajaat', 'Tasmeel Juz']) & (facts['talqeen_count'] > 0)]
+        per_sipara = mura.groupby(['student_id', 'sipara'])['talqeen_count'].sum().reset_index()
+        weakest = per_sipara.sort_values(['student_id', 'talqeen_count']).groupby('student_id').tail(1)
+        weakest = weakest.set_index('student_id')['sipara'].rename('weakest_sipara')
+        summary = summary.merge(weakest, left_on='student_id', right_index=True, how='left')
+    else:
+        summary['pages_per_week'] = np.nan
+        summary['weakest_sipara'] = np.nan
+
+    summary['pages_per_week'] = summary['pages_per_week'].fillna(0).round(1)
+    summary['sessions'] = summary['sessions'].fillna(0).astype(int)
+    summary['progress'] = (summary['last_jadeed_page'].fillna(0) / TOTAL_PAGES * 100).round(1)
+    summary['days_inactive'] = (today - pd.to_datetime(summary['last_session'])).dt.days
+    summary['murajaat_band'] = _health_band(summary['murajaat_health'])
+    summary['juzhali_band'] = _health_band(summary['juzhali_health'])
+
+    if cache_key is not None:
+        _cohort_cache.clear()
+        _cohort_cache[cache_key] = summary
+    return summary
+
+
+def health_distribution(summary, column='murajaat_band', by='teacher_name'):
+    """Students per health band for each teacher (rows) - one crosstab"""
+    if summary.empty:
+        return pd.DataFrame(columns=HEALTH_LABELS)
+    bands = summary[column].cat.add_categories(['No Data']).fillna('No Data')
+    return pd.crosstab(summary[by], bands).reindex(columns=HEALTH_LABELS + ['No Data'], fill_value=0)
+
+
+def cohort_weak_siparas(facts, student_ids=None, top=5):
+    """Siparas with the most Murajaat Talqeen across the cohort"""
+    if facts is None or facts.empty:
+        return pd.DataFrame(columns=['sipara', 'talqeen', 'students'])
+    mura = facts[facts['session_type'].isin(['Murajaat', 'Tasmeel Juz']) & (facts['talqeen_count'] > 0)]
+    if student_ids is not None:
+        mura = mura[mura['student_id'].isin(student_ids)]
+    return (
+        mura.groupby('sipara')
+        .agg(talqeen=('talqeen_count', 'sum'), students=('student_id', 'nunique'))
+        .nlargest(top, 'talqeen')
+        .reset_index()
+    )
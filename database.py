@@ -3,23 +3,127 @@
 # ============================================================================
 # Automatically uses TEST sheet locally, PRODUCTION sheet when deployed!
 
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
 import pandas as pd
 import streamlit as st
 from datetime import datetime
+import copy
+import json
+import numbers
 import os
+import re
 import time
 
+from lazy_imports import lazy_module
+from profiler import timed
+from page_facts import (
+    PAGE_FACT_COLUMNS,
+    explode_sessions,
+    page_facts_to_rows,
+    rows_to_page_facts
+)
+from page_ranges import PAGE_MAP
+from quran_map import page_status_array
+from regressions import find_regressions
+import sheets_ledger
+import write_journal
+import write_queue
+from retention_model import (
+    RETENTION_COLUMNS,
+    fit_retention,
+    params_to_rows,
+    rows_to_params
+)
+from timeseries import add_session_to_aggregates, build_aggregates
+from student_state import (
+    REVIEW_SESSION_TYPES,
+    empty_student_state,
+    is_current_state,
+    apply_session_to_state,
+    build_student_state,
+    build_review_queue,
+    session_pages,
+    update_review_queue
+)
+
 # Google Sheets Configuration
 PRODUCTION_SHEET_ID = "1ZkGPICCFMxu_v8x565Zzz30Nljbx73fXaKo1xyXEroQ"  # Real data (deployed)
 TEST_SHEET_ID = "1He8_sn8I4npcoxw9PrVyQmxKiG-JrAs3cNkfqULzFF0"  # Test data (local)
 
+# Google Sheets caps a cell at 50,000 characters - larger snapshots are split
+STATE_CELL_LIMIT = 45000
+
 SCOPE = [
     'https://spreadsheets.google.com/feeds',
     'https://www.googleapis.com/auth/drive'
 ]
 
+# Loaded on first Sheets call, so the access-code page starts faster
+gspread = lazy_module('gspread')
+
+# Bumped on every write so cached lookups know when their data went stale
+_data_version = {'value': 0}
+
+def get_data_version():
+    """Current data version (changes whenever sessions are written)"""
+    return _data_version['value']
+
+def bump_data_version():
+    """Mark all cached session-derived results as stale"""
+    _data_version['value'] += 1
+    return _data_version['value']
+
+# Other app instances (and hand edits) change the sheet without bumping
+# _data_version, so before a cached frame is served the sessions sheet's
+# row count is re-read - one column, at most every REMOTE_CHECK_SECONDS
+REMOTE_CHECK_SECONDS = 60
+_remote_rows = {'count': None, 'checked_at': 0.0}
+
+def refresh_data():
+    """Drop every cached read - the next lookups go back to the sheet"""
+    bump_data_version()
+    _student_state_cache.clear()
+    _review_queue_cache.clear()
+    _aggregates_cache.clear()
+    _state_rows['rows'] = None
+    _retention_cache['params'] = None
+
+def _expect_session_rows(count):
+    """Rows this process appended to the sessions sheet (not a remote change)"""
+    if _remote_rows['count'] is not None:
+        _remote_rows['count'] += count
+
+def _check_remote_changes():
+    """
+    True (and every cache dropped) if the sessions sheet gained or lost
+    rows outside this process since the last check. Skipped while our own
+    journaled rows are still on their way to the sheet. Edits to existing
+    rows aren't seen - refresh_data() covers those.
+    """
+    now = time.monotonic()
+    if now - _remote_rows['checked_at'] < REMOTE_CHECK_SECONDS:
+        return False
+    _remote_rows['checked_at'] = now
+    
+    try:
+        if write_journal.pending_count():
+            return False
+        spreadsheet = get_google_sheet()
+        if not spreadsheet:
+            return False
+        count = len(spreadsheet.worksheet('sessions').col_values(1))
+    except Exception as e:
+        print(f"⚠️ Could not check the sessions sheet for changes: {e}")
+        return False
+    
+    previous = _remote_rows['count']
+    _remote_rows['count'] = count
+    if previous is None or previous == count:
+        return False
+    
+    print(f"🔄 Sessions sheet changed elsewhere ({previous} → {count} rows) - reloading")
+    refresh_data()
+    return True
+
 def is_running_locally():
     """Detect if app is running locally or on Streamlit Cloud"""
     return not os.getenv('STREAMLIT_SHARING_MODE') and not os.getenv('STREAMLIT_SERVER_HEADLESS')
@@ -35,10 +139,12 @@ def get_current_sheet_id():
 
 import time
 
+@timed('sheets.connect')
 def get_google_sheet():
     """Connect to Google Sheets using credentials from Streamlit secrets with retry logic"""
     max_retries = 5
     backoff_factor = 2
+    from oauth2client.service_account import ServiceAccountCredentials
     
     for attempt in range(max_retries):
         try:
@@ -48,10 +154,10 @@ def get_google_sheet():
                 credentials_dict, SCOPE
             )
             client = gspread.authorize(credentials)
-            spreadsheet = client.open_by_key(sheet_id)
+            spreadsheet = sheets_ledger.call('open_by_key', '*', client.open_by_key, sheet_id)
             
             print(f"✅ Google Sheets connected successfully (Attempt {attempt + 1}/{max_retries})")
-            return spreadsheet
+            return sheets_ledger.track(spreadsheet)
             
         except gspread.exceptions.APIError as e:
             error_code = e.response.status_code if hasattr(e, 'response') else None
@@ -85,6 +191,7 @@ def get_google_sheet():
     
     return None
 
+@timed('sheets.init_db')
 def init_db():
     """Initialize Google Sheets with required worksheets"""
     try:
@@ -99,13 +206,23 @@ def init_db():
             'sessions': ['id', 'student_id', 'session_type', 'date', 'sipara', 
                         'page', 'jadeed_page', 'ending_ayah', 'talqeen_count', 
                         'tambeeh_count', 'core_mistake', 'specific_mistake', 
-                        'overall_grade', 'notes', 'data_format', 'created_at']
+                        'overall_grade', 'notes', 'data_format', 'created_at',
+                        'page_map'],
+            'student_state': ['student_id', 'updated_at', 'state'],
+            'page_sessions': PAGE_FACT_COLUMNS,
+            'retention_model': RETENTION_COLUMNS
         }
         
         for sheet_name, headers in required_sheets.items():
             if sheet_name not in existing_sheets:
                 worksheet = spreadsheet.add_worksheet(title=sheet_name, rows=1000, cols=len(headers))
                 worksheet.update('A1', [headers])
+                
+                # New page-level table: fill it from the existing history once
+                if sheet_name == 'page_sessions':
+                    backfill_page_facts(spreadsheet)
+            else:
+                _add_missing_headers(spreadsheet.worksheet(sheet_name), headers)
         
         env = "TEST (Local)" if is_running_locally() else "PRODUCTION (Cloud)"
         print(f"✅ Google Sheets ({env}) initialized successfully!")
@@ -113,6 +230,19 @@ def init_db():
     except Exception as e:
         print(f"❌ Error initializing sheets: {e}")
 
+def _add_missing_headers(worksheet, headers):
+    """Append header cells an older sheet doesn't have yet (new columns go last)"""
+    current = worksheet.row_values(1)
+    missing = [header for header in headers if header not in current]
+    if not missing:
+        return
+    
+    if worksheet.col_count < len(current) + len(missing):
+        worksheet.add_cols(len(current) + len(missing) - worksheet.col_count)
+    worksheet.update(gspread.utils.rowcol_to_a1(1, len(current) + 1), [missing])
+    print(f"✅ Added {', '.join(missing)} to the {worksheet.title} sheet")
+
+@timed('sheets.get_all_students')
 def get_all_students():
     """Get all students from Google Sheets with retry logic"""
     max_retries = 3
@@ -147,6 +277,66 @@ def student_exists(name):
     students = get_all_students()
     return name in students
 
+def _excel_session_rows(parsed_data, student_id, next_session_id):
+    """
+    Sessions-sheet rows and snapshot updates for a parsed workbook -
+    ([row, ...], [(session_type, session_data), ...]), ids from next_session_id
+    """
+    all_session_rows = []
+    state_updates = []
+    
+    for session_type in ['murajaat', 'juzhali', 'jadeed']:
+        if session_type not in parsed_data:
+            continue
+            
+        df = parsed_data[session_type]
+        if df.empty:
+            continue
+        
+        for _, row in df.iterrows():
+            # Convert NaN values to empty strings or appropriate defaults
+            def clean_value(val, default=''):
+                """Convert NaN/None to default value"""
+                if pd.isna(val) or val is None:
+                    return default
+                return val
+            
+            session_row = [
+                next_session_id,
+                student_id,
+                session_type.capitalize(),
+                pd.Timestamp(row.get('date')).strftime('%Y-%m-%d') if pd.notna(row.get('date')) else datetime.now().strftime('%Y-%m-%d'),
+                clean_value(row.get('sipara'), ''),
+                clean_value(row.get('page_tested', row.get('page_count')), ''),
+                clean_value(row.get('jadeed_page'), ''),
+                clean_value(row.get('ending_ayah'), ''),
+                clean_value(row.get('talqeen_count'), 0),
+                clean_value(row.get('tambeeh_count'), 0),
+                clean_value(row.get('core_mistake_type'), ''),
+                clean_value(row.get('specific_mistake'), ''),
+                clean_value(row.get('overall_grade'), ''),
+                clean_value(row.get('notes'), ''),
+                parsed_data.get('format', 'upload'),
+                datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                PAGE_MAP
+            ]
+            all_session_rows.append(session_row)
+            state_updates.append((session_row[2], {
+                'date': session_row[3],
+                'sipara': session_row[4],
+                'page_tested': session_row[5],
+                'jadeed_page': session_row[6],
+                'end_ayah': session_row[7],
+                'talqeen_count': session_row[8],
+                'tambeeh_count': session_row[9],
+                'core_mistake_type': session_row[10],
+                'overall_grade': session_row[12]
+            }))
+            next_session_id += 1
+    
+    return all_session_rows, state_updates
+
+@timed('sheets.save_student_from_excel')
 def save_student_from_excel(parsed_data):
     """Save student and sessions from Excel file with retry logic"""
     max_retries = 3
@@ -188,6 +378,7 @@ def save_student_from_excel(parsed_data):
             
             if student_name in students:
                 student_id = students[student_name]
+                student_state = _student_state(student_id)
                 st.sidebar.info(f"✅ Found existing student with ID: {student_id}")
             else:
                 # Create new student
@@ -205,6 +396,7 @@ def save_student_from_excel(parsed_data):
                 ]
                 students_ws.append_row(new_row)
                 student_id = new_id
+                student_state = empty_student_state(student_id)
                 st.sidebar.success(f"✅ Created new student with ID: {student_id}")
             
             # Save sessions - BATCH VERSION (FIXED!)
@@ -213,45 +405,7 @@ def save_student_from_excel(parsed_data):
             existing_sessions = sessions_ws.get_all_values()
             next_session_id = len(existing_sessions)
             
-            # ✅ CRITICAL: Initialize the list BEFORE any conditions
-            all_session_rows = []
-            
-            for session_type in ['murajaat', 'juzhali', 'jadeed']:
-                if session_type not in parsed_data:
-                    continue
-                    
-                df = parsed_data[session_type]
-                if df.empty:
-                    continue
-                
-                for _, row in df.iterrows():
-                    # Convert NaN values to empty strings or appropriate defaults
-                    def clean_value(val, default=''):
-                        """Convert NaN/None to default value"""
-                        if pd.isna(val) or val is None:
-                            return default
-                        return val
-                    
-                    session_row = [
-                        next_session_id,
-                        student_id,
-                        session_type.capitalize(),
-                        pd.Timestamp(row.get('date')).strftime('%Y-%m-%d') if pd.notna(row.get('date')) else datetime.now().strftime('%Y-%m-%d'),
-                        clean_value(row.get('sipara'), ''),
-                        clean_value(row.get('page_tested', row.get('page_count')), ''),
-                        clean_value(row.get('jadeed_page'), ''),
-                        clean_value(row.get('ending_ayah'), ''),
-                        clean_value(row.get('talqeen_count'), 0),
-                        clean_value(row.get('tambeeh_count'), 0),
-                        clean_value(row.get('core_mistake_type'), ''),
-                        clean_value(row.get('specific_mistake'), ''),
-                        clean_value(row.get('overall_grade'), ''),
-                        clean_value(row.get('notes'), ''),
-                        parsed_data.get('format', 'upload'),
-                        datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                    ]
-                    all_session_rows.append(session_row)
-                    next_session_id += 1
+            all_session_rows, state_updates = _excel_session_rows(parsed_data, student_id, next_session_id)
             
             # ✅ Now all_session_rows is guaranteed to be defined
             # Write all rows at once (BATCH UPLOAD - 1 API call instead of 247!)
@@ -262,7 +416,12 @@ def save_student_from_excel(parsed_data):
                 for upload_attempt in range(3):
                     try:
                         sessions_ws.append_rows(all_session_rows, value_input_option='USER_ENTERED')
+                        _expect_session_rows(len(all_session_rows))
                         st.sidebar.success(f"✅ Saved {len(all_session_rows)} sessions for student {student_name}")
+                        bump_data_version()
+                        _append_page_facts(spreadsheet, all_session_rows)
+                        schedule_retention_refit()
+                        _apply_state_updates(student_id, student_state, state_updates, parsed_data.get('format', 'upload'))
                         return student_id
                     except gspread.exceptions.APIError as e:
                         if hasattr(e, 'response') and e.response.status_code == 429:
@@ -300,8 +459,53 @@ def save_student_from_excel(parsed_data):
     
     return None
 
-def get_all_student_sessions(student_id):
-    """Get all sessions for a student - UPDATED TO HANDLE EMPTY GRADES with retry"""
+SESSION_COLUMN_NAMES = {
+    'session_type': 'Session_Type',
+    'date': 'Date',
+    'sipara': 'Sipara',
+    'page': 'Page',
+    'jadeed_page': 'Jadeed_Page',
+    'ending_ayah': 'Ending_Ayah',
+    'talqeen_count': 'Mistake_Count',
+    'tambeeh_count': 'Tambeeh_Count',
+    'core_mistake': 'Core_Mistake',
+    'specific_mistake': 'Specific_Mistake',
+    'overall_grade': 'Overall_Grade',
+    'notes': 'Notes',
+    'data_format': 'Data_Format'
+}
+
+def standardize_sessions(df):
+    """Rename raw sessions-sheet columns and fix types (newest first)"""
+    # Standardize column names
+    df = df.rename(columns=SESSION_COLUMN_NAMES)
+    
+    # ✅ ADD THIS: Convert empty strings to None for Overall_Grade
+    df['Overall_Grade'] = df['Overall_Grade'].replace('', None)
+    
+    # Convert numeric columns
+    df['Mistake_Count'] = pd.to_numeric(df['Mistake_Count'], errors='coerce').fillna(0)
+    df['Tambeeh_Count'] = pd.to_numeric(df['Tambeeh_Count'], errors='coerce').fillna(0)
+    
+    df['Date'] = pd.to_datetime(df['Date'])
+    return df.sort_values('Date', ascending=False)
+
+_student_sessions_cache = {}
+
+@timed('sessions.load_student')
+def get_all_student_sessions(student_id, refresh=False):
+    """
+    Get all sessions for a student - UPDATED TO HANDLE EMPTY GRADES with retry.
+    
+    The frame is kept per data version, so reruns don't re-download the
+    sheet; saves from this app append to it locally (see _local_append).
+    Rows added elsewhere are picked up by _check_remote_changes.
+    """
+    cached = _student_sessions_cache.get(str(student_id))
+    if not refresh and cached is not None and cached.attrs.get('data_version') == get_data_version():
+        if not _check_remote_changes():
+            return cached
+    
     max_retries = 3
     
     for attempt in range(max_retries):
@@ -314,51 +518,145 @@ def get_all_student_sessions(student_id):
             data = worksheet.get_all_records()
             
             if not data:
-                return pd.DataFrame()
+                # A successful read of an empty sheet (failed reads carry no data_version)
+                df = pd.DataFrame()
+                df.attrs['data_version'] = get_data_version()
+                return df
             
             df = pd.DataFrame(data)
             df = df[df['student_id'] == student_id]
             
-            # Standardize column names
-            df = df.rename(columns={
-                'session_type': 'Session_Type',
-                'date': 'Date',
-                'sipara': 'Sipara',
-                'page': 'Page',
-                'jadeed_page': 'Jadeed_Page',
-                'ending_ayah': 'Ending_Ayah',
-                'talqeen_count': 'Mistake_Count',
-                'tambeeh_count': 'Tambeeh_Count',
-                'core_mistake': 'Core_Mistake',
-                'specific_mistake': 'Specific_Mistake',
-                'overall_grade': 'Overall_Grade',
-                'notes': 'Notes',
-                'data_format': 'Data_Format'
-            })
+            df = standardize_sessions(df)
+            df.attrs['data_version'] = get_data_version()
+            _student_sessions_cache[str(student_id)] = df
             
-            # ✅ ADD THIS: Convert empty strings to None for Overall_Grade
-            df['Overall_Grade'] = df['Overall_Grade'].replace('', None)
+            return df
+        
+        except gspread.exceptions.APIError as e:
+            if hasattr(e, 'response') and e.response.status_code == 429:
+                wait_time = 2 ** attempt
+                print(f"Rate limited loading sessions. Waiting {wait_time}s...")
+                time.sleep(wait_time)
+                continue
+            print(f"❌ Error getting sessions: {e}")
+            return pd.DataFrame()
+    
+    return pd.DataFrame()
+
+# ============================================================================
+# BULK READS (all students at once - class and cohort views)
+# ============================================================================
+
+_all_sessions_cache = {}
+
+@timed('sessions.load_all')
+def get_all_sessions():
+    """
+    Every student's sessions from ONE read of the sessions sheet,
+    standardized like get_all_student_sessions. Cached per data version
+    (and dropped when _check_remote_changes sees rows added elsewhere).
+    """
+    if get_data_version() in _all_sessions_cache:
+        _check_remote_changes()
+    
+    version = get_data_version()
+    if version in _all_sessions_cache:
+        return _all_sessions_cache[version]
+    
+    max_retries = 3
+    
+    for attempt in range(max_retries):
+        try:
+            spreadsheet = get_google_sheet()
+            if not spreadsheet:
+                return pd.DataFrame()
             
-            # Convert numeric columns
-            df['Mistake_Count'] = pd.to_numeric(df['Mistake_Count'], errors='coerce').fillna(0)
-            df['Tambeeh_Count'] = pd.to_numeric(df['Tambeeh_Count'], errors='coerce').fillna(0)
+            data = spreadsheet.worksheet('sessions').get_all_records()
+            if not data:
+                return pd.DataFrame()
             
-            df['Date'] = pd.to_datetime(df['Date'])
-            df = df.sort_values('Date', ascending=False)
+            df = standardize_sessions(pd.DataFrame(data))
+            df.attrs['data_version'] = version
             
+            _all_sessions_cache.clear()
+            _all_sessions_cache[version] = df
             return df
         
         except gspread.exceptions.APIError as e:
             if hasattr(e, 'response') and e.response.status_code == 429:
                 wait_time = 2 ** attempt
-                print(f"Rate limited loading sessions. Waiting {wait_time}s...")
+                print(f"Rate limited loading all sessions. Waiting {wait_time}s...")
                 time.sleep(wait_time)
                 continue
-            print(f"❌ Error getting sessions: {e}")
+            print(f"❌ Error getting all sessions: {e}")
+            return pd.DataFrame()
+        
+        except Exception as e:
+            print(f"❌ Error getting all sessions: {e}")
             return pd.DataFrame()
     
     return pd.DataFrame()
 
+def get_students_table():
+    """The students sheet as a DataFrame (id, name, teacher_name, ...)"""
+    try:
+        spreadsheet = get_google_sheet()
+        if not spreadsheet:
+            return pd.DataFrame()
+        
+        data = spreadsheet.worksheet('students').get_all_records()
+        return pd.DataFrame(data)
+    except Exception as e:
+        print(f"❌ Error getting students: {e}")
+        return pd.DataFrame()
+
+@timed('sheets.load_all_student_states')
+def load_all_student_states():
+    """Every stored snapshot from one read of the student_state sheet: {str(id): state}"""
+    states = {}
+    try:
+        spreadsheet = get_google_sheet()
+        if not spreadsheet:
+            return states
+        
+        rows = spreadsheet.worksheet('student_state').get_all_values()
+        _state_rows['rows'] = {str(row[0]): number for number, row in enumerate(rows, start=1) if number > 1 and row}
+        for row in rows[1:]:
+            payload = ''.join(row[2:]) if row else ''
+            if payload:
+                states[str(row[0])] = json.loads(payload)
+    except Exception as e:
+        print(f"⚠️ Could not read student states: {e}")
+    
+    # Snapshots already in memory are at least as fresh as the sheet
+    states.update(_student_state_cache)
+    return states
+
+def get_class_states(sessions_df, student_ids, juzhali_length=10):
+    """
+    Current snapshots for a whole class: stored ones from one read of the
+    student_state sheet; missing or outdated ones (or ones built for
+    another Juzhali length) are rebuilt once from the bulk sessions frame,
+    kept in memory and saved in one background write.
+    """
+    states = load_all_student_states()
+    groups = sessions_df.groupby('student_id').groups if sessions_df is not None and not sessions_df.empty else {}
+    
+    rebuilt = {}
+    for student_id in student_ids:
+        state = states.get(str(student_id))
+        if not is_current_state(state, juzhali_length):
+            rows = groups.get(student_id)
+            state = build_student_state(
+                student_id, sessions_df.loc[rows] if rows is not None else None, juzhali_length
+            )
+            states[str(student_id)] = rebuilt[student_id] = state
+            _remember_student_state(student_id, state)
+    
+    if rebuilt:
+        write_queue.submit(f"Save {len(rebuilt)} rebuilt snapshots", save_student_states, copy.deepcopy(rebuilt))
+    return states
+
 def get_student_data(student_id):
     """Get all data for a student by type"""
     all_sessions = get_all_student_sessions(student_id)
@@ -372,47 +670,865 @@ def get_student_data(student_id):
     
     return jadeed, juzhali, murajaat
 
-def append_new_session(student_id, session_type, session_data):
-    """Add a new session"""
+# ============================================================================
+# STUDENT STATE SNAPSHOT (student_state sheet)
+# ============================================================================
+
+_student_state_cache = {}
+_review_queue_cache = {}
+_aggregates_cache = {}
+
+# Row number of each student's snapshot ({str(id): row}), read once per
+# process - rows are only ever appended, so numbers never move
+_state_rows = {'rows': None}
+
+def _state_row_number(worksheet, student_id):
+    """Sheet row holding a student's snapshot (None if there is none yet)"""
+    rows = _state_rows['rows']
+    if rows is None or str(student_id) not in rows:
+        # First lookup, or added by another session since - re-read the ids
+        ids = worksheet.col_values(1)
+        rows = {str(value): number for number, value in enumerate(ids, start=1) if number > 1}
+        _state_rows['rows'] = rows
+    return rows.get(str(student_id))
+
+def _remember_state_row(student_id, append_response):
+    """Note where an appended snapshot landed ('updatedRange' of the append)"""
+    try:
+        updated_range = append_response['updates']['updatedRange']
+        row_number = int(re.search(r'![A-Z]+(\d+)', updated_range).group(1))
+    except (KeyError, TypeError, AttributeError, ValueError):
+        _state_rows['rows'] = None
+        return
+    if _state_rows['rows'] is not None:
+        _state_rows['rows'][str(student_id)] = row_number
+
+def _state_row(worksheet, student_id, state):
+    """A snapshot as one sheet row (split into cells, padded to blank old chunks)"""
+    payload = json.dumps(state, separators=(',', ':'), ensure_ascii=False)
+    chunks = [payload[i:i + STATE_CELL_LIMIT] for i in range(0, len(payload), STATE_CELL_LIMIT)]
+    row = [student_id, state.get('updated_at') or datetime.now().strftime('%Y-%m-%d %H:%M:%S')] + chunks
+    
+    if len(row) > worksheet.col_count:
+        worksheet.add_cols(len(row) - worksheet.col_count)
+    
+    # Blank out any chunk cells left over from a previously larger snapshot
+    return row + [''] * (worksheet.col_count - len(row))
+
+def _remember_student_state(student_id, state):
+    """Keep a just-written snapshot in memory"""
+    # A replaced snapshot invalidates the due queue built from the old one
+    if _student_state_cache.get(str(student_id)) is not state:
+        _review_queue_cache.pop(str(student_id), None)
+        _aggregates_cache.pop(str(student_id), None)
+    _student_state_cache[str(student_id)] = state
+
+@timed('sheets.load_student_state')
+def load_student_state(student_id):
+    """Read a student's snapshot from the student_state sheet (None if missing)"""
+    spreadsheet = get_google_sheet()
+    if not spreadsheet:
+        raise ConnectionError("No connection to Google Sheets")
+    
+    worksheet = spreadsheet.worksheet('student_state')
+    row_number = _state_row_number(worksheet, student_id)
+    if not row_number:
+        return None
+    
+    row = worksheet.row_values(row_number)
+    payload = ''.join(row[2:])
+    return json.loads(payload) if payload else None
+
+@timed('sheets.save_student_state')
+def save_student_state(student_id, state, remember=True):
+    """
+    Write a student's snapshot to the student_state sheet (one row per
+    student). Background writes pass remember=False: they hold a copy,
+    and the in-memory snapshot may already be ahead of it.
+    """
+    spreadsheet = get_google_sheet()
+    if not spreadsheet:
+        return False
+    
+    worksheet = spreadsheet.worksheet('student_state')
+    row = _state_row(worksheet, student_id, state)
+    row_number = _state_row_number(worksheet, student_id)
+    
+    if row_number:
+        worksheet.update(f'A{row_number}', [row])
+    else:
+        response = worksheet.append_row(row)
+        _remember_state_row(student_id, response)
+    
+    if remember:
+        _remember_student_state(student_id, state)
+    return True
+
+@timed('sheets.save_student_states')
+def save_student_states(states):
+    """
+    Write many snapshots ({student_id: state}) at once: one batch update
+    for students that already have a row, one append for the rest.
+    """
+    spreadsheet = get_google_sheet()
+    if not spreadsheet:
+        return False
+    
+    worksheet = spreadsheet.worksheet('student_state')
+    updates, new_rows = [], []
+    for student_id, state in states.items():
+        row = _state_row(worksheet, student_id, state)
+        row_number = _state_row_number(worksheet, student_id)
+        if row_number:
+            updates.append({'range': f'A{row_number}', 'values': [row]})
+        else:
+            new_rows.append(row)
+    
+    if updates:
+        worksheet.batch_update(updates)
+    if new_rows:
+        worksheet.append_rows(new_rows)
+        _state_rows['rows'] = None
+    return True
+
+def _cell_data(value):
+    """One value as batch_update CellData (stored as a RAW append would store it)"""
+    if value is None or (isinstance(value, float) and pd.isna(value)) or (isinstance(value, str) and value == ''):
+        return {}
+    if isinstance(value, bool):
+        return {'userEnteredValue': {'boolValue': value}}
+    if isinstance(value, numbers.Number):
+        number = int(value) if isinstance(value, numbers.Integral) else float(value)
+        return {'userEnteredValue': {'numberValue': number}}
+    return {'userEnteredValue': {'stringValue': str(value)}}
+
+def _rows_data(rows):
+    return [{'values': [_cell_data(value) for value in row]} for row in rows]
+
+@timed('sheets.write_sessions_and_state')
+def _write_sessions_and_state(spreadsheet, sessions_ws, session_rows, student_id, state):
+    """
+    Append session rows, their page-level rows AND write the student's
+    snapshot in one batch_update call - one write instead of four, and
+    none of them can be saved without the others. `state` is the job's
+    own copy, so the in-memory snapshot is left alone.
+    """
+    requests = [{'appendCells': {
+        'sheetId': sessions_ws.id, 'rows': _rows_data(session_rows), 'fields': 'userEnteredValue'
+    }}]
+    fact_rows = _page_fact_rows(session_rows)
+    if fact_rows:
+        requests.append({'appendCells': {
+            'sheetId': spreadsheet.worksheet('page_sessions').id,
+            'rows': _rows_data(fact_rows), 'fields': 'userEnteredValue'
+        }})
+    
+    # No snapshot when it couldn't be loaded at save time (see _catch_up_state)
+    row_number = None
+    if state is not None:
+        state_ws = spreadsheet.worksheet('student_state')
+        state_row = _state_row(state_ws, student_id, state)
+        row_number = _state_row_number(state_ws, student_id)
+        if row_number:
+            requests.append({'updateCells': {
+                'start': {'sheetId': state_ws.id, 'rowIndex': row_number - 1, 'columnIndex': 0},
+                'rows': _rows_data([state_row]), 'fields': 'userEnteredValue'
+            }})
+        else:
+            requests.append({'appendCells': {
+                'sheetId': state_ws.id, 'rows': _rows_data([state_row]), 'fields': 'userEnteredValue'
+            }})
+    
+    spreadsheet.batch_update({'requests': requests})
+    if state is not None and not row_number:
+        _state_rows['rows'] = None
+
+def _student_state(student_id, sessions_df=None, juzhali_length=None):
+    """
+    A student's snapshot - from memory, then the sheet, and only rebuilt
+    from the full session history if it's missing, outdated or built for
+    another Juzhali length (None accepts any). Raises if the sheet (or, for
+    a rebuild, the history) can't be read: nothing is rebuilt, saved or
+    cached from a failed read.
+    """
+    cached = _student_state_cache.get(str(student_id))
+    if is_current_state(cached, juzhali_length):
+        return cached
+    
+    # The due queue follows the snapshot's graduated pages
+    _review_queue_cache.pop(str(student_id), None)
+    state = load_student_state(student_id)
+    
+    if not is_current_state(state, juzhali_length):
+        # Frames from a failed read carry no data_version
+        if sessions_df is None or sessions_df.attrs.get('data_version') is None:
+            sessions_df = get_all_student_sessions(student_id)
+        if sessions_df.attrs.get('data_version') is None:
+            raise ConnectionError("Could not read the session history")
+        if juzhali_length is None:
+            juzhali_length = (state or cached or {}).get('juzhali_length', 10)
+        state = build_student_state(student_id, sessions_df, juzhali_length)
+        try:
+            save_student_state(student_id, state)
+        except Exception as e:
+            print(f"⚠️ Could not save student state: {e}")
+    
+    _student_state_cache[str(student_id)] = state
+    return state
+
+def get_student_state(student_id, sessions_df=None, juzhali_length=None):
+    """
+    Get a student's snapshot for display (rebuilt if it was made for
+    another Juzhali length). If it can't be read right now a blank one is
+    shown instead (never saved or cached).
+    """
+    try:
+        return _student_state(student_id, sessions_df, juzhali_length)
+    except Exception as e:
+        print(f"⚠️ Could not read student state: {e}")
+        return empty_student_state(student_id, juzhali_length or 10)
+
+def get_review_queue(student_id, sessions_df=None, juzhali_length=None):
+    """Spaced-repetition due queue for a student's graduated pages (kept in memory)"""
+    queue = _review_queue_cache.get(str(student_id))
+    if queue is None or not is_current_state(_student_state_cache.get(str(student_id)), juzhali_length):
+        try:
+            state = _student_state(student_id, sessions_df, juzhali_length)
+        except Exception as e:
+            print(f"⚠️ Could not read student state: {e}")
+            return build_review_queue(empty_student_state(student_id, juzhali_length or 10))
+        queue = build_review_queue(state)
+        _review_queue_cache[str(student_id)] = queue
+    return queue
+
+def get_student_aggregates(student_id, sessions_df=None):
+    """Weekly/monthly chart aggregates for a student (built once, then kept up to date)"""
+    aggregates = _aggregates_cache.get(str(student_id))
+    if aggregates is None:
+        if sessions_df is None:
+            sessions_df = get_all_student_sessions(student_id)
+        aggregates = build_aggregates(sessions_df)
+        _aggregates_cache[str(student_id)] = aggregates
+    return aggregates
+
+def _apply_state_updates(student_id, state, updates, data_format='session_entry', save=True):
+    """
+    Fold newly saved sessions into the snapshot - never fails the save
+    itself. With save=False only the in-memory snapshot, queue and
+    aggregates change (the caller writes the snapshot later).
+    """
+    try:
+        reviewed_pages = set()
+        for session_type, session_data in updates:
+            apply_session_to_state(state, session_type, session_data, data_format)
+            if session_type in REVIEW_SESSION_TYPES:
+                reviewed_pages.update(session_pages(session_type, session_data, data_format))
+        
+        # Only the pages just reviewed move in the due queue
+        queue = _review_queue_cache.get(str(student_id))
+        if queue is not None:
+            update_review_queue(queue, state, reviewed_pages)
+        
+        aggregates = _aggregates_cache.get(str(student_id))
+        if aggregates is not None:
+            for session_type, session_data in updates:
+                add_session_to_aggregates(aggregates, session_type, session_data)
+        
+        if save:
+            save_student_state(student_id, state)
+    except Exception as e:
+        print(f"⚠️ Could not update student state: {e}")
+
+# ============================================================================
+# PAGE-LEVEL FACT TABLE (page_sessions sheet)
+# ============================================================================
+
+SESSION_HEADERS = ['id', 'student_id', 'session_type', 'date', 'sipara',
+                   'page', 'jadeed_page', 'ending_ayah', 'talqeen_count',
+                   'tambeeh_count', 'core_mistake', 'specific_mistake',
+                   'overall_grade', 'notes', 'data_format', 'created_at',
+                   'page_map']
+
+def _page_fact_rows(session_rows):
+    """Page-level sheet rows for sessions-sheet rows ([] if they can't be built)"""
+    try:
+        raw = pd.DataFrame(session_rows, columns=SESSION_HEADERS)
+        return page_facts_to_rows(explode_sessions(standardize_sessions(raw)))
+    except Exception as e:
+        print(f"⚠️ Could not build page-level rows: {e}")
+        schedule_page_facts_reconcile()
+        return []
+
+def _append_page_facts(spreadsheet, session_rows):
+    """Write the page-level rows for newly saved sessions - never fails the save"""
+    try:
+        rows = _page_fact_rows(session_rows)
+        if rows:
+            spreadsheet.worksheet('page_sessions').append_rows(rows, value_input_option='USER_ENTERED')
+    except Exception as e:
+        # The sessions are saved; the page rows catch up on the next reconcile
+        print(f"⚠️ Could not write page-level rows: {e}")
+        schedule_page_facts_reconcile()
+
+def _overwrite_sheet(worksheet, values):
+    """
+    Replace a worksheet's contents with `values` (header included): one
+    update over the old rows, and a resize that drops any left over -
+    the sheet is never empty in between.
+    """
+    if worksheet.row_count < len(values):
+        worksheet.resize(rows=len(values))
+    worksheet.update('A1', values)
+    if worksheet.row_count > len(values):
+        worksheet.resize(rows=len(values))
+
+def backfill_page_facts(spreadsheet=None, facts=None):
+    """Rebuild the whole page_sessions sheet from the sessions history"""
+    try:
+        spreadsheet = spreadsheet or get_google_sheet()
+        if not spreadsheet:
+            return 0
+        
+        if facts is None:
+            data = spreadsheet.worksheet('sessions').get_all_records()
+            facts = explode_sessions(standardize_sessions(pd.DataFrame(data))) if data else explode_sessions(None)
+        
+        worksheet = spreadsheet.worksheet('page_sessions')
+        _overwrite_sheet(worksheet, [PAGE_FACT_COLUMNS] + page_facts_to_rows(facts))
+        
+        print(f"✅ Backfilled {len(facts)} page-level rows")
+        return len(facts)
+    except Exception as e:
+        print(f"❌ Error backfilling page-level rows: {e}")
+        return 0
+
+def _facts_by_session(session_ids, pages):
+    """(row count, page sum) per session id - enough to spot missing or remapped rows"""
+    frame = pd.DataFrame({
+        'session_id': pd.to_numeric(pd.Series(session_ids, dtype=object), errors='coerce'),
+        'page': pd.to_numeric(pd.Series(pages, dtype=object), errors='coerce')
+    }).dropna()
+    return frame.groupby('session_id')['page'].agg(['size', 'sum'])
+
+@timed('sheets.reconcile_page_facts')
+def reconcile_page_facts():
+    """
+    Bring the page_sessions sheet back in line with the sessions sheet.
+    Sessions without page rows get theirs appended; if any session's rows
+    differ (count or pages), the whole sheet is rebuilt. Rows of sessions
+    newer than our read of the sessions sheet are left alone.
+    """
+    spreadsheet = get_google_sheet()
+    if not spreadsheet:
+        raise ConnectionError("No connection to Google Sheets")
+    
+    data = spreadsheet.worksheet('sessions').get_all_records()
+    expected = explode_sessions(standardize_sessions(pd.DataFrame(data))) if data else explode_sessions(None)
+    
+    worksheet = spreadsheet.worksheet('page_sessions')
+    stored_ids = worksheet.col_values(PAGE_FACT_COLUMNS.index('session_id') + 1)[1:]
+    stored_pages = worksheet.col_values(PAGE_FACT_COLUMNS.index('page') + 1)[1:]
+    
+    want = _facts_by_session(expected['session_id'], expected['page'])
+    have = _facts_by_session(stored_ids, stored_pages[:len(stored_ids)])
+    if not want.empty:
+        have = have[have.index <= want.index.max()]
+    
+    shared = want.index.intersection(have.index)
+    stale = have.index.difference(want.index).union(
+        shared[(want.loc[shared] != have.loc[shared]).any(axis=1)]
+    )
+    if len(stale):
+        print(f"⚠️ {len(stale)} sessions have wrong page-level rows - rebuilding page_sessions")
+        backfill_page_facts(spreadsheet, expected)
+        return True
+    
+    missing = expected[expected['session_id'].isin(want.index.difference(have.index))]
+    if not missing.empty:
+        worksheet.append_rows(page_facts_to_rows(missing), value_input_option='USER_ENTERED')
+        print(f"✅ Added page-level rows for {missing['session_id'].nunique()} sessions")
+    return True
+
+_reconcile_job = {'job': None}
+
+def schedule_page_facts_reconcile(owner=None):
+    """Queue one page_sessions reconcile on the background writer (unless one is already waiting)"""
+    job = _reconcile_job['job']
+    if job is not None and job.status == write_queue.PENDING:
+        return job
+    job = write_queue.submit("Check page-level rows", reconcile_page_facts, owner=owner)
+    _reconcile_job['job'] = job
+    return job
+
+@timed('sheets.get_page_facts')
+def get_page_facts(student_id=None):
+    """Page-level rows for one student (or everyone if student_id is None)"""
     try:
         spreadsheet = get_google_sheet()
         if not spreadsheet:
-            return False
+            return explode_sessions(None)
         
+        facts = rows_to_page_facts(spreadsheet.worksheet('page_sessions').get_all_records())
+        if student_id is not None:
+            facts = facts[facts['student_id'] == student_id]
+        return facts
+    except Exception as e:
+        print(f"❌ Error getting page-level rows: {e}")
+        return explode_sessions(None)
+
+# ============================================================================
+# RETENTION MODEL (retention_model sheet)
+# ============================================================================
+
+# Fitted parameters as last read from (or written to) the sheet
+_retention_cache = {'params': None}
+_refit_job = {'job': None}
+
+# Writes within this many seconds of each other share one refit
+RETENTION_REFIT_DELAY = 300
+
+@timed('sheets.refit_retention_model')
+def refit_retention_model():
+    """
+    Fit forgetting curves for every page of every student in one pass
+    and store the parameters in the retention_model sheet. Runs on the
+    background writer (see schedule_retention_refit), never on a page run.
+    """
+    params = fit_retention(get_session_page_facts(get_all_sessions()))
+    
+    spreadsheet = get_google_sheet()
+    if not spreadsheet:
+        raise ConnectionError("No connection to Google Sheets")
+    _overwrite_sheet(spreadsheet.worksheet('retention_model'), [RETENTION_COLUMNS] + params_to_rows(params))
+    
+    _retention_cache['params'] = params
+    return params
+
+def schedule_retention_refit(delay=RETENTION_REFIT_DELAY, owner=None):
+    """
+    Queue a refit to run `delay` seconds from now - unless one is already
+    waiting, which will see the new sessions too.
+    """
+    job = _refit_job['job']
+    if job is not None and job.status == write_queue.PENDING:
+        return job
+    job = write_queue.submit("Refit forgetting curves", refit_retention_model, owner=owner, delay=delay)
+    _refit_job['job'] = job
+    return job
+
+@timed('sheets.get_retention_model')
+def get_retention_model(student_id=None):
+    """Stored per-page parameters (read from the retention_model sheet once, then kept)"""
+    params = _retention_cache['params']
+    if params is None:
+        try:
+            spreadsheet = get_google_sheet()
+            records = spreadsheet.worksheet('retention_model').get_all_records() if spreadsheet else []
+            params = rows_to_params(records)
+        except Exception as e:
+            print(f"❌ Error reading retention model: {e}")
+            return fit_retention(None)
+        _retention_cache['params'] = params
+        if params.empty:
+            # Never fitted yet - fit now in the background
+            schedule_retention_refit(delay=0)
+    if student_id is not None:
+        params = params[params['student_id'] == student_id]
+    return params
+
+# ============================================================================
+# GRADE-DROP DETECTION
+# ============================================================================
+
+_regressions_cache = {}
+
+def get_regressions(student_id=None):
+    """
+    Flagged sipara/page grade drops - for one student from their own
+    sessions frame, or for every student from the bulk frame. Re-run once
+    per data version.
+    """
+    if student_id is not None:
+        sessions = get_all_student_sessions(student_id)
+        cache_key = _frame_cache_key(sessions) if not sessions.empty else None
+    else:
+        sessions = get_all_sessions()
+        cache_key = ('all', get_data_version())
+    
+    if cache_key is not None and cache_key in _regressions_cache:
+        return _regressions_cache[cache_key]
+    
+    flags = find_regressions(get_session_page_facts(sessions))
+    if student_id is not None:
+        flags = flags[flags['student_id'] == student_id]
+    
+    if cache_key is not None:
+        if len(_regressions_cache) > 32:
+            _regressions_cache.clear()
+        _regressions_cache[cache_key] = flags
+    return flags
+
+def _session_row(new_id, student_id, session_type, session_data):
+    """Sessions-sheet row for one entered session"""
+    date_str = session_data['date']
+    if hasattr(date_str, 'strftime'):
+        date_str = date_str.strftime('%Y-%m-%d')
+    
+    return [
+        new_id,
+        student_id,
+        session_type,
+        date_str,
+        session_data.get('sipara', ''),
+        session_data.get('page_tested', ''),
+        session_data.get('jadeed_page', ''),
+        session_data.get('end_ayah', ''),
+        session_data.get('talqeen_count', 0),
+        session_data.get('tambeeh_count', 0),
+        session_data.get('core_mistake_type', ''),
+        session_data.get('specific_mistake', ''),
+        session_data.get('overall_grade', ''),
+        session_data.get('notes', ''),
+        'session_entry',
+        datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        PAGE_MAP
+    ]
+
+def _local_append(student_id, session_rows, loaded_version):
+    """
+    Add just-saved rows to the cached student frame (as get_all_records
+    would read them back) instead of downloading the sheet again. If the
+    cache wasn't current before the save it's dropped and refetched.
+    """
+    cached = _student_sessions_cache.get(str(student_id))
+    if cached is None or cached.attrs.get('data_version') != loaded_version:
+        _student_sessions_cache.pop(str(student_id), None)
+        return
+    
+    try:
+        records = [
+            [gspread.utils.numericise('' if value is None else value) for value in row]
+            for row in session_rows
+        ]
+        # Provisional record index after the cached rows (ids are only
+        # assigned when the background write reaches the sheet)
+        start = int(cached.index.max()) + 1 if len(cached) else 0
+        new_rows = pd.DataFrame(records, columns=SESSION_HEADERS, index=range(start, start + len(records)))
+        df = pd.concat([cached, standardize_sessions(new_rows)]).sort_values('Date', ascending=False)
+        df.attrs['data_version'] = get_data_version()
+        _student_sessions_cache[str(student_id)] = df
+    except Exception as e:
+        print(f"⚠️ Could not update cached sessions: {e}")
+        _student_sessions_cache.pop(str(student_id), None)
+
+def _confirm_local_append(student_id, local_version):
+    """
+    After a background write commits: bump the data version (results read
+    from the sheet meanwhile are stale) but keep the locally appended frame.
+    """
+    version = bump_data_version()
+    cached = _student_sessions_cache.get(str(student_id))
+    if cached is not None and cached.attrs.get('data_version') == local_version:
+        cached.attrs['data_version'] = version
+
+def _catch_up_state(student_id, sessions, data_format='session_entry'):
+    """
+    Fold sessions written without the in-memory snapshot (saved during an
+    outage, or uploaded in the background) into the stored one. A missing
+    or outdated snapshot is left alone - it gets rebuilt from the sessions
+    sheet, which already has them.
+    """
+    state = load_student_state(student_id)
+    if is_current_state(state):
+        for session_type, session_data in sessions:
+            apply_session_to_state(state, session_type, session_data, data_format)
+        save_student_state(student_id, state, remember=False)
+    
+    # A snapshot in memory lacks these sessions - read it again
+    _student_state_cache.pop(str(student_id), None)
+    _review_queue_cache.pop(str(student_id), None)
+    _aggregates_cache.pop(str(student_id), None)
+
+@timed('sheets.commit_sessions')
+def _commit_sessions(student_id, new_rows, student_state, local_version, progress, entry_ids=(), sessions=()):
+    """
+    Background part of append_new_sessions. Steps already done are
+    recorded in `progress`, so a retry never appends the rows twice.
+    """
+    spreadsheet = get_google_sheet()
+    if not spreadsheet:
+        raise ConnectionError("No connection to Google Sheets")
+    
+    if not progress.get('rows'):
+        # A journal replay may already have written them
+        if entry_ids and not write_journal.pending_ids(entry_ids):
+            progress['rows'] = True
+            _confirm_local_append(student_id, local_version)
+    
+    if not progress.get('rows'):
         worksheet = spreadsheet.worksheet('sessions')
-        existing_data = worksheet.get_all_values()
-        new_id = len(existing_data)
-        
-        date_str = session_data['date']
-        if hasattr(date_str, 'strftime'):
-            date_str = date_str.strftime('%Y-%m-%d')
-        
-        new_row = [
-            new_id,
-            student_id,
-            session_type,
-            date_str,
-            session_data.get('sipara', ''),
-            session_data.get('page_tested', ''),
-            session_data.get('jadeed_page', ''),
-            session_data.get('end_ayah', ''),
-            session_data.get('talqeen_count', 0),
-            session_data.get('tambeeh_count', 0),
-            session_data.get('core_mistake_type', ''),
-            session_data.get('specific_mistake', ''),
-            session_data.get('overall_grade', ''),
-            session_data.get('notes', ''),
-            'session_entry',
-            datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        first_id = len(worksheet.col_values(1))
+        for offset, row in enumerate(new_rows):
+            row[0] = first_id + offset
+        
+        _write_sessions_and_state(spreadsheet, worksheet, new_rows, student_id, student_state)
+        _expect_session_rows(len(new_rows))
+        write_journal.mark_committed(entry_ids)
+        progress['rows'] = progress['state'] = True
+        _confirm_local_append(student_id, local_version)
+        schedule_retention_refit()
+    
+    if not progress.get('state'):
+        if student_state is not None:
+            save_student_state(student_id, student_state, remember=False)
+        else:
+            _catch_up_state(student_id, sessions)
+        progress['state'] = True
+    
+    # Sheets is reachable again - flush anything left from earlier failures
+    if write_journal.pending_count():
+        schedule_journal_replay()
+    
+    return True
+
+def append_new_sessions(student_id, sessions, owner=None):
+    """
+    Save several entered sessions - [(session_type, session_data), ...].
+    
+    The cached student frame and snapshot are updated right away; the
+    Sheets write itself (one append) runs on the background writer.
+    Returns the write job (see write_queue) or False.
+    """
+    try:
+        new_rows = [
+            _session_row(None, student_id, session_type, session_data)
+            for session_type, session_data in sessions
         ]
         
-        worksheet.append_row(new_row)
-        return True
+        # On disk before anything else - even the snapshot read below
+        # needs Sheets - so an outage can't lose the entry
+        try:
+            entry_ids = write_journal.record(student_id, new_rows)
+        except Exception as e:
+            print(f"⚠️ Could not journal session rows: {e}")
+            entry_ids = []
+        
+        # Load the snapshot BEFORE the rows reach the cached frame so a
+        # first-time backfill doesn't already contain them. Without it the
+        # rows still save; the writer folds them in later (_catch_up_state)
+        try:
+            student_state = _student_state(student_id)
+        except Exception as e:
+            print(f"⚠️ Could not load student state: {e}")
+            student_state = None
+        loaded_version = get_data_version()
+        
+        local_version = bump_data_version()
+        _local_append(student_id, new_rows, loaded_version)
+        if student_state is not None:
+            _apply_state_updates(student_id, student_state, sessions, save=False)
+            # The page run keeps updating the cached snapshot - the writer
+            # saves it as of these rows, never with later uncommitted ones
+            student_state = copy.deepcopy(student_state)
+        
+        return write_queue.submit(
+            f"Save {len(new_rows)} session row{'s' if len(new_rows) != 1 else ''}",
+            _commit_sessions, student_id, new_rows, student_state, local_version, {}, entry_ids, sessions,
+            owner=owner
+        )
     
     except Exception as e:
         print(f"❌ Error saving session: {e}")
         return False
 
+_replay_job = {'job': None}
+
+@timed('sheets.replay_journal')
+def replay_journal():
+    """
+    Write every journaled-but-unsaved session row to the sheet, oldest
+    first, one append per batch. Rows already in the sheet (written just
+    before a crash) are skipped. Affected snapshots are rebuilt.
+    """
+    spreadsheet = get_google_sheet()
+    if not spreadsheet:
+        raise ConnectionError("No connection to Google Sheets")
+    
+    worksheet = spreadsheet.worksheet('sessions')
+    existing = worksheet.get_all_values()
+    existing_keys = {write_journal.row_key(row) for row in existing[1:]}
+    next_id = len(existing)
+    
+    replayed = 0
+    students = set()
+    while True:
+        batch = write_journal.pending_entries()
+        if not batch:
+            break
+        
+        rows = []
+        for _, student_id, row in batch:
+            key = write_journal.row_key(row)
+            if key in existing_keys:
+                continue
+            row[0] = next_id
+            next_id += 1
+            existing_keys.add(key)
+            rows.append(row)
+            students.add(student_id)
+        
+        if rows:
+            worksheet.append_rows(rows)
+            _expect_session_rows(len(rows))
+            _append_page_facts(spreadsheet, rows)
+        write_journal.mark_committed([entry_id for entry_id, _, _ in batch])
+        replayed += len(rows)
+    
+    if replayed:
+        bump_data_version()
+        schedule_retention_refit()
+        print(f"✅ Replayed {replayed} journaled session rows")
+    
+    # Snapshots saved before the outage don't include the replayed rows
+    for student_id in students:
+        student_id = int(student_id) if str(student_id).isdigit() else student_id
+        juzhali_length = _student_state_cache.get(str(student_id), {}).get('juzhali_length', 10)
+        state = build_student_state(student_id, get_all_student_sessions(student_id, refresh=True), juzhali_length)
+        save_student_state(student_id, state)
+    
+    return True
+
+def schedule_journal_replay(owner=None):
+    """Queue one journal replay on the background writer (unless one is already waiting)"""
+    job = _replay_job['job']
+    if job is not None and job.status == write_queue.PENDING:
+        return job
+    job = write_queue.submit("Replay offline saves", replay_journal, owner=owner)
+    _replay_job['job'] = job
+    return job
+
+def journal_pending_count():
+    """Saved rows still waiting in the journal for Sheets (0 if it can't be read)"""
+    try:
+        return write_journal.pending_count()
+    except Exception as e:
+        print(f"⚠️ Could not read the write journal: {e}")
+        return 0
+
+def _retry_journaled_writes():
+    """Replay the journal if rows are waiting - run on load and whenever the writer is idle"""
+    if journal_pending_count():
+        schedule_journal_replay()
+
+_journal_resumed = {'done': False}
+
+def resume_journaled_writes():
+    """
+    Replay rows left in the journal by an outage or restart. The first
+    call also checks page_sessions against the sessions sheet and has the
+    writer retry the journal whenever it sits idle, so rows don't wait for
+    the next save.
+    """
+    _retry_journaled_writes()
+    if _journal_resumed['done']:
+        return
+    _journal_resumed['done'] = True
+    write_queue.set_idle_task(_retry_journaled_writes)
+    schedule_page_facts_reconcile()
+
+def excel_upload_error(parsed_data):
+    """Why a parsed workbook can't be saved (None if it can)"""
+    if not parsed_data or parsed_data.get('error'):
+        return f"Parsed data error: {(parsed_data or {}).get('error', 'Unknown error')}"
+    student_info = parsed_data.get('student_info')
+    if student_info is None:
+        return "No student_info in parsed_data"
+    if 'Student_Name' not in student_info.columns or student_info.empty:
+        return "No Student_Name found"
+    return None
+
+@timed('sheets.commit_excel_upload')
+def _commit_excel_upload(student_name, teacher_name, session_rows, state_updates, data_format, progress):
+    """
+    Background part of save_student_from_excel_in_background: find or
+    create the student, then append the sessions and fold them into the
+    snapshot. No UI calls and no sleeping - a failure goes back to the
+    write queue, which retries later; steps done are kept in `progress`.
+    """
+    spreadsheet = get_google_sheet()
+    if not spreadsheet:
+        raise ConnectionError("No connection to Google Sheets")
+    
+    if 'student_id' not in progress:
+        students_ws = spreadsheet.worksheet('students')
+        existing = students_ws.get_all_values()
+        header = existing[0] if existing else []
+        if 'id' not in header or 'name' not in header:
+            raise write_queue.PermanentFailure("The students sheet has no id/name header")
+        ids = {row[header.index('name')]: row[header.index('id')] for row in existing[1:]}
+        if student_name in ids:
+            student_id = ids[student_name]
+            progress['student_id'] = int(student_id) if str(student_id).isdigit() else student_id
+        else:
+            new_id = len(existing)
+            students_ws.append_row([
+                new_id,
+                student_name,
+                teacher_name,
+                datetime.now().strftime('%Y-%m-%d'),
+                datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            ])
+            progress['student_id'] = new_id
+    student_id = progress['student_id']
+    
+    if session_rows and not progress.get('rows'):
+        sessions_ws = spreadsheet.worksheet('sessions')
+        first_id = len(sessions_ws.col_values(1))
+        for offset, row in enumerate(session_rows):
+            row[0] = first_id + offset
+            row[1] = student_id
+        
+        sessions_ws.append_rows(session_rows, value_input_option='USER_ENTERED')
+        _expect_session_rows(len(session_rows))
+        progress['rows'] = True
+        bump_data_version()
+        _append_page_facts(spreadsheet, session_rows)
+        schedule_retention_refit()
+    
+    if session_rows and not progress.get('state'):
+        _catch_up_state(student_id, state_updates, data_format)
+        progress['state'] = True
+    
+    return student_id
+
+def save_student_from_excel_in_background(parsed_data, owner=None):
+    """
+    Validate a parsed workbook and build its rows here (errors raise
+    ValueError for the caller to show); only the Sheets writes are queued.
+    The job's result is the student_id.
+    """
+    error = excel_upload_error(parsed_data)
+    if error:
+        raise ValueError(error)
+    
+    student_info = parsed_data['student_info']
+    student_name = student_info['Student_Name'].iloc[0]
+    teacher_name = student_info['Teacher_Name'].iloc[0] if 'Teacher_Name' in student_info.columns else 'Unknown'
+    
+    # Row ids and the student id are filled in by the writer
+    session_rows, state_updates = _excel_session_rows(parsed_data, None, 0)
+    return write_queue.submit(
+        f"Upload {student_name}",
+        _commit_excel_upload, student_name, teacher_name, session_rows, state_updates,
+        parsed_data.get('format', 'upload'), {},
+        owner=owner
+    )
+
+def append_new_session(student_id, session_type, session_data, owner=None):
+    """Add a new session"""
+    return append_new_sessions(student_id, [(session_type, session_data)], owner)
+
+@timed('sheets.export_student')
 def export_student_to_excel(student_id):
     """Export student data to Excel"""
     try:
@@ -434,26 +1550,17 @@ def export_student_to_excel(student_id):
         return None
 
 def get_data_format_info(student_id):
-    """Get info about data formats"""
+    """Get info about data formats (read from the student snapshot)"""
     try:
-        df = get_all_student_sessions(student_id)
-        
-        if df.empty:
-            return {
-                'has_uploaded': False,
-                'has_detailed': False,
-                'uploaded_count': 0,
-                'detailed_count': 0
-            }
-        
-        uploaded = df[df['Data_Format'] == 'upload']
-        detailed = df[df['Data_Format'] == 'session_entry']
+        format_counts = get_student_state(student_id).get('format_counts', {})
+        uploaded_count = format_counts.get('upload', 0)
+        detailed_count = format_counts.get('session_entry', 0)
         
         return {
-            'has_uploaded': len(uploaded) > 0,
-            'has_detailed': len(detailed) > 0,
-            'uploaded_count': len(uploaded),
-            'detailed_count': len(detailed)
+            'has_uploaded': uploaded_count > 0,
+            'has_detailed': detailed_count > 0,
+            'uploaded_count': uploaded_count,
+            'detailed_count': detailed_count
         }
     except:
         return {
@@ -463,26 +1570,129 @@ def get_data_format_info(student_id):
             'detailed_count': 0
         }
 
+_last_jadeed_cache = {}
+
+def _frame_cache_key(df):
+    """Cache key for a sessions frame stamped with a data version (else None)"""
+    version = df.attrs.get('data_version')
+    if version is None:
+        return None
+    return (version, len(df), df.index[0], df.index[-1])
+
+def get_last_jadeed_position(all_data_df):
+    """
+    Get (page, ending_ayah) of the most recent Jadeed session.
+    
+    Single linear pass (no copy/re-parse/sort), cached per data version
+    because it's called on nearly every render.
+    """
+    try:
+        if all_data_df is None or all_data_df.empty:
+            return None, None
+        
+        cache_key = _frame_cache_key(all_data_df)
+        if cache_key is not None:
+            if cache_key in _last_jadeed_cache:
+                return _last_jadeed_cache[cache_key]
+        
+        is_jadeed = all_data_df['Session_Type'] == 'Jadeed'
+        if not is_jadeed.any():
+            position = (None, None)
+        else:
+            jadeed = all_data_df[is_jadeed]
+            
+            dates = jadeed['Date']
+            if not pd.api.types.is_datetime64_any_dtype(dates):
+                dates = pd.to_datetime(dates, errors='coerce')
+            
+            pages = pd.Series(float('nan'), index=jadeed.index)
+            if 'Jadeed_Page' in jadeed.columns:
+                pages = pd.to_numeric(jadeed['Jadeed_Page'], errors='coerce')
+            if 'Page' in jadeed.columns:
+                pages = pages.fillna(pd.to_numeric(jadeed['Page'], errors='coerce'))
+            
+            # Latest date wins; several sessions on that day -> furthest page
+            latest_pages = pages[dates == dates.max()] if dates.notna().any() else pages
+            if latest_pages.notna().any():
+                latest_idx = latest_pages.idxmax()
+                ayah = float('nan')
+                if 'Ending_Ayah' in jadeed.columns:
+                    ayah = pd.to_numeric(jadeed['Ending_Ayah'], errors='coerce')[latest_idx]
+                position = (int(pages[latest_idx]), int(ayah) if pd.notna(ayah) else None)
+            else:
+                position = (None, None)
+        
+        if cache_key is not None:
+            if len(_last_jadeed_cache) > 256:
+                _last_jadeed_cache.clear()
+            _last_jadeed_cache[cache_key] = position
+        
+        return position
+    except Exception as e:
+        print(f"❌ Error getting last jadeed page: {e}")
+        return None, None
+
 def get_last_jadeed_page(all_data_df):
     """Get the last Jadeed page"""
+    return get_last_jadeed_position(all_data_df)[0]
+
+_page_facts_cache = {}
+
+def get_session_page_facts(all_data_df):
+    """
+    Page-level fact table for an already-loaded sessions frame, so the
+    screens don't have to re-read the page_sessions sheet. Cached per
+    data version.
+    """
     try:
         if all_data_df is None or all_data_df.empty:
-            return None
+            return explode_sessions(None)
         
-        jadeed = all_data_df[all_data_df['Session_Type'] == 'Jadeed'].copy()
-        if jadeed.empty:
-            return None
+        cache_key = _frame_cache_key(all_data_df)
+        if cache_key is not None and cache_key in _page_facts_cache:
+            return _page_facts_cache[cache_key]
         
-        jadeed['Date'] = pd.to_datetime(jadeed['Date'])
-        jadeed = jadeed.sort_values('Date', ascending=False)
-        latest = jadeed.iloc[0]
+        facts = explode_sessions(all_data_df)
         
-        if 'Jadeed_Page' in latest.index and pd.notna(latest['Jadeed_Page']):
-            return int(latest['Jadeed_Page'])
-        elif 'Page' in latest.index and pd.notna(latest['Page']):
-            return int(latest['Page'])
+        if cache_key is not None:
+            if len(_page_facts_cache) > 32:
+                _page_facts_cache.clear()
+            _page_facts_cache[cache_key] = facts
         
-        return None
+        return facts
     except Exception as e:
-        print(f"❌ Error getting last jadeed page: {e}")
-        return None
+        print(f"❌ Error building page-level rows: {e}")
+        return explode_sessions(None)
+
+_quran_map_cache = {}
+
+def get_page_status_map(student_df, juzhali_length=10):
+    """
+    Whole-Quran status array (one code per page, see quran_map) for one
+    student's sessions frame. Cached per data version and Juzhali length.
+    """
+    try:
+        last_jadeed_page, _ = get_last_jadeed_position(student_df)
+        if student_df is None or student_df.empty:
+            return page_status_array(None, last_jadeed_page, juzhali_length)
+        
+        cache_key = _frame_cache_key(student_df)
+        today = datetime.now().strftime('%Y-%m-%d')
+        if cache_key is not None:
+            cache_key = cache_key + (juzhali_length, today)
+            if cache_key in _quran_map_cache:
+                return _quran_map_cache[cache_key]
+        
+        status = page_status_array(
+            get_session_page_facts(student_df), last_jadeed_page, juzhali_length, today
+        )
+        
+        if cache_key is not None:
+            if len(_quran_map_cache) > 32:
+                _quran_map_cache.clear()
+            _quran_map_cache[cache_key] = status
+        
+        return status
+    except Exception as e:
+        print(f"❌ Error building Quran page map: {e}")
+        return page_status_array(None, None)
@@ -6,7 +6,10 @@
 import pandas as pd
 import numpy as np
 from io import BytesIO
-import openpyxl
+
+from mushaf_index import TOTAL_PAGES
+from page_ranges import PageSet
+from profiler import timed
 
 # ===== FUNCTION 1: DETECT FORMAT =====
 def detect_excel_format(xls):
@@ -214,6 +217,7 @@ def parse_session_entry_format(xls):
         }
 
 # ===== FUNCTION 4: MAIN PARSE FUNCTION =====
+@timed('excel.parse')
 def parse_excel_file(uploaded_file):
     """
     Main function to parse Excel file - auto-detects format.
@@ -260,31 +264,69 @@ def calculate_juzhali_range(last_jadeed_page, juzhali_length=10):
     if last_jadeed_page is None:
         return None, None
     
-    juzhali_end = last_jadeed_page
+    juzhali_end = min(last_jadeed_page, TOTAL_PAGES)
     juzhali_start = max(1, juzhali_end - juzhali_length + 1)
     
     return juzhali_start, juzhali_end
 
-def get_murajaat_available_pages(last_jadeed_page, juzhali_length=10):
-    """Get pages available for Murajaat review"""
+def get_memorized_pages(last_jadeed_page):
+    """All pages memorized so far (1 to last Jadeed page) as a PageSet"""
     if last_jadeed_page is None:
-        return {}
+        return PageSet()
+    return PageSet.from_range(1, min(last_jadeed_page, TOTAL_PAGES))
+
+def get_juzhali_pages(last_jadeed_page, juzhali_length=10):
+    """Pages in the current Juzhali window as a PageSet"""
+    juzhali_start, juzhali_end = calculate_juzhali_range(last_jadeed_page, juzhali_length)
+    if juzhali_start is None:
+        return PageSet()
+    return PageSet.from_range(juzhali_start, juzhali_end)
+
+def get_graduated_pages(last_jadeed_page, juzhali_length=10):
+    """Pages that have left the Juzhali window (memorized minus Juzhali)"""
+    return get_memorized_pages(last_jadeed_page) - get_juzhali_pages(last_jadeed_page, juzhali_length)
+
+def get_murajaat_available_pages(last_jadeed_page, juzhali_length=10):
+    """Get pages available for Murajaat as {sipara: [pages in sipara]}"""
+    graduated = get_graduated_pages(last_jadeed_page, juzhali_length)
+    return {str(sipara): pages for sipara, pages in graduated.by_sipara().items()}
+
+def grade_to_numeric(grade):
+    """Convert grade to numeric score - FIXED FOR ARABIC GRADES"""
+    if pd.isna(grade):
+        return np.nan
     
-    juzhali_start, _ = calculate_juzhali_range(last_jadeed_page, juzhali_length)
+    if isinstance(grade, (int, float)):
+        return float(grade)
     
-    murajaat_pages = {}
+    grade_str = str(grade).strip()
     
-    # Add all completed siparas (pages before Juzhali)
-    for page in range(1, juzhali_start):
-        sipara = ((page - 1) // 20) + 1
-        page_in_sipara = ((page - 1) % 20) + 1
-        
-        if str(sipara) not in murajaat_pages:
-            murajaat_pages[str(sipara)] = []
-        
-        murajaat_pages[str(sipara)].append(page_in_sipara)
+    # Try to convert directly to float first
+    try:
+        return float(grade_str)
+    except ValueError:
+        pass
     
-    return murajaat_pages
+    # Handle Arabic and English grade texts
+    grade_lower = grade_str.lower()
+    
+    # Arabic grade mappings
+    if 'جيد جدا' in grade_str or 'jayyid jiddan' in grade_lower or 'excellent' in grade_lower:
+        return 10  # ✅ Excellent = 10/10
+    elif 'جيد' in grade_str or 'jayyid' in grade_lower or 'good' in grade_lower:
+        return 8   # ✅ Good = 8/10  
+    elif 'متوسط' in grade_str or 'mutawassit' in grade_lower or 'average' in grade_lower:
+        return 6   # ✅ Average = 6/10
+    elif 'ضعيف' in grade_str or "da'eef" in grade_lower or 'weak' in grade_lower:
+        return 4   # ✅ Weak = 4/10
+    
+    return np.nan  # Could not convert
+
+def grades_to_numeric(grades):
+    """Vectorized grade_to_numeric - each distinct grade is converted once"""
+    grades = pd.Series(grades)
+    lookup = {grade: grade_to_numeric(grade) for grade in grades.dropna().unique()}
+    return grades.map(lookup).astype(float)
 
 def convert_df_for_dashboard(jadeed_df, juzhali_df, murajaat_df):
     """Convert data for dashboard use"""
@@ -0,0 +1,129 @@
+# ============================================================================
+# FILE: lazy_imports.py - DEFERRED LOADING OF HEAVY LIBRARIES
+# ============================================================================
+# Charting (plotly, altair), Sheets (gspread, oauth2client) and Excel
+# (openpyxl) together take most of a cold start, yet the access-code page
+# and the Help page use none of them. Modules bind them with lazy_module()
+# instead of `import`; the real import happens on first attribute access.
+#
+# Run `python lazy_imports.py` to measure the startup imports against
+# IMPORT_BUDGET_SECONDS (exits non-zero when over budget, or when a deferred
+# library gets imported eagerly again). Streamlit, pandas and numpy are
+# needed by every page and take most of the time on their own, so they are
+# timed separately and the budget covers what the app adds on top. The
+# first (cold) run is reported; the median of the others is checked.
+
+import importlib
+import statistics
+import subprocess
+import sys
+import time
+
+# Libraries that must not load at startup (streamlit itself pulls in the
+# cheap plotly.graph_objects shell, so that one is not checked)
+DEFERRED_MODULES = [
+    'plotly.express', 'altair', 'gspread', 'oauth2client', 'openpyxl'
+]
+
+# Libraries every page needs, deferred or not
+BASE_MODULES = ['streamlit', 'pandas', 'numpy']
+
+# Everything app.py imports before it can draw the access-code page, and app itself
+STARTUP_MODULES = [
+    'database', 'mushaf_index', 'charts', 'quran_map', 'page_grid', 'cohort',
+    'page_ranges', 'retention_model', 'student_state', 'timeseries',
+    'write_queue', 'excel_handler', 'profiler', 'app'
+]
+
+# Seconds the startup modules may add to BASE_MODULES (median of RUNS)
+IMPORT_BUDGET_SECONDS = 0.3
+RUNS = 5
+
+# {module name: seconds its first use spent importing}
+IMPORT_TIMES = {}
+
+
+class LazyModule:
+    """Stand-in for a module that imports it on first attribute access"""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            started = time.perf_counter()
+            self._module = importlib.import_module(self._name)
+            IMPORT_TIMES[self._name] = time.perf_counter() - started
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+def lazy_module(name):
+    """Module proxy: `go = lazy_module('plotly.graph_objects')`"""
+    return LazyModule(name)
+
+
+def _time_imports(modules):
+    """(base seconds, startup seconds, [eagerly imported deferred libraries]) in a fresh interpreter"""
+    script = (
+        "import logging, sys, time\n"
+        "logging.disable(logging.WARNING)\n"
+        "started = time.perf_counter()\n"
+        f"for name in {BASE_MODULES!r}:\n"
+        "    __import__(name)\n"
+        "base = time.perf_counter()\n"
+        f"for name in {list(modules)!r}:\n"
+        "    __import__(name)\n"
+        "print(base - started, time.perf_counter() - base)\n"
+        f"print(','.join(m for m in {DEFERRED_MODULES!r} if m in sys.modules))\n"
+    )
+    output = subprocess.run(
+        [sys.executable, '-c', script], capture_output=True, text=True, check=True
+    ).stdout.splitlines()
+    base, startup = map(float, output[-2].split())
+    eager = [name for name in output[-1].split(',') if name]
+    return base, startup, eager
+
+
+def measure_startup_imports(modules=STARTUP_MODULES, runs=RUNS):
+    """
+    Import the base and startup modules in `runs` fresh interpreters.
+    Returns {'cold': (base, startup), 'median': (base, startup),
+    'eager': [deferred libraries that got imported anyway]}.
+    """
+    timings = []
+    for _ in range(runs):
+        base, startup, eager = _time_imports(modules)
+        timings.append((base, startup))
+
+    warm = timings[1:] or timings
+    return {
+        'cold': timings[0],
+        'median': (
+            statistics.median(base for base, _ in warm),
+            statistics.median(startup for _, startup in warm)
+        ),
+        'eager': eager
+    }
+
+
+if __name__ == '__main__':
+    result = measure_startup_imports()
+    for label, (base, startup) in (('Cold', result['cold']), (f'Median of {RUNS - 1}', result['median'])):
+        print(f"⏱️ {label}: {base + startup:.2f}s ({', '.join(BASE_MODULES)} {base:.2f}s + app modules {startup:.2f}s)")
+    startup = result['median'][1]
+    print(f"   App modules budget: {IMPORT_BUDGET_SECONDS:.2f}s")
+    if result['eager']:
+        print(f"❌ Imported at startup but should be deferred: {', '.join(result['eager'])}")
+    if startup > IMPORT_BUDGET_SECONDS:
+        print("❌ Over the import-time budget")
+    if result['eager'] or startup > IMPORT_BUDGET_SECONDS:
+        sys.exit(1)
+    print("✅ Within budget")
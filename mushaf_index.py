@@ -0,0 +1,144 @@
+# ============================================================================
+# FILE: mushaf_index.py - 604-PAGE MADANI MUSHAF LOOKUP INDEX
+# ============================================================================
+# Juz (sipara) boundaries in the standard 604-page Madani Mushaf are NOT
+# uniform 20-page blocks (Juz 1 has 21 pages, Juz 30 has 23, ...), so the
+# page <-> sipara <-> surah mapping comes from this bundled table instead of
+# `((page - 1) // 20) + 1`. Arrays are built once at import; every lookup
+# is a single array index.
+
+import numpy as np
+
+TOTAL_PAGES = 604
+TOTAL_JUZ = 30
+TOTAL_SURAHS = 114
+
+# First page of each Juz 1-30
+JUZ_START_PAGES = (
+    1, 22, 42, 62, 82, 102, 121, 142, 162, 182,
+    201, 222, 242, 262, 282, 302, 322, 342, 362, 382,
+    402, 422, 442, 462, 482, 502, 522, 542, 562, 582
+)
+
+# First page of each Surah 1-114
+SURAH_START_PAGES = (
+    1, 2, 50, 77, 106, 128, 151, 177, 187, 208,
+    221, 235, 249, 255, 262, 267, 282, 293, 305, 312,
+    322, 332, 342, 350, 359, 367, 377, 385, 396, 404,
+    411, 415, 418, 428, 434, 440, 446, 453, 458, 467,
+    477, 483, 489, 496, 499, 502, 507, 511, 515, 518,
+    520, 523, 526, 528, 531, 534, 537, 542, 545, 549,
+    551, 553, 554, 556, 558, 560, 562, 564, 566, 568,
+    570, 572, 574, 575, 577, 578, 580, 582, 583, 585,
+    586, 587, 587, 589, 590, 591, 591, 592, 593, 594,
+    595, 595, 596, 596, 597, 597, 598, 598, 599, 599,
+    600, 600, 601, 601, 601, 602, 602, 602, 603, 603,
+    603, 604, 604, 604
+)
+
+# Number of ayahs in each Surah 1-114
+SURAH_AYAH_COUNTS = (
+    7, 286, 200, 176, 120, 165, 206, 75, 129, 109,
+    123, 111, 43, 52, 99, 128, 111, 110, 98, 135,
+    112, 78, 118, 64, 77, 227, 93, 88, 69, 60,
+    34, 30, 73, 54, 45, 83, 182, 88, 75, 85,
+    54, 53, 89, 59, 37, 35, 38, 29, 18, 45,
+    60, 49, 62, 55, 78, 96, 29, 22, 24, 13,
+    14, 11, 11, 18, 12, 12, 30, 52, 52, 44,
+    28, 28, 20, 56, 40, 31, 50, 40, 46, 42,
+    29, 19, 36, 25, 22, 17, 19, 26, 30, 20,
+    15, 21, 11, 8, 8, 19, 5, 8, 8, 11,
+    11, 8, 3, 9, 5, 4, 7, 3, 6, 3,
+    5, 4, 5, 6
+)
+
+MAX_AYAH_COUNT = max(SURAH_AYAH_COUNTS)
+
+
+def _build_index():
+    """Build the page-indexed lookup arrays (index 0 is unused)"""
+    pages = np.arange(TOTAL_PAGES + 1)
+    juz_starts = np.array(JUZ_START_PAGES)
+    surah_starts = np.array(SURAH_START_PAGES)
+    ayah_counts = np.array(SURAH_AYAH_COUNTS)
+
+    page_juz = np.searchsorted(juz_starts, pages, side='right')
+
+    # Last surah that starts on or before the page
+    page_last_surah = np.searchsorted(surah_starts, pages, side='right')
+
+    # The surah running at the top of the page is the last one of the
+    # previous page (a superset at boundaries, which is fine for caps)
+    page_first_surah = page_last_surah.copy()
+    page_first_surah[2:] = page_last_surah[1:-1]
+
+    # Longest surah touching each page, for ayah input limits
+    page_max_ayah = np.zeros(TOTAL_PAGES + 1, dtype=int)
+    for page in range(1, TOTAL_PAGES + 1):
+        page_max_ayah[page] = ayah_counts[page_first_surah[page] - 1:page_last_surah[page]].max()
+
+    juz_end_pages = np.append(juz_starts[1:] - 1, TOTAL_PAGES)
+
+    return {
+        'page_juz': page_juz,
+        'page_first_surah': page_first_surah,
+        'page_last_surah': page_last_surah,
+        'page_max_ayah': page_max_ayah,
+        'juz_start': np.concatenate(([0], juz_starts)),
+        'juz_end': np.concatenate(([0], juz_end_pages))
+    }
+
+
+_INDEX = _build_index()
+
+
+def _check_page(page):
+    if not 1 <= page <= TOTAL_PAGES:
+        raise ValueError(f"Page must be between 1 and {TOTAL_PAGES}, got {page}")
+
+
+def _check_juz(juz):
+    if not 1 <= juz <= TOTAL_JUZ:
+        raise ValueError(f"Juz must be between 1 and {TOTAL_JUZ}, got {juz}")
+
+
+def page_to_juz(page):
+    """Juz (sipara) number of an absolute page"""
+    _check_page(page)
+    return int(_INDEX['page_juz'][page])
+
+
+def juz_page_span(juz):
+    """(first_page, last_page) of a juz"""
+    _check_juz(juz)
+    return int(_INDEX['juz_start'][juz]), int(_INDEX['juz_end'][juz])
+
+
+def juz_page_count(juz):
+    """Number of pages in a juz"""
+    start, end = juz_page_span(juz)
+    return end - start + 1
+
+
+def page_surahs(page):
+    """(first_surah, last_surah) appearing on a page"""
+    _check_page(page)
+    return int(_INDEX['page_first_surah'][page]), int(_INDEX['page_last_surah'][page])
+
+
+def page_max_ayah(page):
+    """Highest ayah number that can appear on a page"""
+    _check_page(page)
+    return int(_INDEX['page_max_ayah'][page])
+
+
+def surah_ayah_count(surah):
+    """Number of ayahs in a surah"""
+    if not 1 <= surah <= TOTAL_SURAHS:
+        raise ValueError(f"Surah must be between 1 and {TOTAL_SURAHS}, got {surah}")
+    return SURAH_AYAH_COUNTS[surah - 1]
+
+
+def pages_to_juz(pages):
+    """Vectorized page -> juz for an array of absolute pages"""
+    return _INDEX['page_juz'][np.asarray(pages, dtype=int)]
@@ -0,0 +1,207 @@
+# ============================================================================
+# FILE: page_facts.py - LONG-FORMAT PAGE-LEVEL SESSION TABLE
+# ============================================================================
+# The sessions sheet stores pages as text ("Pages 3, 4, 5"), as
+# page-in-sipara for Murajaat, or as a Jadeed start/end pair. This module
+# turns session rows into one typed row per session row and absolute page,
+# so page analytics are integer-keyed groupbys instead of string parsing.
+#
+# - Per-page rows carry the Talqeen/Tambeeh counts
+# - Session_Summary rows carry the session grade for every listed page
+# - Uploaded Murajaat sipara marks cover every page of that sipara
+# - Jadeed rows cover their start..end pages
+# - Rows created before the Mushaf index (blank page_map) use the old
+#   20-page sipara spans (see page_ranges.row_sipara_span)
+
+import numpy as np
+import pandas as pd
+
+from excel_handler import grades_to_numeric
+from mushaf_index import TOTAL_PAGES, JUZ_START_PAGES, juz_page_span
+from page_ranges import PAGE_MAP, legacy_sipara_span
+
+PAGE_FACT_COLUMNS = [
+    'student_id', 'session_id', 'session_type', 'date', 'sipara', 'page',
+    'talqeen_count', 'tambeeh_count', 'grade', 'data_format'
+]
+
+MURAJAAT_SESSION_TYPES = ['Murajaat', 'Tasmeel Juz']
+
+_JUZ_START = np.array((0,) + JUZ_START_PAGES)
+_JUZ_END = np.array([0] + [juz_page_span(juz)[1] for juz in range(1, 31)])
+_PAGE_JUZ = np.searchsorted(np.array(JUZ_START_PAGES), np.arange(TOTAL_PAGES + 1), side='right')
+_LEGACY_START = np.array([0] + [legacy_sipara_span(juz)[0] for juz in range(1, 31)])
+_LEGACY_END = np.array([0] + [legacy_sipara_span(juz)[1] for juz in range(1, 31)])
+
+
+def empty_page_facts():
+    """Empty fact table with the right columns"""
+    return pd.DataFrame(columns=PAGE_FACT_COLUMNS)
+
+
+def _column(df, name, numeric=False):
+    """Column if present (optionally numeric), else an all-NaN series"""
+    if name not in df.columns:
+        return pd.Series(np.nan, index=df.index)
+    if numeric:
+        return pd.to_numeric(df[name], errors='coerce')
+    return df[name]
+
+
+def legacy_rows(df):
+    """Boolean array: rows entered against the old 20-page siparas"""
+    return _column(df, 'page_map').astype(str).str.strip().ne(PAGE_MAP).to_numpy(dtype=bool)
+
+
+def remap_legacy_murajaat(df):
+    """
+    Standardized sessions with legacy Murajaat page rows moved onto the
+    real juz boundaries (Sipara, and Page as page-in-sipara), so filters by
+    sipara and page see old and new rows alike. Whole-sipara marks and
+    summaries keep their stored values.
+    """
+    sipara = _column(df, 'Sipara', numeric=True)
+    page = _column(df, 'Page', numeric=True)
+    move = (
+        _column(df, 'Session_Type').astype(str).isin(MURAJAAT_SESSION_TYPES)
+        & sipara.between(1, 30) & page.ge(1)
+    ).to_numpy() & legacy_rows(df)
+    if not move.any():
+        return df
+
+    juz = sipara.to_numpy(dtype=float)[move].astype(int)
+    pages = page.to_numpy(dtype=float)[move].astype(int)
+    # Numbers larger than the old sipara were absolute pages already
+    relative = pages <= _LEGACY_END[juz] - _LEGACY_START[juz] + 1
+    absolute = np.clip(np.where(relative, _LEGACY_START[juz] + pages - 1, pages), 1, TOTAL_PAGES)
+    new_juz = _PAGE_JUZ[absolute]
+
+    df = df.copy()
+    df['Sipara'] = df['Sipara'].astype(object)
+    df['Page'] = df['Page'].astype(object)
+    df.loc[move, 'Sipara'] = new_juz.tolist()
+    df.loc[move, 'Page'] = (absolute - _JUZ_START[new_juz] + 1).tolist()
+    return df
+
+
+def explode_sessions(sessions_df):
+    """
+    Convert standardized session rows (get_all_student_sessions format)
+    into the page-level fact table. Fully vectorized.
+    """
+    if sessions_df is None or sessions_df.empty:
+        return empty_page_facts()
+
+    df = sessions_df.reset_index(drop=True)
+    session_type = _column(df, 'Session_Type').astype(str)
+    page_text = _column(df, 'Page').astype(str).str.strip()
+    page = _column(df, 'Page', numeric=True)
+    sipara = _column(df, 'Sipara', numeric=True)
+    jadeed_page = _column(df, 'Jadeed_Page', numeric=True)
+    data_format = _column(df, 'Data_Format').astype(str)
+    is_summary = _column(df, 'Core_Mistake').astype(str).eq('Session_Summary')
+
+    is_murajaat = session_type.isin(MURAJAAT_SESSION_TYPES)
+    is_juzhali = session_type.eq('Juzhali') & data_format.ne('upload')
+    is_jadeed = session_type.eq('Jadeed')
+    valid_sipara = sipara.between(1, 30)
+    legacy = legacy_rows(df)
+
+    # --- (row, start, end) page ranges from each kind of row ---
+    ranges = []
+
+    single = (is_murajaat | is_juzhali) & ~is_summary & page.notna()
+    ranges.append(pd.DataFrame({'row': df.index[single], 'start': page[single], 'end': page[single]}))
+
+    # "Pages 3, 4, 5" summaries -> one entry per listed page
+    listed = (is_murajaat | is_juzhali) & is_summary
+    if listed.any():
+        listed_pages = page_text[listed].str.findall(r'\d+').explode().dropna()
+        listed_pages = pd.to_numeric(listed_pages, errors='coerce').dropna()
+        ranges.append(pd.DataFrame({'row': listed_pages.index, 'start': listed_pages.values, 'end': listed_pages.values}))
+
+    # Uploaded sipara marks (no page at all) -> the whole sipara
+    whole = is_murajaat & ~is_summary & page.isna() & valid_sipara
+    if whole.any():
+        juz = sipara[whole].astype(int).to_numpy()
+        old_map = legacy[whole.to_numpy()]
+        ranges.append(pd.DataFrame({
+            'row': df.index[whole],
+            'start': np.where(old_map, _LEGACY_START[juz], _JUZ_START[juz]),
+            'end': np.where(old_map, _LEGACY_END[juz], _JUZ_END[juz])
+        }))
+
+    jadeed_end = jadeed_page.fillna(page)
+    jadeed_start = page.where(page.notna() & jadeed_page.notna() & (page <= jadeed_page), jadeed_end)
+    has_jadeed = is_jadeed & jadeed_end.notna()
+    ranges.append(pd.DataFrame({'row': df.index[has_jadeed], 'start': jadeed_start[has_jadeed], 'end': jadeed_end[has_jadeed]}))
+
+    ranges = pd.concat(ranges, ignore_index=True)
+    if ranges.empty:
+        return empty_page_facts()
+
+    rows = ranges['row'].to_numpy(dtype=int)
+    start = ranges['start'].to_numpy(dtype=float)
+    end = ranges['end'].to_numpy(dtype=float)
+
+    # Murajaat pages are page-in-sipara: shift them by the sipara's first
+    # page. Whole-sipara rows are already absolute, and page numbers larger
+    # than the sipara are assumed to be absolute too.
+    row_sipara = np.nan_to_num(sipara.to_numpy(dtype=float)[rows]).astype(int)
+    juz = np.where(is_murajaat.to_numpy()[rows] & (row_sipara >= 1) & (row_sipara <= 30), row_sipara, 0)
+    old_map = legacy[rows]
+    juz_start = np.where(old_map, _LEGACY_START[juz], _JUZ_START[juz])
+    juz_length = np.where(old_map, _LEGACY_END[juz], _JUZ_END[juz]) - juz_start + 1
+    relative = (juz > 0) & ~whole.to_numpy()[rows] & (end <= juz_length)
+    offset = np.where(relative, juz_start - 1, 0)
+    start = start + offset
+    end = end + offset
+
+    # --- expand ranges to one row per page (np.repeat, no Python loop) ---
+    lengths = (end - start + 1).astype(int)
+    keep = lengths > 0
+    rows, start, lengths = rows[keep], start[keep].astype(int), lengths[keep]
+    repeated_rows = np.repeat(rows, lengths)
+    within = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    pages = np.repeat(start, lengths) + within
+
+    valid = (pages >= 1) & (pages <= TOTAL_PAGES)
+    repeated_rows, pages = repeated_rows[valid], pages[valid]
+
+    source = df.iloc[repeated_rows]
+    dates = pd.to_datetime(_column(source, 'Date'), errors='coerce')
+
+    facts = pd.DataFrame({
+        'student_id': _column(source, 'student_id').to_numpy(),
+        'session_id': _column(source, 'id').to_numpy(),
+        'session_type': _column(source, 'Session_Type').to_numpy(),
+        'date': dates.dt.strftime('%Y-%m-%d').to_numpy(),
+        'sipara': _PAGE_JUZ[pages],
+        'page': pages,
+        'talqeen_count': _column(source, 'Mistake_Count', numeric=True).fillna(0).astype(int).to_numpy(),
+        'tambeeh_count': _column(source, 'Tambeeh_Count', numeric=True).fillna(0).astype(int).to_numpy(),
+        'grade': grades_to_numeric(_column(source, 'Overall_Grade')).to_numpy(),
+        'data_format': _column(source, 'Data_Format').fillna('upload').to_numpy()
+    })
+
+    return facts.sort_values(['student_id', 'date', 'page'], kind='stable').reset_index(drop=True)
+
+
+def page_facts_to_rows(facts):
+    """Fact table -> list of sheet rows (blank instead of NaN)"""
+    if facts is None or facts.empty:
+        return []
+    out = facts[PAGE_FACT_COLUMNS].astype(object).where(facts[PAGE_FACT_COLUMNS].notna(), '')
+    return out.values.tolist()
+
+
+def rows_to_page_facts(records):
+    """get_all_records() output of the page_sessions sheet -> typed fact table"""
+    if not records:
+        return empty_page_facts()
+
+    facts = pd.DataFrame(records)
+    for col in ['session_id', 'sipara', 'page', 'talqeen_count', 'tambeeh_count']:
+        facts[col] = pd.to_numeric(facts[col], errors='coerce').fillna(0).astype(int)
+    facts['grade'] = pd.to_numeric(facts['grade'], errors='coerce')
+    return facts[PAGE_FACT_COLUMNS]
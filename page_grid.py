@@ -0,0 +1,74 @@
+# ============================================================================
+# FILE: page_grid.py - SINGLE-PAYLOAD HTML FOR PAGE MAPS AND CARDS
+# ============================================================================
+# Page maps used to be st.columns(5) plus one st.markdown per page - 20-30
+# separate elements per render. These helpers build the whole grid as ONE
+# HTML string (a CSS grid), memoized on the page stats, so a map is a single
+# st.markdown call and an unchanged map costs no rebuilding at all.
+
+from functools import lru_cache
+from html import escape
+
+GRID_COLUMNS = 5
+
+FOCUS_CARD_STYLES = {
+    'success': ('#d1fae5', '#059669'),
+    'info': ('#dbeafe', '#1d4ed8'),
+    'warning': ('#fef3c7', '#d97706'),
+    'error': ('#fee2e2', '#dc2626')
+}
+
+
+@lru_cache(maxsize=256)
+def page_grid_html(cells, columns=GRID_COLUMNS):
+    """
+    HTML for a grid of page boxes.
+
+    `cells` is a tuple of (label, summary, background, text_color) tuples
+    (hashable, so identical grids are served from the cache).
+    """
+    boxes = ''.join(
+        f'<div class="page-box" style="background-color: {background}; border: 2px solid {text_color}; '
+        f'padding: 10px; border-radius: 8px; text-align: center; min-height: 80px; '
+        f'display: flex; flex-direction: column; justify-content: center;">'
+        f'<div style="color: {text_color}; font-size: 1.2em; font-weight: bold;">{escape(str(label))}</div>'
+        f'<div style="color: {text_color}; font-size: 0.85em; margin-top: 5px;">{escape(str(summary))}</div>'
+        f'</div>'
+        for label, summary, background, text_color in cells
+    )
+    return (
+        f'<div style="display: grid; grid-template-columns: repeat({columns}, minmax(0, 1fr)); '
+        f'gap: 10px; margin-bottom: 10px;">{boxes}</div>'
+    )
+
+
+def page_map_cells(pages, page_health_map, label="Page {}"):
+    """Turn an assistant's page_health_map into hashable grid cells"""
+    return tuple(
+        (label.format(page), page_health_map[page]['summary'], page_health_map[page]['color'], page_health_map[page]['text'])
+        for page in pages
+    )
+
+
+@lru_cache(maxsize=256)
+def focus_cards_html(cards):
+    """
+    HTML for side-by-side Focus Area cards.
+
+    `cards` is a tuple of (title, body, style) with style one of
+    FOCUS_CARD_STYLES; `body` may contain a small amount of trusted HTML.
+    """
+    boxes = []
+    for title, body, style in cards:
+        background, text_color = FOCUS_CARD_STYLES.get(style, FOCUS_CARD_STYLES['info'])
+        boxes.append(
+            f'<div style="background: {background}; border-left: 4px solid {text_color}; '
+            f'padding: 15px; border-radius: 10px;">'
+            f'<div style="font-weight: bold; color: #1f2937; margin-bottom: 8px;">{escape(title)}</div>'
+            f'<div style="color: {text_color};">{body}</div>'
+            f'</div>'
+        )
+    return (
+        f'<div style="display: grid; grid-template-columns: repeat({len(boxes)}, minmax(0, 1fr)); '
+        f'gap: 15px;">{"".join(boxes)}</div>'
+    )
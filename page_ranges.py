@@ -0,0 +1,196 @@
+# ============================================================================
+# FILE: page_ranges.py - INTERVAL SETS OF MUSHAF PAGES
+# ============================================================================
+# Memorized / Juzhali / graduated pages are always a handful of contiguous
+# runs, so they are stored as sorted [start, end] ranges instead of one
+# list entry per page. All set operations are O(#intervals).
+#
+# Sipara <-> page conversion uses the real juz boundaries from the Mushaf
+# index. Session rows written since then carry PAGE_MAP in the sessions
+# sheet's page_map column; older rows (blank page_map) were entered against
+# fixed 20-page siparas, so their page-in-sipara numbers are converted with
+# the old spans (row_sipara_span).
+
+from bisect import bisect_right
+
+from mushaf_index import TOTAL_JUZ, TOTAL_PAGES, page_to_juz, juz_page_span
+
+# page_map value of session rows entered against the real juz boundaries
+PAGE_MAP = 'mushaf'
+LEGACY_SIPARA_PAGES = 20
+
+
+# ===== SIPARA <-> PAGE HELPERS (backed by the Mushaf index) =====
+
+def sipara_of(page):
+    """Sipara (juz) that an absolute page belongs to"""
+    return page_to_juz(page)
+
+
+def sipara_span(sipara):
+    """(first_page, last_page) of a sipara as absolute pages"""
+    return juz_page_span(sipara)
+
+
+def to_absolute_page(sipara, page_in_sipara):
+    """Convert (sipara, page in sipara) into an absolute page"""
+    return sipara_span(sipara)[0] + page_in_sipara - 1
+
+
+def to_sipara_page(page):
+    """Convert an absolute page into (sipara, page in sipara)"""
+    sipara = sipara_of(page)
+    return sipara, page - sipara_span(sipara)[0] + 1
+
+
+def legacy_sipara_span(sipara):
+    """(first_page, last_page) of a sipara under the old fixed 20-page mapping"""
+    start = (sipara - 1) * LEGACY_SIPARA_PAGES + 1
+    end = TOTAL_PAGES if sipara == TOTAL_JUZ else start + LEGACY_SIPARA_PAGES - 1
+    return start, end
+
+
+def is_legacy_row(page_map):
+    """True if a stored session row predates the Mushaf index (None = not a stored row)"""
+    return page_map is not None and str(page_map).strip() != PAGE_MAP
+
+
+def row_sipara_span(sipara, page_map=None):
+    """Sipara span a stored session row meant: old spans for legacy rows"""
+    if is_legacy_row(page_map):
+        return legacy_sipara_span(sipara)
+    return sipara_span(sipara)
+
+
+# ===== INTERVAL SET =====
+
+class PageSet:
+    """Immutable set of pages stored as sorted, non-overlapping inclusive ranges"""
+
+    __slots__ = ('_starts', '_ends')
+
+    def __init__(self, intervals=()):
+        starts, ends = [], []
+        for start, end in sorted((int(s), int(e)) for s, e in intervals if s is not None and e is not None and s <= e):
+            if ends and start <= ends[-1] + 1:
+                # Overlapping or touching the previous run - merge
+                ends[-1] = max(ends[-1], end)
+            else:
+                starts.append(start)
+                ends.append(end)
+        self._starts = starts
+        self._ends = ends
+
+    @classmethod
+    def from_range(cls, start, end):
+        """Pages start..end inclusive (empty if start > end)"""
+        return cls([(start, end)])
+
+    @classmethod
+    def from_pages(cls, pages):
+        """Build from any iterable of page numbers"""
+        return cls((page, page) for page in pages)
+
+    @property
+    def intervals(self):
+        """List of (start, end) tuples"""
+        return list(zip(self._starts, self._ends))
+
+    def to_list(self):
+        """JSON-friendly [[start, end], ...]"""
+        return [[start, end] for start, end in zip(self._starts, self._ends)]
+
+    def __contains__(self, page):
+        idx = bisect_right(self._starts, page) - 1
+        return idx >= 0 and page <= self._ends[idx]
+
+    def __len__(self):
+        return sum(end - start + 1 for start, end in zip(self._starts, self._ends))
+
+    def __iter__(self):
+        for start, end in zip(self._starts, self._ends):
+            yield from range(start, end + 1)
+
+    def __bool__(self):
+        return bool(self._starts)
+
+    def __eq__(self, other):
+        return isinstance(other, PageSet) and self._starts == other._starts and self._ends == other._ends
+
+    def __hash__(self):
+        return hash((tuple(self._starts), tuple(self._ends)))
+
+    def __repr__(self):
+        return f"PageSet({self.intervals})"
+
+    def first(self):
+        return self._starts[0] if self._starts else None
+
+    def last(self):
+        return self._ends[-1] if self._ends else None
+
+    def union(self, other):
+        return PageSet(self.intervals + other.intervals)
+
+    def intersection(self, other):
+        result = []
+        i = j = 0
+        a, b = self.intervals, other.intervals
+        while i < len(a) and j < len(b):
+            start = max(a[i][0], b[j][0])
+            end = min(a[i][1], b[j][1])
+            if start <= end:
+                result.append((start, end))
+            if a[i][1] < b[j][1]:
+                i += 1
+            else:
+                j += 1
+        return PageSet(result)
+
+    def difference(self, other):
+        result = []
+        b = other.intervals
+        j = 0
+        for start, end in self.intervals:
+            # Skip ranges of `other` that end before this run starts
+            while j < len(b) and b[j][1] < start:
+                j += 1
+            k = j
+            current = start
+            while k < len(b) and b[k][0] <= end:
+                if b[k][0] > current:
+                    result.append((current, b[k][0] - 1))
+                current = max(current, b[k][1] + 1)
+                k += 1
+            if current <= end:
+                result.append((current, end))
+        return PageSet(result)
+
+    __or__ = union
+    __and__ = intersection
+    __sub__ = difference
+
+    def slice_sipara(self, sipara):
+        """Only the pages of this set that fall inside one sipara"""
+        return self & PageSet.from_range(*sipara_span(sipara))
+
+    def siparas(self):
+        """Sorted siparas touched by this set"""
+        touched = set()
+        for start, end in zip(self._starts, self._ends):
+            touched.update(range(sipara_of(start), sipara_of(end) + 1))
+        return sorted(touched)
+
+    def by_sipara(self):
+        """{sipara: [page in sipara, ...]} - the shape the Murajaat screens use"""
+        result = {}
+        for sipara in self.siparas():
+            offset = sipara_span(sipara)[0] - 1
+            result[sipara] = [page - offset for page in self.slice_sipara(sipara)]
+        return result
+
+    def is_full_sipara(self, sipara):
+        """True if every page of the sipara is in the set"""
+        start, end = sipara_span(sipara)
+        idx = bisect_right(self._starts, start) - 1
+        return idx >= 0 and self._ends[idx] >= end
@@ -0,0 +1,147 @@
+# ============================================================================
+# FILE: profiler.py - HOT-PATH TIMING
+# ============================================================================
+# Lightweight timings for the slow parts of a page run (Sheets calls,
+# Excel parsing, session loads, assistant sections, chart building):
+#
+# - timed('name') works as a decorator or a `with` block
+# - timings are aggregated per page run (count / total / max per name);
+#   page_run() opens a run, and the last MAX_RUNS runs are kept
+# - timings outside a page run (fragment reruns, the background writer)
+#   go to a shared 'background' bucket
+# - snapshot() / to_json() feed the hidden admin panel (?profiler=1)
+
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+
+MAX_RUNS = 50
+
+_lock = threading.Lock()
+_local = threading.local()
+_runs = deque(maxlen=MAX_RUNS)
+_background = {}
+
+
+def _new_run(label):
+    return {
+        'label': label,
+        'started_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'seconds': None,
+        'timings': {}
+    }
+
+
+def _add(timings, name, seconds):
+    entry = timings.setdefault(name, {'count': 0, 'total': 0.0, 'max': 0.0})
+    entry['count'] += 1
+    entry['total'] += seconds
+    entry['max'] = max(entry['max'], seconds)
+
+
+def record(name, seconds):
+    """Add one timing to the current page run (or the background bucket)"""
+    run = getattr(_local, 'run', None)
+    if run is not None:
+        _add(run['timings'], name, seconds)
+    else:
+        with _lock:
+            _add(_background, name, seconds)
+
+
+class Timer:
+    """Times a `with` block, or every call of a function it decorates"""
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, time.perf_counter() - self._started)
+        return False
+
+    def __call__(self, fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record(self.name, time.perf_counter() - started)
+        return wrapper
+
+
+def timed(name):
+    """`with timed('x'):` or `@timed('x')`"""
+    return Timer(name)
+
+
+@contextmanager
+def page_run(label='page'):
+    """Collect the timings of one script run; kept once the run ends"""
+    run = _new_run(label)
+    _local.run = run
+    started = time.perf_counter()
+    try:
+        yield run
+    finally:
+        run['seconds'] = time.perf_counter() - started
+        _local.run = None
+        with _lock:
+            _runs.append(run)
+
+
+def current_run():
+    """Timings so far in this thread's page run (None outside a run)"""
+    return getattr(_local, 'run', None)
+
+
+def snapshot():
+    """Recent runs (oldest first), their combined totals and the background bucket"""
+    with _lock:
+        runs = [dict(run, timings={k: dict(v) for k, v in run['timings'].items()}) for run in _runs]
+        background = {k: dict(v) for k, v in _background.items()}
+
+    combined = {}
+    for run in runs:
+        for name, entry in run['timings'].items():
+            total = combined.setdefault(name, {'count': 0, 'total': 0.0, 'max': 0.0})
+            total['count'] += entry['count']
+            total['total'] += entry['total']
+            total['max'] = max(total['max'], entry['max'])
+
+    return {'runs': runs, 'combined': combined, 'background': background}
+
+
+def timings_table(timings):
+    """[{name, count, total_ms, mean_ms, max_ms}] sorted by total time"""
+    rows = [
+        {
+            'name': name,
+            'count': entry['count'],
+            'total_ms': round(entry['total'] * 1000, 1),
+            'mean_ms': round(entry['total'] * 1000 / entry['count'], 1),
+            'max_ms': round(entry['max'] * 1000, 1)
+        }
+        for name, entry in timings.items()
+    ]
+    return sorted(rows, key=lambda row: row['total_ms'], reverse=True)
+
+
+def to_json():
+    """Everything in snapshot() as a JSON string (for download)"""
+    return json.dumps(snapshot(), indent=2)
+
+
+def reset():
+    """Forget all recorded timings"""
+    with _lock:
+        _runs.clear()
+        _background.clear()
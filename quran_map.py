@@ -0,0 +1,108 @@
+# ============================================================================
+# FILE: quran_map.py - WHOLE-QURAN PAGE STATUS FOR ONE STUDENT
+# ============================================================================
+# One status code per Mushaf page (604 cells), computed with NumPy from the
+# page-level fact table, then laid out as 30 rows (one per sipara) for a
+# single heatmap figure.
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from excel_handler import calculate_juzhali_range
+from mushaf_index import JUZ_START_PAGES, TOTAL_JUZ, TOTAL_PAGES, juz_page_count
+from retention_model import observed_recall
+
+# Status codes (index into STATUS_LABELS / STATUS_COLORS)
+NOT_MEMORIZED = 0
+UNTESTED = 1
+MURAJAAT_WEAK = 2
+MURAJAAT_AVERAGE = 3
+MURAJAAT_STRONG = 4
+JUZHALI = 5
+JADEED = 6
+
+STATUS_LABELS = [
+    'Not memorized yet', 'Murajaat - untested', 'Murajaat - weak',
+    'Murajaat - average', 'Murajaat - strong', 'Juzhali', 'Jadeed (recent)'
+]
+STATUS_COLORS = ['#f3f4f6', '#d1d5db', '#ef4444', '#f59e0b', '#10b981', '#3b82f6', '#8b5cf6']
+
+RECENT_JADEED_DAYS = 7
+STRONG_RECALL = 0.8
+AVERAGE_RECALL = 0.6
+REVIEW_TYPES = ['Murajaat', 'Tasmeel Juz', 'Juzhali']
+
+MAX_JUZ_PAGES = max(juz_page_count(juz) for juz in range(1, TOTAL_JUZ + 1))
+
+
+def page_status_array(facts, last_jadeed_page, juzhali_length=10, today=None):
+    """
+    Status code for every page as an int array of length TOTAL_PAGES + 1
+    (index = page number, index 0 unused).
+    """
+    status = np.full(TOTAL_PAGES + 1, NOT_MEMORIZED, dtype=int)
+    if not last_jadeed_page:
+        return status
+
+    juzhali_start, last_page = calculate_juzhali_range(int(last_jadeed_page), juzhali_length)
+
+    # Everything memorized starts as untested Murajaat
+    status[1:last_page + 1] = UNTESTED
+
+    if facts is not None and not facts.empty:
+        reviews = facts[facts['session_type'].isin(REVIEW_TYPES)]
+        if not reviews.empty:
+            # Latest review result per page (mean over that day's rows)
+            daily = (
+                reviews.assign(recall=observed_recall(reviews))
+                .groupby(['page', 'date'])['recall'].mean()
+                .reset_index()
+                .sort_values(['page', 'date'])
+                .groupby('page').tail(1)
+            )
+            pages = daily['page'].to_numpy(dtype=int)
+            recall = daily['recall'].to_numpy(dtype=float)
+            reviewed = (pages >= 1) & (pages <= last_page)
+            pages, recall = pages[reviewed], recall[reviewed]
+            status[pages] = np.select(
+                [recall >= STRONG_RECALL, recall >= AVERAGE_RECALL],
+                [MURAJAAT_STRONG, MURAJAAT_AVERAGE],
+                MURAJAAT_WEAK
+            )
+
+    status[juzhali_start:last_page + 1] = JUZHALI
+
+    if facts is not None and not facts.empty:
+        today = pd.Timestamp(today or datetime.now().date())
+        jadeed = facts[
+            (facts['session_type'] == 'Jadeed') &
+            (pd.to_datetime(facts['date'], errors='coerce') > today - pd.Timedelta(days=RECENT_JADEED_DAYS))
+        ]
+        recent = jadeed['page'].to_numpy(dtype=int)
+        status[recent[(recent >= 1) & (recent <= TOTAL_PAGES)]] = JADEED
+
+    return status
+
+
+def status_grid(status):
+    """
+    Lay a page status array out as (z, pages): 30 rows (sipara) by the
+    longest sipara's page count, NaN where a sipara has fewer pages.
+    """
+    starts = np.array(JUZ_START_PAGES)
+    columns = np.arange(MAX_JUZ_PAGES)
+    pages = starts[:, None] + columns[None, :]
+
+    ends = np.append(starts[1:] - 1, TOTAL_PAGES)
+    valid = pages <= ends[:, None]
+
+    z = np.where(valid, status[np.where(valid, pages, 0)], np.nan)
+    return z, np.where(valid, pages, 0)
+
+
+def status_counts(status):
+    """{label: pages} for the memorized part of the Quran"""
+    counts = np.bincount(status[1:], minlength=len(STATUS_LABELS))
+    return {label: int(count) for label, count in zip(STATUS_LABELS, counts)}
@@ -0,0 +1,125 @@
+# ============================================================================
+# FILE: regressions.py - GRADE-DROP DETECTION (SIPARA AND PAGE LEVEL)
+# ============================================================================
+# Each (student, sipara) and (student, page) is a stream of review results
+# (recall 0-1, see retention_model.observed_recall). A result is flagged
+# when it falls well below the rolling mean of the previous few results of
+# the same stream - i.e. something that used to be strong suddenly isn't.
+#
+# Rolling statistics for every stream of every student come from prefix
+# sums over one sorted array, so the whole class is checked in a handful
+# of NumPy operations on every data refresh.
+
+import numpy as np
+import pandas as pd
+
+from retention_model import observed_recall
+
+REGRESSION_COLUMNS = [
+    'student_id', 'level', 'sipara', 'page', 'date',
+    'recall', 'baseline', 'drop', 'z_score'
+]
+
+REVIEW_TYPES = ['Murajaat', 'Tasmeel Juz', 'Juzhali']
+
+WINDOW = 5             # previous results the baseline is built from
+MIN_HISTORY = 3        # results needed before a stream can be flagged
+MIN_BASELINE = 0.7     # only streams that were strong can "regress"
+MIN_DROP = 0.15        # ... by at least this much recall
+Z_THRESHOLD = 2.0
+MIN_STD = 0.1          # keeps z-scores sane for very steady streams
+
+
+def empty_regressions():
+    """Empty flag list with the right columns"""
+    return pd.DataFrame(columns=REGRESSION_COLUMNS)
+
+
+def rolling_baseline(values, group, window=WINDOW):
+    """
+    Mean, std and count of the previous `window` values of the same group
+    for every position (rows sorted by group, then time). Vectorized.
+    """
+    n = len(values)
+    positions = np.arange(n)
+
+    # First index of each row's group
+    starts = np.zeros(n, dtype=int)
+    new_group = np.ones(n, dtype=bool)
+    new_group[1:] = group[1:] != group[:-1]
+    starts[new_group] = positions[new_group]
+    starts = np.maximum.accumulate(starts)
+
+    prefix = np.concatenate(([0.0], np.cumsum(values)))
+    prefix_sq = np.concatenate(([0.0], np.cumsum(values * values)))
+
+    window_start = np.maximum(starts, positions - window)
+    count = positions - window_start
+    total = prefix[positions] - prefix[window_start]
+    total_sq = prefix_sq[positions] - prefix_sq[window_start]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / count
+        variance = np.maximum(total_sq / count - mean * mean, 0.0)
+    return mean, np.sqrt(variance), count
+
+
+def _stream_regressions(observations, keys, level):
+    """Flag the latest result of every stream in `observations`"""
+    stream = observations.groupby(keys + ['date'], sort=True)['recall'].mean().reset_index()
+    if stream.empty:
+        return empty_regressions()
+
+    group = stream.groupby(keys, sort=False).ngroup().to_numpy()
+    recall = stream['recall'].to_numpy(dtype=float)
+    mean, std, count = rolling_baseline(recall, group)
+
+    drop = mean - recall
+    z_score = drop / np.maximum(std, MIN_STD)
+
+    latest = np.ones(len(stream), dtype=bool)
+    latest[:-1] = group[1:] != group[:-1]
+
+    flagged = (
+        latest &
+        (count >= MIN_HISTORY) &
+        (mean >= MIN_BASELINE) &
+        (drop >= MIN_DROP) &
+        (z_score >= Z_THRESHOLD)
+    )
+
+    result = stream[flagged].copy()
+    result['level'] = level
+    result['baseline'] = mean[flagged].round(2)
+    result['drop'] = drop[flagged].round(2)
+    result['z_score'] = z_score[flagged].round(1)
+    result['recall'] = result['recall'].round(2)
+    if 'page' not in result.columns:
+        result['page'] = np.nan
+    return result[REGRESSION_COLUMNS]
+
+
+def find_regressions(facts):
+    """
+    Current sipara- and page-level grade drops for every student in the
+    page fact table, most severe first.
+    """
+    if facts is None or facts.empty:
+        return empty_regressions()
+
+    reviews = facts[facts['session_type'].isin(REVIEW_TYPES)]
+    if reviews.empty:
+        return empty_regressions()
+    reviews = reviews.assign(recall=observed_recall(reviews))
+
+    flags = [
+        _stream_regressions(reviews, ['student_id', 'sipara'], 'sipara'),
+        _stream_regressions(reviews, ['student_id', 'sipara', 'page'], 'page')
+    ]
+    flags = [flag for flag in flags if not flag.empty]
+    if not flags:
+        return empty_regressions()
+
+    flags = pd.concat(flags, ignore_index=True)
+
+    return flags.sort_values(['z_score', 'drop'], ascending=False).reset_index(drop=True)
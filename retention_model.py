@@ -0,0 +1,133 @@
+# ============================================================================
+# FILE: retention_model.py - PER-PAGE FORGETTING CURVES
+# ============================================================================
+# Each (student, page) gets an exponential forgetting curve
+#     recall(t) = exp(-decay * days_since_last_review)
+# fitted from its review history: for every gap between two reviews of the
+# page, the second review's result (mark /10, or mistake-based quality /5)
+# is a recall observation after `t` days. The decay is the least-squares
+# slope of -ln(recall) on t, pulled towards a 30-day half-life prior so
+# pages with little history still get a sensible value.
+#
+# The fit works on the page-level fact table (page_facts.py) for ALL
+# students at once - sort once, then bincount sums per page. No Python
+# loop over pages or students.
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from review_scheduler import TALQEEN_PENALTY, TAMBEEH_PENALTY
+
+RETENTION_COLUMNS = ['student_id', 'page', 'decay', 'reviews', 'last_review', 'fitted_at']
+
+PRIOR_HALF_LIFE = 30                          # days
+PRIOR_DECAY = np.log(2) / PRIOR_HALF_LIFE
+PRIOR_WEIGHT = 2.0                            # pseudo-observations at the prior
+MIN_RECALL = 0.05                             # keeps -ln(recall) finite
+
+# Jadeed is the first time a page is learned - the start of its curve
+CURVE_SESSION_TYPES = ['Jadeed', 'Juzhali', 'Murajaat', 'Tasmeel Juz']
+
+
+def empty_retention_params():
+    """Empty parameter table with the right columns"""
+    return pd.DataFrame(columns=RETENTION_COLUMNS)
+
+
+def observed_recall(facts):
+    """Recall (0-1) shown by each fact row: mark / 10, else mistake quality / 5"""
+    from_counts = (5.0 - TALQEEN_PENALTY * facts['talqeen_count'] - TAMBEEH_PENALTY * facts['tambeeh_count']) / 5.0
+    recall = (facts['grade'] / 10.0).fillna(from_counts)
+    return recall.clip(MIN_RECALL, 1.0)
+
+
+def fit_retention(facts, fitted_at=None):
+    """
+    Fit one decay parameter per (student, page) from the page fact table.
+
+    Returns a DataFrame with RETENTION_COLUMNS.
+    """
+    if facts is None or facts.empty:
+        return empty_retention_params()
+
+    facts = facts[facts['session_type'].isin(CURVE_SESSION_TYPES)]
+    if facts.empty:
+        return empty_retention_params()
+
+    # One observation per page per day (per-page rows and the session's
+    # summary row describe the same review)
+    reviews = (
+        facts.assign(recall=observed_recall(facts))
+        .groupby(['student_id', 'page', 'date'], sort=True)['recall']
+        .mean()
+        .reset_index()
+    )
+
+    group = reviews.groupby(['student_id', 'page'], sort=False).ngroup().to_numpy()
+    days = pd.to_datetime(reviews['date'], errors='coerce').to_numpy().astype('datetime64[D]').astype(float)
+    recall = reviews['recall'].to_numpy(dtype=float)
+
+    # Gap since the previous review of the same page (rows are sorted)
+    same_page = np.zeros(len(reviews), dtype=bool)
+    same_page[1:] = group[1:] == group[:-1]
+    gap = np.zeros(len(reviews))
+    gap[1:] = days[1:] - days[:-1]
+    usable = same_page & (gap > 0) & ~np.isnan(gap)
+
+    t = np.where(usable, gap, 0.0)
+    y = np.where(usable, -np.log(recall), 0.0)
+    n_groups = group.max() + 1
+
+    sum_ty = np.bincount(group, weights=t * y, minlength=n_groups)
+    sum_tt = np.bincount(group, weights=t * t, minlength=n_groups)
+
+    # Least squares through the origin plus prior pseudo-points at the half-life
+    prior_t = float(PRIOR_HALF_LIFE)
+    decay = (sum_ty + PRIOR_WEIGHT * prior_t * (PRIOR_DECAY * prior_t)) / (sum_tt + PRIOR_WEIGHT * prior_t * prior_t)
+
+    first = np.ones(len(reviews), dtype=bool)
+    first[1:] = ~same_page[1:]
+    last = np.ones(len(reviews), dtype=bool)
+    last[:-1] = group[1:] != group[:-1]
+
+    params = pd.DataFrame({
+        'student_id': reviews['student_id'].to_numpy()[first],
+        'page': reviews['page'].to_numpy()[first],
+        'decay': np.round(decay, 6),
+        'reviews': np.bincount(group, minlength=n_groups),
+        'last_review': reviews['date'].to_numpy()[last],
+        'fitted_at': fitted_at or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    })
+    return params
+
+
+def predict_recall(params, today=None):
+    """Predicted recall probability of every page in `params` on `today`"""
+    if params is None or params.empty:
+        return pd.Series(dtype=float)
+
+    today = pd.Timestamp(today or datetime.now().date())
+    elapsed = (today - pd.to_datetime(params['last_review'], errors='coerce')).dt.days.clip(lower=0)
+    return np.exp(-params['decay'].astype(float) * elapsed.fillna(0))
+
+
+def params_to_rows(params):
+    """Parameter table -> list of sheet rows"""
+    if params is None or params.empty:
+        return []
+    return params[RETENTION_COLUMNS].astype(object).values.tolist()
+
+
+def rows_to_params(records):
+    """get_all_records() output of the retention_model sheet -> typed table"""
+    if not records:
+        return empty_retention_params()
+
+    params = pd.DataFrame(records)
+    for col in ['page', 'reviews']:
+        params[col] = pd.to_numeric(params[col], errors='coerce').fillna(0).astype(int)
+    params['decay'] = pd.to_numeric(params['decay'], errors='coerce').fillna(PRIOR_DECAY)
+    params['last_review'] = params['last_review'].astype(str)
+    return params[RETENTION_COLUMNS]
@@ -0,0 +1,132 @@
+# ============================================================================
+# FILE: review_scheduler.py - SPACED-REPETITION SCHEDULING FOR MURAJAAT
+# ============================================================================
+# SM-2 style intervals per page: every review gives a quality score (from
+# the page's Talqeen/Tambeeh counts, or its mark when only a mark exists),
+# which grows or resets the page's interval and ease. Due dates for all
+# graduated pages are kept in a heap so "what to review today" only touches
+# the pages that are actually due.
+
+import heapq
+from datetime import datetime, timedelta
+
+from page_ranges import PageSet
+
+DEFAULT_EASE = 2.5
+MIN_EASE = 1.3
+FIRST_INTERVALS = (1, 6)   # days after the 1st and 2nd good review
+MAX_INTERVAL = 365         # every memorized page comes back at least yearly
+PASSING_QUALITY = 3        # below this the page starts over
+
+TALQEEN_PENALTY = 1.0      # quality lost per Talqeen (teacher had to prompt)
+TAMBEEH_PENALTY = 0.5      # quality lost per Tambeeh (student self-corrected)
+
+NEVER_REVIEWED = ''        # sorts before every date -> always due first
+
+
+def review_quality(talqeen=0, tambeeh=0, grade=None):
+    """
+    Quality of one page review on SM-2's 0-5 scale.
+
+    A mark (1-10) is used when present, otherwise the mistake counts.
+    """
+    if grade is not None:
+        return max(0.0, min(5.0, grade / 2))
+    return max(0.0, 5.0 - TALQEEN_PENALTY * talqeen - TAMBEEH_PENALTY * tambeeh)
+
+
+def next_review(ease, interval, streak, quality):
+    """Return the new (ease, interval_days, streak) after one review"""
+    ease = max(MIN_EASE, ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+
+    if quality < PASSING_QUALITY:
+        return ease, FIRST_INTERVALS[0], 0
+
+    if streak < len(FIRST_INTERVALS):
+        interval = FIRST_INTERVALS[streak]
+    else:
+        interval = min(MAX_INTERVAL, max(1, round(interval * ease)))
+    return ease, interval, streak + 1
+
+
+def due_date(review_date, interval):
+    """'YYYY-MM-DD' due date `interval` days after a 'YYYY-MM-DD' review"""
+    review_day = datetime.strptime(review_date, '%Y-%m-%d')
+    return (review_day + timedelta(days=interval)).strftime('%Y-%m-%d')
+
+
+# ===== DUE-DATE PRIORITY QUEUE =====
+
+class ReviewQueue:
+    """
+    Min-heap of (due_date, page) over a student's graduated pages.
+
+    Updates push a fresh entry and leave the old one in place; stale
+    entries (changed due date, or page no longer graduated) are skipped
+    when they reach the top, so every update is O(log n).
+    """
+
+    def __init__(self, due_by_page=None, graduated=None):
+        self._due = {int(page): due or NEVER_REVIEWED for page, due in (due_by_page or {}).items()}
+        self._graduated = PageSet()
+        self._heap = []
+        self.set_graduated(graduated or PageSet())
+
+    def __len__(self):
+        return len(self._graduated)
+
+    def _is_current(self, due, page):
+        return page in self._graduated and self._due.get(page, NEVER_REVIEWED) == due
+
+    def set_graduated(self, graduated):
+        """Change the set of schedulable pages (new pages join the heap)"""
+        added = graduated - self._graduated
+        self._graduated = graduated
+        if len(added) > len(self._heap):
+            self._rebuild()
+        else:
+            for page in added:
+                heapq.heappush(self._heap, (self._due.get(page, NEVER_REVIEWED), page))
+
+    def _rebuild(self):
+        self._heap = [(self._due.get(page, NEVER_REVIEWED), page) for page in self._graduated]
+        heapq.heapify(self._heap)
+
+    def update(self, page, due):
+        """Record a page's new due date"""
+        due = due or NEVER_REVIEWED
+        self._due[page] = due
+        if page in self._graduated:
+            heapq.heappush(self._heap, (due, page))
+        # Don't let stale entries pile up forever
+        if len(self._heap) > 4 * max(len(self._graduated), 16):
+            self._rebuild()
+
+    def due(self, today=None, limit=None):
+        """
+        Pages due on or before `today` ('YYYY-MM-DD'), most overdue first,
+        as a list of (page, due_date). O(k log n) for k due pages.
+        """
+        today = today or datetime.now().strftime('%Y-%m-%d')
+        found = []
+        popped = []
+        seen = set()
+        while self._heap and self._heap[0][0] <= today and (limit is None or len(found) < limit):
+            due, page = heapq.heappop(self._heap)
+            # Stale or duplicate entries are simply dropped
+            if self._is_current(due, page) and page not in seen:
+                seen.add(page)
+                found.append((page, due))
+                popped.append((due, page))
+        for item in popped:
+            heapq.heappush(self._heap, item)
+        return found
+
+    def next_due(self):
+        """(page, due_date) of the page due soonest, or None"""
+        while self._heap:
+            due, page = self._heap[0]
+            if self._is_current(due, page):
+                return page, due
+            heapq.heappop(self._heap)
+        return None
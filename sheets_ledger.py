@@ -0,0 +1,278 @@
+# ============================================================================
+# FILE: sheets_ledger.py - LEDGER OF GOOGLE SHEETS API CALLS
+# ============================================================================
+# Every gspread call made through get_google_sheet() is recorded here, so
+# quota problems can be traced back to the screen that caused them:
+#
+# - track(spreadsheet) wraps the spreadsheet (and every worksheet taken
+#   from it) so each call logs operation, worksheet, rows, bytes, latency
+# - the UI action that triggered it (set_action / `with action(...)`);
+#   background writes keep the action of the page run that queued them
+# - rollups per minute and per action (calls per occurrence, so e.g. one
+#   Murajaat submission's cost can be read straight off the table)
+#
+# Bytes are the JSON size of the values sent or received - a close proxy
+# for payload size, not the exact HTTP body. Large payloads are estimated
+# from their first BYTES_SAMPLE_ROWS rows, so a 100k-row read isn't
+# serialized again just to be measured.
+
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import count
+
+import pandas as pd
+
+MAX_ENTRIES = 5000
+BYTES_SAMPLE_ROWS = 50
+
+LEDGER_COLUMNS = [
+    'time', 'action', 'action_id', 'operation', 'worksheet',
+    'rows', 'bytes', 'latency_ms', 'error'
+]
+
+_lock = threading.Lock()
+_local = threading.local()
+_entries = deque(maxlen=MAX_ENTRIES)
+_action_ids = count(1)
+
+
+# ============================================================================
+# UI ACTIONS
+# ============================================================================
+
+def set_action(label):
+    """Attribute the following calls on this thread to a new UI action"""
+    _local.action = (label, next(_action_ids))
+
+
+def current_action():
+    """(label, occurrence id) of this thread's action"""
+    return getattr(_local, 'action', None) or ('background', 0)
+
+
+@contextmanager
+def action(label):
+    """Attribute the calls inside the block to `label`"""
+    previous = getattr(_local, 'action', None)
+    set_action(label)
+    try:
+        yield
+    finally:
+        _local.action = previous
+
+
+@contextmanager
+def resume_action(saved):
+    """Run a block under an action captured earlier with current_action()"""
+    previous = getattr(_local, 'action', None)
+    _local.action = saved
+    try:
+        yield
+    finally:
+        _local.action = previous
+
+
+# ============================================================================
+# RECORDING
+# ============================================================================
+
+def _payload(args, kwargs, result):
+    """The values sent (first list argument) or, for reads, received"""
+    for value in list(args) + list(kwargs.values()):
+        if isinstance(value, list):
+            return value
+    return result
+
+
+def _row_count(operation, payload):
+    if not isinstance(payload, list):
+        return 0
+    if payload and isinstance(payload[0], (list, dict)):
+        return len(payload)
+    # Flat lists: one row (append_row / row_values), or one cell per row
+    if operation == 'col_values':
+        return len(payload)
+    return 1 if payload else 0
+
+
+def _json_size(value):
+    return len(json.dumps(value, default=str, ensure_ascii=False).encode('utf-8'))
+
+
+def _byte_count(payload):
+    if isinstance(payload, dict):
+        return _json_size(payload)
+    if not isinstance(payload, list):
+        return 0
+    if len(payload) <= BYTES_SAMPLE_ROWS:
+        return _json_size(payload)
+    # Rows of one sheet are alike - scale the sample's size per row
+    sample = payload[:BYTES_SAMPLE_ROWS]
+    return round(_json_size(sample) * len(payload) / len(sample))
+
+
+def record(operation, worksheet, rows=0, size=0, latency=0.0, error=None):
+    """Add one API call to the ledger"""
+    label, action_id = current_action()
+    entry = {
+        'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'action': label,
+        'action_id': action_id,
+        'operation': operation,
+        'worksheet': worksheet,
+        'rows': rows,
+        'bytes': size,
+        'latency_ms': round(latency * 1000, 1),
+        'error': error
+    }
+    with _lock:
+        _entries.append(entry)
+
+
+def call(operation, worksheet, fn, *args, **kwargs):
+    """Run fn(*args, **kwargs) as one recorded API call"""
+    started = time.perf_counter()
+    try:
+        result = fn(*args, **kwargs)
+    except Exception as e:
+        record(operation, worksheet, latency=time.perf_counter() - started, error=str(e)[:200])
+        raise
+    payload = _payload(args, kwargs, result)
+    record(
+        operation, worksheet,
+        rows=_row_count(operation, payload),
+        size=_byte_count(payload),
+        latency=time.perf_counter() - started
+    )
+    return result
+
+
+class TrackedWorksheet:
+    """A gspread worksheet whose method calls are recorded"""
+
+    def __init__(self, worksheet):
+        self._worksheet = worksheet
+
+    def __getattr__(self, name):
+        attr = getattr(self._worksheet, name)
+        if name.startswith('_') or not callable(attr):
+            return attr
+
+        def tracked(*args, **kwargs):
+            return call(name, self._worksheet.title, attr, *args, **kwargs)
+        return tracked
+
+
+class TrackedSpreadsheet:
+    """A gspread spreadsheet handing out tracked worksheets"""
+
+    def __init__(self, spreadsheet):
+        self._spreadsheet = spreadsheet
+
+    def worksheet(self, title):
+        return TrackedWorksheet(call('worksheet', title, self._spreadsheet.worksheet, title))
+
+    def worksheets(self, *args, **kwargs):
+        sheets = call('worksheets', '*', self._spreadsheet.worksheets, *args, **kwargs)
+        return [TrackedWorksheet(ws) for ws in sheets]
+
+    def add_worksheet(self, title, *args, **kwargs):
+        return TrackedWorksheet(
+            call('add_worksheet', title, self._spreadsheet.add_worksheet, title, *args, **kwargs)
+        )
+
+    def __getattr__(self, name):
+        attr = getattr(self._spreadsheet, name)
+        if name.startswith('_') or not callable(attr):
+            return attr
+
+        def tracked(*args, **kwargs):
+            return call(name, '*', attr, *args, **kwargs)
+        return tracked
+
+
+def track(spreadsheet):
+    """Wrap a spreadsheet so every call through it lands in the ledger"""
+    if spreadsheet is None or isinstance(spreadsheet, TrackedSpreadsheet):
+        return spreadsheet
+    return TrackedSpreadsheet(spreadsheet)
+
+
+# ============================================================================
+# ROLLUPS
+# ============================================================================
+
+def ledger_frame():
+    """All recorded calls (oldest first) as a DataFrame"""
+    with _lock:
+        entries = list(_entries)
+    return pd.DataFrame(entries, columns=LEDGER_COLUMNS)
+
+
+def per_minute(frame=None):
+    """Calls, rows, bytes and latency per minute and action"""
+    frame = ledger_frame() if frame is None else frame
+    if frame.empty:
+        return pd.DataFrame(columns=['minute', 'action', 'calls', 'rows', 'bytes', 'latency_ms', 'errors'])
+    return (
+        frame.assign(minute=frame['time'].str[:16])
+        .groupby(['minute', 'action'])
+        .agg(
+            calls=('operation', 'size'),
+            rows=('rows', 'sum'),
+            bytes=('bytes', 'sum'),
+            latency_ms=('latency_ms', 'sum'),
+            errors=('error', 'count')
+        )
+        .reset_index()
+        .sort_values(['minute', 'calls'], ascending=[False, False])
+    )
+
+
+def per_action(frame=None):
+    """Cost of each UI action: totals and calls per occurrence, worst first"""
+    frame = ledger_frame() if frame is None else frame
+    if frame.empty:
+        return pd.DataFrame(columns=['action', 'occurrences', 'calls', 'calls_per_action',
+                                     'rows', 'bytes', 'latency_ms'])
+    summary = (
+        frame.groupby('action')
+        .agg(
+            occurrences=('action_id', 'nunique'),
+            calls=('operation', 'size'),
+            rows=('rows', 'sum'),
+            bytes=('bytes', 'sum'),
+            latency_ms=('latency_ms', 'sum')
+        )
+        .reset_index()
+    )
+    summary.insert(3, 'calls_per_action', (summary['calls'] / summary['occurrences']).round(1))
+    return summary.sort_values('calls', ascending=False)
+
+
+def per_operation(frame=None):
+    """Calls and rows per (operation, worksheet)"""
+    frame = ledger_frame() if frame is None else frame
+    if frame.empty:
+        return pd.DataFrame(columns=['operation', 'worksheet', 'calls', 'rows', 'bytes', 'latency_ms'])
+    return (
+        frame.groupby(['operation', 'worksheet'])
+        .agg(
+            calls=('action', 'size'),
+            rows=('rows', 'sum'),
+            bytes=('bytes', 'sum'),
+            latency_ms=('latency_ms', 'sum')
+        )
+        .reset_index()
+        .sort_values('calls', ascending=False)
+    )
+
+
+def reset():
+    """Forget all recorded calls"""
+    with _lock:
+        _entries.clear()
@@ -0,0 +1,299 @@
+# ============================================================================
+# FILE: student_state.py - PER-STUDENT STATE SNAPSHOT
+# ============================================================================
+# A small materialized record per student (last Jadeed position, Juzhali
+# window, graduated pages, per-page review info, running totals).
+# It is updated incrementally on every new session so opening a student
+# doesn't have to rebuild all of this from the raw session rows.
+
+import heapq
+from datetime import datetime
+
+import pandas as pd
+
+from excel_handler import calculate_juzhali_range, get_graduated_pages, grade_to_numeric
+from page_ranges import PageSet, row_sipara_span
+from review_scheduler import DEFAULT_EASE, ReviewQueue, due_date, next_review, review_quality
+
+STATE_VERSION = 6
+
+# Per-page entry layout (kept as a list so the JSON stays small)
+PAGE_LAST_REVIEW = 0
+PAGE_TALQEEN = 1
+PAGE_TAMBEEH = 2
+PAGE_REVIEWS = 3
+PAGE_EASE = 4       # spaced-repetition ease factor
+PAGE_INTERVAL = 5   # days until the next review
+PAGE_STREAK = 6     # passing reviews in a row
+PAGE_DUE = 7        # 'YYYY-MM-DD' next review date
+
+REVIEW_SESSION_TYPES = ['Murajaat', 'Juzhali', 'Tasmeel Juz']
+MURAJAAT_SESSION_TYPES = ['Murajaat', 'Tasmeel Juz']
+
+# Weakness scores: Talqeen counts that halve in weight every 30 days.
+# They are stored scaled to a fixed epoch (x 2^(days since epoch / half
+# life)), so adding a session is O(1) and ranking needs no re-decaying -
+# every key shares the same factor back to "today".
+WEAKNESS_HALF_LIFE = 30
+WEAKNESS_EPOCH = pd.Timestamp('2020-01-01')
+
+
+def empty_student_state(student_id, juzhali_length=10):
+    """Create a blank snapshot for a student with no sessions"""
+    return {
+        'version': STATE_VERSION,
+        'student_id': student_id,
+        'last_jadeed_page': None,
+        'last_jadeed_ayah': None,
+        'last_jadeed_date': None,
+        'juzhali_length': juzhali_length,
+        'juzhali_start': None,
+        'juzhali_end': None,
+        'graduated_pages': [],
+        'pages': {},
+        'total_talqeen': 0,
+        'total_tambeeh': 0,
+        'session_counts': {},
+        'format_counts': {},
+        'weak_pages': {},
+        'weak_siparas': {},
+        'updated_at': None
+    }
+
+
+def is_current_state(state, juzhali_length=None):
+    """True if a stored snapshot is usable as is: this STATE_VERSION and (if given) the same Juzhali length"""
+    if state is None or state.get('version') != STATE_VERSION:
+        return False
+    return juzhali_length is None or state.get('juzhali_length', 10) == juzhali_length
+
+
+def _to_int(value):
+    """Return value as an int, or None if it isn't a single number"""
+    if value is None:
+        return None
+    try:
+        if pd.isna(value):
+            return None
+    except (TypeError, ValueError):
+        return None
+    try:
+        return int(float(str(value).strip()))
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_number(value):
+    """Return value as a float, treating blanks/NaN as 0"""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return 0.0 if pd.isna(number) else number
+
+
+def _date_str(value):
+    """Normalize any date-like value to 'YYYY-MM-DD' (or None)"""
+    if value is None or value == '':
+        return None
+    try:
+        timestamp = pd.Timestamp(value)
+    except (TypeError, ValueError):
+        return None
+    if pd.isna(timestamp):
+        return None
+    return timestamp.strftime('%Y-%m-%d')
+
+
+def new_page_entry():
+    """Per-page entry for a page that has never been reviewed"""
+    return [None, 0, 0, 0, DEFAULT_EASE, 0, 0, None]
+
+
+def session_pages(session_type, session_data, data_format='session_entry'):
+    """Absolute pages covered by one session row (empty for summaries)"""
+    if session_data.get('core_mistake_type') == 'Session_Summary':
+        return []
+
+    # Uploaded Juzhali rows only carry a page COUNT (Page_Range), not pages
+    if session_type == 'Juzhali' and data_format == 'upload':
+        return []
+
+    page = _to_int(session_data.get('page_tested'))
+    sipara = _to_int(session_data.get('sipara'))
+
+    if session_type == 'Juzhali':
+        return [page] if page is not None else []
+
+    # Murajaat / Tasmeel Juz pages are stored as page-in-sipara (of the
+    # mapping that was current when the row was written)
+    if sipara is None:
+        return [page] if page is not None else []
+    start, end = row_sipara_span(sipara, session_data.get('page_map'))
+    if page is None:
+        # Uploaded sipara-level mark: the whole sipara was tested
+        return list(range(start, end + 1))
+    if page > end - start + 1:
+        return [page]
+    return [start + page - 1]
+
+
+def _schedule_page(entry, date_str, quality):
+    """Move a page's spaced-repetition schedule forward by one review"""
+    if not date_str:
+        return
+    ease, interval, streak = next_review(
+        entry[PAGE_EASE], entry[PAGE_INTERVAL], entry[PAGE_STREAK], quality
+    )
+    entry[PAGE_EASE] = round(ease, 3)
+    entry[PAGE_INTERVAL] = interval
+    entry[PAGE_STREAK] = streak
+    entry[PAGE_DUE] = due_date(date_str, interval)
+
+
+def _weakness_scale(date_str):
+    """Epoch scaling factor for a 'YYYY-MM-DD' date"""
+    days = (pd.Timestamp(date_str) - WEAKNESS_EPOCH).days
+    return 2.0 ** (days / WEAKNESS_HALF_LIFE)
+
+
+def _add_weakness(scores, key, talqeen, date_str):
+    """O(1) update of one decayed weakness score"""
+    if not talqeen or not date_str:
+        return
+    scores[key] = scores.get(key, 0.0) + talqeen * _weakness_scale(date_str)
+
+
+def top_weak(state, kind='weak_pages', k=3, today=None):
+    """
+    Top-k weakest pages ('weak_pages') or siparas ('weak_siparas') as
+    [(key, decayed Talqeen score as of today), ...].
+    """
+    scores = state.get(kind) or {}
+    top = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+    today_scale = _weakness_scale(today or datetime.now().strftime('%Y-%m-%d'))
+    return [(int(key), value / today_scale) for key, value in top]
+
+
+def _refresh_windows(state):
+    """Recompute the Juzhali window and graduated pages from last Jadeed"""
+    juzhali_start, juzhali_end = calculate_juzhali_range(
+        state['last_jadeed_page'], state.get('juzhali_length', 10)
+    )
+    state['juzhali_start'] = juzhali_start
+    state['juzhali_end'] = juzhali_end
+    state['graduated_pages'] = get_graduated_pages(
+        state['last_jadeed_page'], state.get('juzhali_length', 10)
+    ).to_list()
+
+
+def apply_session_to_state(state, session_type, session_data, data_format='session_entry'):
+    """
+    Fold one new session row into the snapshot (in place) and return it.
+
+    `session_data` uses the same keys as database.append_new_session.
+    """
+    date_str = _date_str(session_data.get('date'))
+    talqeen = _to_number(session_data.get('talqeen_count'))
+    tambeeh = _to_number(session_data.get('tambeeh_count'))
+
+    counts = state['session_counts']
+    counts[session_type] = counts.get(session_type, 0) + 1
+    format_counts = state['format_counts']
+    format_counts[data_format] = format_counts.get(data_format, 0) + 1
+
+    state['total_talqeen'] += talqeen
+    state['total_tambeeh'] += tambeeh
+
+    if session_type == 'Jadeed':
+        page = _to_int(session_data.get('jadeed_page'))
+        if page is None:
+            page = _to_int(session_data.get('page_tested'))
+
+        if page is not None:
+            current = (state['last_jadeed_date'] or '', state['last_jadeed_page'] or 0)
+            if (date_str or '', page) >= current:
+                state['last_jadeed_page'] = page
+                state['last_jadeed_ayah'] = _to_int(session_data.get('end_ayah'))
+                state['last_jadeed_date'] = date_str
+                _refresh_windows(state)
+
+    elif session_type in REVIEW_SESSION_TYPES:
+        pages = session_pages(session_type, session_data, data_format)
+        grade = grade_to_numeric(session_data.get('overall_grade'))
+        if pd.isna(grade):
+            # Spread a multi-page row's mistakes over its pages
+            share = max(len(pages), 1)
+            quality = review_quality(talqeen / share, tambeeh / share)
+        else:
+            quality = review_quality(grade=grade)
+
+        for page in pages:
+            entry = state['pages'].setdefault(str(page), new_page_entry())
+            if date_str and (entry[PAGE_LAST_REVIEW] is None or date_str > entry[PAGE_LAST_REVIEW]):
+                entry[PAGE_LAST_REVIEW] = date_str
+            entry[PAGE_REVIEWS] += 1
+            _schedule_page(entry, date_str, quality)
+
+        if len(pages) == 1:
+            entry = state['pages'][str(pages[0])]
+            entry[PAGE_TALQEEN] += talqeen
+            entry[PAGE_TAMBEEH] += tambeeh
+            _add_weakness(state['weak_pages'], str(pages[0]), talqeen, date_str)
+
+        sipara = _to_int(session_data.get('sipara'))
+        if session_type in MURAJAAT_SESSION_TYPES and sipara is not None:
+            _add_weakness(state['weak_siparas'], str(sipara), talqeen, date_str)
+
+    state['updated_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    return state
+
+
+def session_row_to_data(row):
+    """Map a standardized sessions row (get_all_student_sessions) to session_data keys"""
+    return {
+        'date': row.get('Date'),
+        'sipara': row.get('Sipara'),
+        'page_tested': row.get('Page'),
+        'jadeed_page': row.get('Jadeed_Page'),
+        'end_ayah': row.get('Ending_Ayah'),
+        'talqeen_count': row.get('Mistake_Count'),
+        'tambeeh_count': row.get('Tambeeh_Count'),
+        'core_mistake_type': row.get('Core_Mistake'),
+        'overall_grade': row.get('Overall_Grade'),
+        'page_map': row.get('page_map', '')
+    }
+
+
+def build_student_state(student_id, sessions_df, juzhali_length=10):
+    """Build a snapshot from scratch by replaying a student's history (backfill)"""
+    state = empty_student_state(student_id, juzhali_length)
+
+    if sessions_df is None or sessions_df.empty:
+        return state
+
+    history = sessions_df.sort_values('Date', kind='stable')
+    for row in history.to_dict('records'):
+        apply_session_to_state(
+            state,
+            row.get('Session_Type'),
+            session_row_to_data(row),
+            row.get('Data_Format') or 'upload'
+        )
+
+    return state
+
+
+def build_review_queue(state):
+    """Due-date queue over the snapshot's graduated pages"""
+    due_by_page = {page: entry[PAGE_DUE] for page, entry in state['pages'].items()}
+    return ReviewQueue(due_by_page, PageSet(state['graduated_pages']))
+
+
+def update_review_queue(queue, state, pages):
+    """Push the new due dates of just-reviewed pages (and graduation changes)"""
+    queue.set_graduated(PageSet(state['graduated_pages']))
+    for page in pages:
+        entry = state['pages'].get(str(page))
+        if entry is not None:
+            queue.update(page, entry[PAGE_DUE])
@@ -0,0 +1,40 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import write_journal
+
+
+@pytest.fixture
+def journal(tmp_path, monkeypatch):
+    """write_journal on a fresh SQLite file (never the app's own journal)"""
+    monkeypatch.setattr(write_journal, 'JOURNAL_PATH', str(tmp_path / 'write_journal.db'))
+    monkeypatch.setattr(write_journal, '_connection', None)
+    yield write_journal
+    if write_journal._connection is not None:
+        write_journal._connection.close()
+
+
+@pytest.fixture
+def sheets(journal, monkeypatch):
+    """
+    database.py routed to an in-memory spreadsheet with a small synthetic
+    school; returns (spreadsheet, students). Caches start empty.
+    """
+    import database
+    from benchmarks import local_sheets
+    from benchmarks.synthetic_data import SESSION_COLUMNS, STUDENT_COLUMNS, make_school
+
+    monkeypatch.setattr(database, 'get_google_sheet', database.get_google_sheet)
+    for name in ['_student_sessions_cache', '_student_state_cache', '_review_queue_cache', '_aggregates_cache']:
+        monkeypatch.setattr(database, name, {})
+
+    students, rows = make_school(3)
+    spreadsheet = local_sheets.install({
+        'students': [STUDENT_COLUMNS] + students.astype(str).values.tolist(),
+        'sessions': [SESSION_COLUMNS] + rows
+    })
+    return spreadsheet, students
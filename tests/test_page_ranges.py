@@ -0,0 +1,44 @@
+import random
+
+from mushaf_index import TOTAL_PAGES
+from page_ranges import PAGE_MAP, PageSet, legacy_sipara_span, row_sipara_span, sipara_span, to_sipara_page
+
+
+def test_overlapping_and_touching_runs_merge():
+    pages = PageSet([(10, 12), (1, 3), (4, 6), (11, 20), (30, 29)])
+    assert pages.intervals == [(1, 6), (10, 20)]
+    assert len(pages) == 17
+    assert 6 in pages and 10 in pages
+    assert 7 not in pages and 21 not in pages
+
+
+def test_set_operations_match_python_sets():
+    rng = random.Random(7)
+    for _ in range(200):
+        a = {rng.randint(1, 60) for _ in range(rng.randint(0, 40))}
+        b = {rng.randint(1, 60) for _ in range(rng.randint(0, 40))}
+        left, right = PageSet.from_pages(a), PageSet.from_pages(b)
+        assert set(left | right) == a | b
+        assert set(left & right) == a & b
+        assert set(left - right) == a - b
+        assert list(left) == sorted(a)
+
+
+def test_sipara_helpers_use_real_juz_boundaries():
+    start, end = sipara_span(2)
+    pages = PageSet.from_range(start - 2, end)
+    assert pages.siparas() == [1, 2]
+    assert pages.is_full_sipara(2)
+    assert not pages.is_full_sipara(1)
+    assert pages.by_sipara()[2] == list(range(1, end - start + 2))
+    assert to_sipara_page(start) == (2, 1)
+
+
+def test_legacy_rows_keep_the_old_20_page_spans():
+    assert legacy_sipara_span(5) == (81, 100)
+    assert legacy_sipara_span(30)[1] == TOTAL_PAGES
+    # Blank page_map = stored before the Mushaf index
+    assert row_sipara_span(5, '') == (81, 100)
+    assert row_sipara_span(5, PAGE_MAP) == sipara_span(5)
+    # Not a stored row (just entered) -> current mapping
+    assert row_sipara_span(5) == sipara_span(5)
@@ -0,0 +1,47 @@
+from review_scheduler import (
+    DEFAULT_EASE, FIRST_INTERVALS, MAX_INTERVAL, MIN_EASE, ReviewQueue, due_date, next_review, review_quality
+)
+from page_ranges import PageSet
+
+
+def test_good_reviews_grow_the_interval():
+    ease, interval, streak = next_review(DEFAULT_EASE, 0, 0, 5)
+    assert (interval, streak) == (FIRST_INTERVALS[0], 1)
+    ease, interval, streak = next_review(ease, interval, streak, 5)
+    assert (interval, streak) == (FIRST_INTERVALS[1], 2)
+    ease, third, streak = next_review(ease, interval, streak, 5)
+    assert third == round(FIRST_INTERVALS[1] * ease)
+    assert streak == 3
+
+
+def test_failed_review_starts_over():
+    ease, interval, streak = next_review(DEFAULT_EASE, 40, 5, 2)
+    assert (interval, streak) == (FIRST_INTERVALS[0], 0)
+    assert ease < DEFAULT_EASE
+
+
+def test_ease_and_interval_are_bounded():
+    ease = DEFAULT_EASE
+    for _ in range(20):
+        ease, _, _ = next_review(ease, 1, 0, 0)
+    assert ease == MIN_EASE
+    assert next_review(DEFAULT_EASE, 300, 10, 5)[1] == MAX_INTERVAL
+
+
+def test_review_quality():
+    assert review_quality(grade=10) == 5
+    assert review_quality(talqeen=2) == 3
+    assert review_quality(talqeen=1, tambeeh=1) == 3.5
+    assert review_quality(talqeen=9) == 0
+    assert due_date('2024-02-28', 2) == '2024-03-01'
+
+
+def test_queue_returns_due_pages_most_overdue_first():
+    queue = ReviewQueue({1: '2024-01-05', 2: '2024-01-01', 3: '2024-02-01'}, PageSet.from_range(1, 4))
+    # Page 4 was never reviewed, so it is due first
+    assert queue.due('2024-01-10') == [(4, ''), (2, '2024-01-01'), (1, '2024-01-05')]
+
+    queue.update(2, '2024-03-01')
+    queue.set_graduated(PageSet.from_range(2, 4))
+    assert queue.due('2024-01-10') == [(4, '')]
+    assert queue.next_due() == (4, '')
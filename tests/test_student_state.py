@@ -0,0 +1,66 @@
+import pytest
+
+import database
+from student_state import (
+    STATE_VERSION, apply_session_to_state, build_student_state, empty_student_state, session_row_to_data
+)
+
+
+def _without_timestamp(state):
+    return {key: value for key, value in state.items() if key != 'updated_at'}
+
+
+def test_incremental_updates_match_a_rebuild(sheets):
+    _, students = sheets
+    sessions = database.get_all_student_sessions(int(students['id'].iloc[0]))
+    history = sessions.sort_values('Date', kind='stable')
+    split = len(history) // 2
+
+    state = build_student_state(1, history.iloc[:split])
+    for row in history.iloc[split:].to_dict('records'):
+        apply_session_to_state(state, row['Session_Type'], session_row_to_data(row), row['Data_Format'])
+
+    assert _without_timestamp(state) == _without_timestamp(build_student_state(1, history))
+
+
+def test_outdated_snapshot_is_rebuilt_and_saved(sheets):
+    _, students = sheets
+    student_id = int(students['id'].iloc[0])
+    stale = empty_student_state(student_id)
+    stale['version'] = STATE_VERSION - 1
+    database.save_student_state(student_id, stale, remember=False)
+
+    state = database.get_student_state(student_id)
+    assert state['version'] == STATE_VERSION
+    assert state['last_jadeed_page'] is not None
+    assert database.load_student_state(student_id)['last_jadeed_page'] == state['last_jadeed_page']
+
+
+def test_snapshot_follows_the_juzhali_length(sheets):
+    _, students = sheets
+    student_id = int(students['id'].iloc[0])
+    short = database.get_student_state(student_id, juzhali_length=10)
+    longer = database.get_student_state(student_id, juzhali_length=20)
+    assert longer['juzhali_length'] == 20
+    assert longer['graduated_pages'][-1][1] == short['graduated_pages'][-1][1] - 10
+    assert database.load_student_state(student_id)['juzhali_length'] == 20
+
+
+def test_failed_read_is_never_saved_or_cached(sheets, monkeypatch):
+    _, students = sheets
+    student_id = int(students['id'].iloc[0])
+    stored = database.get_student_state(student_id)
+    database._student_state_cache.clear()
+    load_student_state = database.load_student_state
+
+    def unavailable(*args, **kwargs):
+        raise TimeoutError("429 quota exceeded")
+
+    monkeypatch.setattr(database, 'load_student_state', unavailable)
+    shown = database.get_student_state(student_id)
+    assert shown['last_jadeed_page'] is None
+    assert str(student_id) not in database._student_state_cache
+    with pytest.raises(TimeoutError):
+        database._student_state(student_id)
+
+    assert load_student_state(student_id)['last_jadeed_page'] == stored['last_jadeed_page']
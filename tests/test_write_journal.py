@@ -0,0 +1,34 @@
+import database
+
+
+def test_pending_rows_until_committed(journal):
+    ids = journal.record(7, [[None, 7, 'Juzhali', '2024-01-01'], [None, 7, 'Jadeed', '2024-01-01']])
+    assert journal.pending_count() == 2
+    assert [row for _, _, row in journal.pending_entries()][1][2] == 'Jadeed'
+
+    journal.mark_committed(ids[:1])
+    assert journal.pending_ids(ids) == ids[1:]
+    assert journal.pending_count() == 1
+
+
+def test_row_key_ignores_the_sheet_id(journal):
+    assert journal.row_key([1, 7, 'Juzhali', None]) == journal.row_key(['', '7', 'Juzhali', ''])
+    assert journal.row_key([1, 7, 'Juzhali']) != journal.row_key([1, 8, 'Juzhali'])
+
+
+def test_replay_writes_each_row_once(sheets, journal):
+    spreadsheet, students = sheets
+    student_id = int(students['id'].iloc[0])
+    worksheet = spreadsheet.worksheet('sessions')
+    rows = [
+        database._session_row(None, student_id, 'Juzhali', {'date': '2030-01-0%d' % day, 'page_tested': 40 + day})
+        for day in (1, 2)
+    ]
+    journal.record(student_id, rows)
+    # The first row reached the sheet before a crash, but was never marked done
+    worksheet.append_rows([[len(worksheet.get_all_values())] + rows[0][1:]])
+    before = len(worksheet.get_all_values())
+
+    assert database.replay_journal()
+    assert len(worksheet.get_all_values()) == before + 1
+    assert journal.pending_count() == 0
@@ -0,0 +1,155 @@
+# ============================================================================
+# FILE: timeseries.py - WEEKLY / MONTHLY AGGREGATES PER STUDENT
+# ============================================================================
+# Charts over long histories plot resampled points instead of every raw
+# session. Aggregates are kept per (frequency, session type, sipara,
+# period) as running sums, so they are built once with a groupby and then
+# updated in O(1) for every new session.
+
+import pandas as pd
+
+from excel_handler import grade_to_numeric, grades_to_numeric
+
+FREQUENCIES = {'W': 'Weekly', 'M': 'Monthly'}
+
+# Running sums per bucket
+AGG_MARK_SUM = 0
+AGG_MARK_COUNT = 1
+AGG_TALQEEN = 2
+AGG_TAMBEEH = 3
+AGG_ENTRIES = 4    # non-summary rows (pages / sipara marks)
+
+SIPARA_SESSION_TYPES = ['Murajaat', 'Tasmeel Juz']
+
+
+def empty_aggregates():
+    """No buckets yet for either frequency"""
+    return {freq: {} for freq in FREQUENCIES}
+
+
+def period_start(date, freq):
+    """'YYYY-MM-DD' start of the week (Monday) or month containing `date`"""
+    timestamp = pd.Timestamp(date)
+    if freq == 'W':
+        timestamp = timestamp - pd.Timedelta(days=timestamp.weekday())
+    else:
+        timestamp = timestamp.replace(day=1)
+    return timestamp.strftime('%Y-%m-%d')
+
+
+def _bucket_key(session_type, sipara, period):
+    return f"{session_type}|{sipara}|{period}"
+
+
+def _sipara_key(session_type, sipara):
+    """Sipara is only part of the key for Murajaat-type sessions"""
+    if session_type not in SIPARA_SESSION_TYPES:
+        return 0
+    try:
+        return int(float(sipara))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _number(value):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return 0.0 if pd.isna(number) else number
+
+
+def add_session_to_aggregates(aggregates, session_type, session_data):
+    """O(1) update of every frequency's bucket for one new session row"""
+    date = session_data.get('date')
+    if date is None or date == '' or pd.isna(pd.Timestamp(date)):
+        return aggregates
+
+    mark = grade_to_numeric(session_data.get('overall_grade'))
+    is_summary = session_data.get('core_mistake_type') == 'Session_Summary'
+    sipara = _sipara_key(session_type, session_data.get('sipara'))
+
+    for freq, buckets in aggregates.items():
+        key = _bucket_key(session_type, sipara, period_start(date, freq))
+        bucket = buckets.setdefault(key, [0.0, 0, 0.0, 0.0, 0])
+        if not pd.isna(mark):
+            bucket[AGG_MARK_SUM] += float(mark)
+            bucket[AGG_MARK_COUNT] += 1
+        bucket[AGG_TALQEEN] += _number(session_data.get('talqeen_count'))
+        bucket[AGG_TAMBEEH] += _number(session_data.get('tambeeh_count'))
+        if not is_summary:
+            bucket[AGG_ENTRIES] += 1
+
+    return aggregates
+
+
+def build_aggregates(sessions_df):
+    """Build every bucket from a student's standardized sessions with one groupby per frequency"""
+    aggregates = empty_aggregates()
+    if sessions_df is None or sessions_df.empty:
+        return aggregates
+
+    dates = pd.to_datetime(sessions_df['Date'], errors='coerce')
+    marks = grades_to_numeric(sessions_df['Overall_Grade'])
+    sipara = pd.to_numeric(sessions_df['Sipara'], errors='coerce').fillna(0).astype(int)
+    sipara = sipara.where(sessions_df['Session_Type'].isin(SIPARA_SESSION_TYPES), 0)
+
+    frame = pd.DataFrame({
+        'session_type': sessions_df['Session_Type'].astype(str),
+        'sipara': sipara,
+        'mark_sum': marks.fillna(0.0),
+        'mark_count': marks.notna().astype(int),
+        'talqeen': pd.to_numeric(sessions_df['Mistake_Count'], errors='coerce').fillna(0.0),
+        'tambeeh': pd.to_numeric(sessions_df['Tambeeh_Count'], errors='coerce').fillna(0.0),
+        'entries': (sessions_df['Core_Mistake'] != 'Session_Summary').astype(int)
+    })[dates.notna()]
+    dates = dates[dates.notna()]
+
+    periods = {
+        'W': (dates - pd.to_timedelta(dates.dt.weekday, unit='D')).dt.strftime('%Y-%m-%d'),
+        'M': dates.dt.to_period('M').dt.start_time.dt.strftime('%Y-%m-%d')
+    }
+
+    for freq, period in periods.items():
+        sums = frame.assign(period=period).groupby(['session_type', 'sipara', 'period']).sum()
+        aggregates[freq] = {
+            _bucket_key(session_type, sipara_key, period_key): [
+                float(row.mark_sum), int(row.mark_count), float(row.talqeen),
+                float(row.tambeeh), int(row.entries)
+            ]
+            for (session_type, sipara_key, period_key), row in zip(sums.index, sums.itertuples())
+        }
+
+    return aggregates
+
+
+def aggregate_series(aggregates, freq, session_type, sipara=None):
+    """
+    Chart-ready frame for one session type (and sipara): period, mean
+    mark, marked sessions, Talqeen, Tambeeh and mistakes per entry.
+    """
+    wanted_sipara = _sipara_key(session_type, sipara) if sipara is not None else None
+    rows = []
+    for key, bucket in aggregates.get(freq, {}).items():
+        bucket_type, bucket_sipara, period = key.split('|')
+        if bucket_type != session_type:
+            continue
+        if wanted_sipara is not None and int(bucket_sipara) != wanted_sipara:
+            continue
+        rows.append({
+            'period': pd.Timestamp(period),
+            'mark_sum': bucket[AGG_MARK_SUM],
+            'marked_sessions': bucket[AGG_MARK_COUNT],
+            'talqeen': bucket[AGG_TALQEEN],
+            'tambeeh': bucket[AGG_TAMBEEH],
+            'entries': bucket[AGG_ENTRIES]
+        })
+
+    columns = ['period', 'mean_mark', 'marked_sessions', 'talqeen', 'tambeeh', 'mistakes_per_entry']
+    if not rows:
+        return pd.DataFrame(columns=columns)
+
+    series = pd.DataFrame(rows).groupby('period').sum().sort_index().reset_index()
+    series['mean_mark'] = series['mark_sum'] / series['marked_sessions'].where(series['marked_sessions'] > 0)
+    series['mistakes_per_entry'] = series['talqeen'] / series['entries'].where(series['entries'] > 0)
+    return series[columns]
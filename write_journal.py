@@ -0,0 +1,123 @@
+# ============================================================================
+# FILE: write_journal.py - DURABLE LOCAL JOURNAL OF SESSION WRITES
+# ============================================================================
+# Every entered session row is committed to a local SQLite file BEFORE it
+# is sent to Google Sheets, and only marked done once the sheet has it.
+# If Sheets is down or over quota (or the app restarts mid-write), the
+# pending rows are still on disk and get replayed in order, in batches.
+#
+# - synchronous=FULL: a recorded row survives a crash or power loss
+# - rows are stored without their sheet id (assigned at write time)
+# - row_key (the row minus its id) lets a replay skip rows that did reach
+#   the sheet before they could be marked done
+
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+JOURNAL_PATH = os.getenv(
+    'HIFZ_WRITE_JOURNAL',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'write_journal.db')
+)
+
+PENDING = 'pending'
+COMMITTED = 'committed'
+
+REPLAY_BATCH_SIZE = 500
+
+_lock = threading.Lock()
+_connection = None
+
+
+def _connect():
+    """Shared connection (created on first use) with the journal table"""
+    global _connection
+    if _connection is None:
+        _connection = sqlite3.connect(JOURNAL_PATH, check_same_thread=False)
+        _connection.execute('PRAGMA journal_mode=WAL')
+        _connection.execute('PRAGMA synchronous=FULL')
+        _connection.execute('''
+            CREATE TABLE IF NOT EXISTS session_writes (
+                entry_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                student_id TEXT NOT NULL,
+                row_json TEXT NOT NULL,
+                status TEXT NOT NULL,
+                recorded_at TEXT NOT NULL,
+                committed_at TEXT
+            )
+        ''')
+        _connection.execute(
+            'CREATE INDEX IF NOT EXISTS session_writes_status ON session_writes (status, entry_id)'
+        )
+        _connection.commit()
+    return _connection
+
+
+def row_key(row):
+    """Identity of a sessions-sheet row, ignoring its id (first column)"""
+    return json.dumps(['' if value is None else str(value) for value in row[1:]], ensure_ascii=False)
+
+
+def record(student_id, rows):
+    """Durably store rows about to be written; returns their entry ids (in order)"""
+    now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    with _lock:
+        connection = _connect()
+        with connection:
+            entry_ids = [
+                connection.execute(
+                    'INSERT INTO session_writes (student_id, row_json, status, recorded_at) VALUES (?, ?, ?, ?)',
+                    (str(student_id), json.dumps(row, ensure_ascii=False, default=str), PENDING, now)
+                ).lastrowid
+                for row in rows
+            ]
+    return entry_ids
+
+
+def mark_committed(entry_ids):
+    """Rows that are now in the sheet"""
+    if not entry_ids:
+        return
+    now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    with _lock:
+        connection = _connect()
+        with connection:
+            connection.executemany(
+                'UPDATE session_writes SET status = ?, committed_at = ? WHERE entry_id = ?',
+                [(COMMITTED, now, entry_id) for entry_id in entry_ids]
+            )
+
+
+def pending_ids(entry_ids):
+    """The subset of entry_ids still waiting for the sheet"""
+    if not entry_ids:
+        return []
+    placeholders = ','.join('?' * len(entry_ids))
+    with _lock:
+        rows = _connect().execute(
+            f'SELECT entry_id FROM session_writes WHERE status = ? AND entry_id IN ({placeholders})',
+            [PENDING] + list(entry_ids)
+        ).fetchall()
+    return [entry_id for (entry_id,) in rows]
+
+
+def pending_entries(limit=REPLAY_BATCH_SIZE):
+    """Oldest pending writes as [(entry_id, student_id, row)], in write order"""
+    with _lock:
+        rows = _connect().execute(
+            'SELECT entry_id, student_id, row_json FROM session_writes '
+            'WHERE status = ? ORDER BY entry_id LIMIT ?',
+            (PENDING, limit)
+        ).fetchall()
+    return [(entry_id, student_id, json.loads(row_json)) for entry_id, student_id, row_json in rows]
+
+
+def pending_count():
+    """Rows recorded but not yet in the sheet"""
+    with _lock:
+        (count,) = _connect().execute(
+            'SELECT COUNT(*) FROM session_writes WHERE status = ?', (PENDING,)
+        ).fetchone()
+    return count
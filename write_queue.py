@@ -0,0 +1,215 @@
+# ============================================================================
+# FILE: write_queue.py - BACKGROUND WRITES TO GOOGLE SHEETS
+# ============================================================================
+# Sheets writes (and their 429 backoff) used to run on the Streamlit script
+# thread, freezing the page until they finished. Writes are now submitted
+# here and run one at a time, in order, on a single background thread:
+#
+# - every job has a status: pending -> committed, or failed after
+#   MAX_ATTEMPTS tries (each retry waits a little longer)
+# - a job waiting to be retried is set aside until its next attempt is
+#   due, so one failing write doesn't hold up the writes queued behind it
+# - jobs are tagged with an owner (one per browser session), so each
+#   teacher only sees the status of their own saves
+# - a failed job can be retried without re-entering anything
+# - a job raising PermanentFailure (bad data, not a Sheets hiccup) fails
+#   at once instead of being retried
+# - an idle task (set_idle_task) runs whenever nothing has been due for
+#   IDLE_SECONDS, e.g. to retry writes left over from an outage
+
+import heapq
+import threading
+import time
+import uuid
+from datetime import datetime
+
+import sheets_ledger
+
+PENDING = 'pending'
+COMMITTED = 'committed'
+FAILED = 'failed'
+
+MAX_ATTEMPTS = 5
+RETRY_BASE_SECONDS = 2      # waits 2, 4, 8, 16 ... seconds between tries
+RETRY_MAX_SECONDS = 60
+MAX_FINISHED_JOBS = 200     # finished jobs kept for status display
+IDLE_SECONDS = 60
+
+
+class PermanentFailure(Exception):
+    """Raised by a job for errors that retrying can't fix"""
+
+
+class WriteJob:
+    """One queued write and its current status"""
+
+    def __init__(self, label, fn, args, kwargs, owner):
+        self.id = uuid.uuid4().hex
+        self.label = label
+        self.owner = owner
+        self.action = sheets_ledger.current_action()   # UI action that queued it
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.status = PENDING
+        self.attempts = 0
+        self.error = None
+        self.result = None
+        self.created_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self.finished_at = None
+        self.not_before = time.monotonic()     # earliest time of the next attempt
+
+    def retry_delay(self):
+        """Seconds to wait before the next try"""
+        return min(RETRY_BASE_SECONDS ** self.attempts, RETRY_MAX_SECONDS)
+
+
+_ready = []                 # heap of (not_before, sequence, job) - FIFO once due
+_sequence = 0
+_jobs = {}
+_lock = threading.Lock()
+_wakeup = threading.Condition(_lock)
+_worker = None
+_idle_task = {'fn': None}
+
+
+def _enqueue(job):
+    """Hand a job to the worker (it runs once job.not_before has passed)"""
+    global _sequence
+    with _wakeup:
+        _sequence += 1
+        heapq.heappush(_ready, (job.not_before, _sequence, job))
+        _wakeup.notify()
+
+
+def _next_job(idle_after):
+    """Block until the earliest due job can run, and take it (None if idle for `idle_after` seconds)"""
+    deadline = time.monotonic() + idle_after
+    with _wakeup:
+        while True:
+            now = time.monotonic()
+            if _ready and _ready[0][0] <= now:
+                return heapq.heappop(_ready)[2]
+            if now >= deadline:
+                return None
+            until = min(deadline, _ready[0][0]) if _ready else deadline
+            _wakeup.wait(until - now)
+
+
+def _run(job):
+    """Try a job once; a failure is re-queued for later until it runs out of attempts"""
+    job.attempts += 1
+    try:
+        with sheets_ledger.resume_action(job.action):
+            result = job.fn(*job.args, **job.kwargs)
+        if result is None or result is False:
+            raise RuntimeError("write returned no result")
+        job.result = result
+        job.error = None
+        job.status = COMMITTED
+    except Exception as e:
+        job.error = str(e)
+        if job.attempts < MAX_ATTEMPTS and not isinstance(e, PermanentFailure):
+            print(f"⚠️ {job.label} failed (attempt {job.attempts}/{MAX_ATTEMPTS}): {e}")
+            job.not_before = time.monotonic() + job.retry_delay()
+            _enqueue(job)
+            return
+        print(f"❌ {job.label} failed after {job.attempts} attempts: {e}")
+        job.status = FAILED
+    job.finished_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _run_idle_task():
+    fn = _idle_task['fn']
+    if fn is None:
+        return
+    try:
+        fn()
+    except Exception as e:
+        print(f"⚠️ Idle task failed: {e}")
+
+
+def _work():
+    while True:
+        job = _next_job(IDLE_SECONDS)
+        if job is None:
+            _run_idle_task()
+        else:
+            _run(job)
+
+
+def _ensure_worker():
+    global _worker
+    with _lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_work, name='sheets-writer', daemon=True)
+            _worker.start()
+
+
+def _trim_finished():
+    """Forget the oldest finished jobs once there are too many"""
+    finished = [job for job in _jobs.values() if job.status != PENDING]
+    for job in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+        _jobs.pop(job.id, None)
+
+
+def submit(label, fn, *args, owner=None, delay=0, **kwargs):
+    """Queue fn(*args, **kwargs) to run in the background (after `delay` seconds); returns the job"""
+    job = WriteJob(label, fn, args, kwargs, owner)
+    job.not_before += delay
+    with _lock:
+        _trim_finished()
+        _jobs[job.id] = job
+    _ensure_worker()
+    _enqueue(job)
+    return job
+
+
+def set_idle_task(fn):
+    """Run fn() on the writer whenever it has been idle for IDLE_SECONDS"""
+    _idle_task['fn'] = fn
+    _ensure_worker()
+
+
+def retry(job_id):
+    """Queue a failed job again with a fresh set of attempts"""
+    job = _jobs.get(job_id)
+    if job is None or job.status != FAILED:
+        return False
+    job.status = PENDING
+    job.attempts = 0
+    job.finished_at = None
+    job.not_before = time.monotonic()
+    _ensure_worker()
+    _enqueue(job)
+    return True
+
+
+def get_job(job_id):
+    """Job by id (None once forgotten)"""
+    return _jobs.get(job_id)
+
+
+def jobs_for(owner):
+    """An owner's jobs, newest first"""
+    with _lock:
+        owned = [job for job in _jobs.values() if job.owner == owner]
+    return owned[::-1]
+
+
+def pending_count(owner=None):
+    """Writes still waiting to commit (for one owner, or everyone)"""
+    return sum(
+        1 for job in list(_jobs.values())
+        if job.status == PENDING and (owner is None or job.owner == owner)
+    )
+
+
+def wait_until_idle(timeout=None):
+    """Block until every queued write has finished (scripts and shutdown)"""
+    deadline = None if timeout is None else time.time() + timeout
+    while pending_count():
+        if deadline is not None and time.time() > deadline:
+            return False
+        time.sleep(0.05)
+    return True